@@ -5,6 +5,7 @@ from django.contrib.contenttypes.fields import GenericForeignKey
 from django.core.exceptions import ValidationError
 from django.db import models
 from django.urls import reverse
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from mptt.models import MPTTModel
 
@@ -27,7 +28,7 @@ class ObjectChange(models.Model):
     """
     time = models.DateTimeField(
         verbose_name=_('time'),
-        auto_now_add=True,
+        default=timezone.now,
         editable=False,
         db_index=True
     )
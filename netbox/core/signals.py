@@ -1,7 +1,11 @@
 import logging
+import weakref
+from functools import partial
 
 from django.contrib.contenttypes.models import ContentType
 from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import prefetch_related_objects
 from django.db.models.fields.reverse_related import ManyToManyRel, ManyToOneRel
 from django.db.models.signals import m2m_changed, post_save, pre_delete
 from django.dispatch import receiver, Signal
@@ -13,17 +17,21 @@ from core.events import *
 from extras.events import enqueue_event
 from extras.utils import run_validators
 from netbox.config import get_config
-from netbox.context import current_request, events_queue
+from netbox.context import changes_queue, current_request, events_queue
 from netbox.models.features import ChangeLoggingMixin
+from netbox.search.backends import search_backend
 from utilities.exceptions import AbortRequest
 from .models import ConfigRevision, DataSource, ObjectChange
 
 __all__ = (
     'clear_events',
+    'ObjectChangeQueue',
+    'enqueue_objectchanges',
     'job_end',
     'job_start',
     'post_sync',
     'pre_sync',
+    'record_created_objects',
 )
 
 # Job signals
@@ -42,6 +50,100 @@ clear_events = Signal()
 # Change logging & event handling
 #
 
+class ObjectChangeQueue:
+    """
+    Buffer the ObjectChanges recorded while processing a request, so that they may be written in bulk. The queue is
+    flushed once it reaches CHANGELOG_BUFFER_SIZE records, and at the end of the request (see
+    netbox.context_managers.change_logging).
+
+    Each record is written only if the transaction within which it was queued has been committed, or is still in
+    progress (in which case the record is written within it). Records queued within a transaction or savepoint which
+    was rolled back are discarded.
+    """
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.changes = []
+
+    def __len__(self):
+        return len(self.changes)
+
+    @staticmethod
+    def is_live(objectchange):
+        """
+        Return True if the transaction within which the ObjectChange was queued has been committed or is still in
+        progress. Django drops the on_commit() callbacks of a transaction or savepoint when it is rolled back, so a
+        record whose callback has neither been called nor is still referenced belongs to a rolled-back transaction.
+        """
+        return objectchange._committed or objectchange._commit_callback() is not None
+
+    def append(self, objectchange):
+        # Record the user's name, as ObjectChange.save() is not called by bulk_create()
+        if not objectchange.user_name:
+            objectchange.user_name = objectchange.user.username
+
+        # Discard the cached changed & related objects, which may have since been deleted (their IDs are retained)
+        for field_name in ('changed_object', 'related_object'):
+            field = ObjectChange._meta.get_field(field_name)
+            if field.is_cached(objectchange):
+                field.delete_cached_value(objectchange)
+
+        # The callback is called immediately if not in a transaction. Only a weak reference is retained, so that it is
+        # freed if the transaction is rolled back.
+        callback = partial(setattr, objectchange, '_committed', True)
+        objectchange._committed = False
+        objectchange._commit_callback = weakref.ref(callback)
+        self.changes.append(objectchange)
+        transaction.on_commit(callback)
+
+        if len(self.changes) >= self.max_size:
+            self.flush()
+
+    def flush(self):
+        """
+        Write the queued ObjectChanges to the database in a single query, in the order in which they were queued.
+        """
+        if changes := [objectchange for objectchange in self.changes if self.is_live(objectchange)]:
+            ObjectChange.objects.bulk_create(changes)
+        self.changes = []
+
+
+def enqueue_objectchanges(objectchanges):
+    """
+    Queue ObjectChanges to be written in bulk, if the changes queue is active for the current request; otherwise, save
+    them immediately.
+    """
+    queue = changes_queue.get()
+    if queue is None:
+        for objectchange in objectchanges:
+            objectchange.save()
+        return
+
+    for objectchange in objectchanges:
+        queue.append(objectchange)
+
+
+def get_queued_objectchange(instance, request_id):
+    """
+    Return the most recent ObjectChange recorded for an object by the specified request, whether queued or already
+    written to the database.
+    """
+    object_type = ContentType.objects.get_for_model(instance)
+    queue = changes_queue.get()
+    for objectchange in reversed(queue.changes if queue is not None else []):
+        if (
+            objectchange.changed_object_type_id == object_type.pk and
+            objectchange.changed_object_id == instance.pk and
+            objectchange.request_id == request_id
+        ):
+            return objectchange
+
+    return ObjectChange.objects.filter(
+        changed_object_type=object_type,
+        changed_object_id=instance.pk,
+        request_id=request_id
+    ).first()
+
+
 @receiver((post_save, m2m_changed))
 def handle_changed_object(sender, instance, **kwargs):
     """
@@ -78,19 +180,14 @@ def handle_changed_object(sender, instance, **kwargs):
     objectchange = instance.to_objectchange(action)
     # If this is a many-to-many field change, check for a previous ObjectChange instance recorded
     # for this object by this request and update it
-    if m2m_changed and (
-        prev_change := ObjectChange.objects.filter(
-            changed_object_type=ContentType.objects.get_for_model(instance),
-            changed_object_id=instance.pk,
-            request_id=request.id
-        ).first()
-    ):
+    if m2m_changed and (prev_change := get_queued_objectchange(instance, request.id)):
         prev_change.postchange_data = objectchange.postchange_data
-        prev_change.save()
+        if prev_change.pk:
+            prev_change.save()
     elif objectchange and objectchange.has_changes:
         objectchange.user = request.user
         objectchange.request_id = request.id
-        objectchange.save()
+        enqueue_objectchanges([objectchange])
 
     # Ensure that we're working with fresh M2M assignments
     if m2m_changed:
@@ -137,7 +234,7 @@ def handle_deleted_object(sender, instance, **kwargs):
         objectchange = instance.to_objectchange(ObjectChangeActionChoices.ACTION_DELETE)
         objectchange.user = request.user
         objectchange.request_id = request.id
-        objectchange.save()
+        enqueue_objectchanges([objectchange])
 
     # Django does not automatically send an m2m_changed signal for the reverse direction of a
     # many-to-many relationship (see https://code.djangoproject.com/ticket/17688), so we need to
@@ -173,6 +270,44 @@ def handle_deleted_object(sender, instance, **kwargs):
     model_deletes.labels(instance._meta.model_name).inc()
 
 
+def record_created_objects(created):
+    """
+    Record the creation of objects which have been created in bulk (e.g. with bulk_create()), for which no post_save
+    signals have been sent: log the changes and enqueue events (if a request is being processed), and cache the
+    objects for search.
+
+    Args:
+        created: A dictionary mapping models to lists of newly created instances
+    """
+    request = current_request.get()
+
+    for model, instances in created.items():
+        if hasattr(model, 'tags'):
+            prefetch_related_objects(instances, 'tags')
+
+        if request is not None:
+            changes = []
+            for instance in instances:
+                objectchange = instance.to_objectchange(ObjectChangeActionChoices.ACTION_CREATE)
+                objectchange.user = request.user
+                objectchange.user_name = request.user.username
+                objectchange.request_id = request.id
+                changes.append(objectchange)
+            if changes_queue.get() is None:
+                ObjectChange.objects.bulk_create(changes)
+            else:
+                enqueue_objectchanges(changes)
+
+            queue = events_queue.get()
+            for instance in instances:
+                enqueue_event(queue, instance, request.user, request.id, OBJECT_CREATED)
+            events_queue.set(queue)
+
+        if not search_backend.queue(instances):
+            search_backend.cache(instances, remove_existing=False)
+        model_inserts.labels(model._meta.model_name).inc(len(instances))
+
+
 @receiver(clear_events)
 def clear_events_queue(sender, **kwargs):
     """
@@ -1,6 +1,10 @@
+import uuid
+
 from django.contrib.contenttypes.models import ContentType
-from django.test import override_settings
+from django.db import transaction
+from django.test import RequestFactory, TestCase, override_settings
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework import status
 
 from core.choices import ObjectChangeActionChoices
@@ -9,6 +13,8 @@ from dcim.choices import SiteStatusChoices
 from dcim.models import Site
 from extras.choices import *
 from extras.models import CustomField, CustomFieldChoiceSet, Tag
+from netbox.context_managers import change_logging, event_tracking
+from users.models import User
 from utilities.testing import APITestCase
 from utilities.testing.utils import create_tags, post_data
 from utilities.testing.views import ModelViewTestCase
@@ -514,3 +520,85 @@ class ChangeLogAPITest(APITestCase):
         self.assertEqual(objectchange.prechange_data['name'], 'Site 1')
         self.assertEqual(objectchange.prechange_data['slug'], 'site-1')
         self.assertEqual(objectchange.postchange_data, None)
+
+
+class ChangeLogBufferTest(TestCase):
+
+    def setUp(self):
+        self.request = RequestFactory().get(reverse('dcim:site_add'))
+        self.request.id = uuid.uuid4()
+        self.request.user = User.objects.create_user(username='testuser')
+
+    def test_buffered_changes(self):
+        with event_tracking(self.request), change_logging(self.request):
+            site = Site.objects.create(name='Site 1', slug='site-1')
+            site.tags.set(create_tags('Alpha', 'Bravo'))
+            site.description = 'foo'
+            site.save()
+            self.assertEqual(ObjectChange.objects.count(), 0)
+            flush_time = timezone.now()
+
+        # Changes are written in the order they were made, and M2M changes are merged into the preceding record
+        objectchanges = ObjectChange.objects.filter(changed_object_id=site.pk).order_by('pk')
+        self.assertEqual(
+            [oc.action for oc in objectchanges],
+            [ObjectChangeActionChoices.ACTION_CREATE, ObjectChangeActionChoices.ACTION_UPDATE]
+        )
+        self.assertEqual(objectchanges[0].postchange_data['tags'], ['Alpha', 'Bravo'])
+        self.assertEqual(objectchanges[1].postchange_data['description'], 'foo')
+        self.assertEqual(objectchanges[1].user_name, 'testuser')
+
+        # Each record retains the time at which the change was made, rather than the time it was written
+        for objectchange in objectchanges:
+            self.assertLessEqual(objectchange.time, flush_time)
+
+    def test_rolled_back_changes(self):
+        with event_tracking(self.request), change_logging(self.request):
+            Site.objects.create(name='Site 1', slug='site-1')
+            try:
+                with transaction.atomic():
+                    Site.objects.create(name='Site 2', slug='site-2')
+                    raise Exception()
+            except Exception:
+                pass
+            Site.objects.create(name='Site 3', slug='site-3')
+
+        self.assertEqual(
+            sorted(ObjectChange.objects.values_list('object_repr', flat=True)),
+            ['Site 1', 'Site 3']
+        )
+
+    @override_settings(CHANGELOG_BUFFER_SIZE=2)
+    def test_rolled_back_changes_after_flush(self):
+        with event_tracking(self.request), change_logging(self.request):
+            with transaction.atomic():
+                Site.objects.create(name='Site 1', slug='site-1')
+                Site.objects.create(name='Site 2', slug='site-2')
+            try:
+                with transaction.atomic():
+                    Site.objects.create(name='Site 3', slug='site-3')
+                    raise Exception()
+            except Exception:
+                pass
+
+        self.assertEqual(
+            sorted(ObjectChange.objects.values_list('object_repr', flat=True)),
+            ['Site 1', 'Site 2']
+        )
+
+    @override_settings(CHANGELOG_BUFFER_SIZE=2)
+    def test_buffer_size(self):
+        with event_tracking(self.request), change_logging(self.request):
+            Site.objects.create(name='Site 1', slug='site-1')
+            self.assertEqual(ObjectChange.objects.count(), 0)
+            Site.objects.create(name='Site 2', slug='site-2')
+            self.assertEqual(ObjectChange.objects.count(), 2)
+            Site.objects.create(name='Site 3', slug='site-3')
+            self.assertEqual(ObjectChange.objects.count(), 2)
+        self.assertEqual(ObjectChange.objects.count(), 3)
+
+    @override_settings(CHANGELOG_BUFFER_SIZE=0)
+    def test_buffer_disabled(self):
+        with event_tracking(self.request), change_logging(self.request):
+            Site.objects.create(name='Site 1', slug='site-1')
+            self.assertEqual(ObjectChange.objects.count(), 1)
@@ -8,6 +8,7 @@ from rest_framework import serializers
 from dcim.choices import *
 from dcim.constants import MACADDRESS_ASSIGNMENT_MODELS
 from dcim.models import Device, DeviceBay, MACAddress, Module, VirtualDeviceContext
+from dcim.provisioning import provision_devices, validate_devices
 from extras.api.serializers_.configtemplates import ConfigTemplateSerializer
 from ipam.api.serializers_.ip import IPAddressSerializer
 from netbox.api.fields import ChoiceField, ContentTypeField, RelatedObjectCountField
@@ -24,6 +25,7 @@ from .sites import LocationSerializer, SiteSerializer
 from .virtualchassis import VirtualChassisSerializer
 
 __all__ = (
+    'DeviceProvisionSerializer',
     'DeviceSerializer',
     'DeviceWithConfigContextSerializer',
     'MACAddressSerializer',
@@ -122,6 +124,41 @@ class DeviceWithConfigContextSerializer(DeviceSerializer):
         return obj.get_config_context()
 
 
+class DeviceProvisionListSerializer(serializers.ListSerializer):
+    """
+    Validates a batch of Devices as a whole (see validate_devices()) and creates them with provision_devices().
+    """
+    def to_internal_value(self, data):
+        attrs = super().to_internal_value(data)
+
+        self._devices = []
+        self._tags = []
+        for device_attrs in attrs:
+            device_attrs = device_attrs.copy()
+            self._tags.append(device_attrs.pop('tags', []))
+            self._devices.append(Device(**device_attrs))
+        errors = validate_devices(self._devices)
+        if any(errors):
+            raise serializers.ValidationError(errors)
+
+        return attrs
+
+    def create(self, validated_data):
+        return provision_devices(self._devices, self._tags)
+
+
+class DeviceProvisionSerializer(DeviceSerializer):
+    """
+    Used to provision Devices in bulk. Model validation is performed for the batch as a whole by
+    DeviceProvisionListSerializer, rather than for each Device.
+    """
+    class Meta(DeviceSerializer.Meta):
+        list_serializer_class = DeviceProvisionListSerializer
+
+    def validate(self, data):
+        return data
+
+
 class VirtualDeviceContextSerializer(NetBoxModelSerializer):
     device = DeviceSerializer(nested=True)
     identifier = serializers.IntegerField(allow_null=True, max_value=32767, min_value=0, required=False, default=None)
@@ -1,3 +1,5 @@
+import decimal
+
 from django.utils.translation import gettext as _
 from rest_framework import serializers
 
@@ -14,10 +16,12 @@ from .manufacturers import ManufacturerSerializer
 from .sites import LocationSerializer, SiteSerializer
 
 __all__ = (
+    'AvailableRackSpaceSerializer',
     'RackElevationDetailFilterSerializer',
     'RackReservationSerializer',
     'RackRoleSerializer',
     'RackSerializer',
+    'RackSpaceFilterSerializer',
     'RackTypeSerializer',
 )
 
@@ -187,3 +191,50 @@ class RackElevationDetailFilterSerializer(serializers.Serializer):
         required=False,
         default=True
     )
+
+
+class RackSpaceFilterSerializer(serializers.Serializer):
+    u_height = serializers.DecimalField(
+        max_digits=4,
+        decimal_places=1,
+        min_value=0,
+        default=1
+    )
+    face = serializers.ChoiceField(
+        choices=DeviceFaceChoices,
+        default=DeviceFaceChoices.FACE_FRONT
+    )
+    is_full_depth = serializers.BooleanField(
+        required=False,
+        default=False
+    )
+    ignore_reservations = serializers.BooleanField(
+        required=False,
+        default=False
+    )
+    limit = serializers.IntegerField(
+        min_value=1,
+        default=ConfigItem('PAGINATE_COUNT')
+    )
+
+    def validate_u_height(self, value):
+        if value % decimal.Decimal(0.5):
+            raise serializers.ValidationError(_("U height must be in increments of 0.5 rack units."))
+        return value
+
+
+class AvailableRackSpaceSerializer(serializers.Serializer):
+    """
+    A position within a rack at which a device of the requested height will fit.
+    """
+    rack = RackSerializer(nested=True, read_only=True)
+    position = serializers.DecimalField(
+        max_digits=4,
+        decimal_places=1,
+        read_only=True
+    )
+    face = ChoiceField(
+        choices=DeviceFaceChoices,
+        allow_blank=True,
+        read_only=True
+    )
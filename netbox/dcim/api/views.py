@@ -1,25 +1,33 @@
 from django.contrib.contenttypes.prefetch import GenericPrefetch
 from django.http import Http404, HttpResponse
 from django.shortcuts import get_object_or_404
+from django_rq.queues import get_connection
 from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import extend_schema, OpenApiParameter
+from rest_framework import status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.routers import APIRootView
 from rest_framework.viewsets import ViewSet
+from rq import Worker
 
+from core.api.serializers import JobSerializer
 from dcim import filtersets
-from dcim.constants import CABLE_TRACE_SVG_DEFAULT_WIDTH
+from dcim.constants import CABLE_TRACE_SVG_DEFAULT_WIDTH, RACK_SPACE_SEARCH_BATCH_SIZE
+from dcim.jobs import DeviceProvisioningJob
 from dcim.models import *
-from dcim.svg import CableTraceSVG
+from dcim.svg import CableTraceSVG, render_rack_elevations
 from extras.api.mixins import ConfigContextQuerySetMixin, RenderConfigMixin
 from netbox.api.authentication import IsAuthenticatedOrLoginNotRequired
 from netbox.api.metadata import ContentTypeMetadata
 from netbox.api.pagination import StripCountAnnotationsPaginator
 from netbox.api.viewsets import NetBoxModelViewSet, MPTTLockedMixin
 from netbox.api.viewsets.mixins import SequentialBulkCreatesMixin
+from netbox.config import get_config
 from utilities.api import get_serializer_for_model
+from utilities.exceptions import RQWorkerNotRunningException
 from utilities.query_functions import CollateAsChar
+from utilities.request import copy_safe_request
 from . import serializers
 from .exceptions import MissingFilterException
 
@@ -53,7 +61,7 @@ class PathEndpointMixin(object):
             except (ValueError, TypeError):
                 width = CABLE_TRACE_SVG_DEFAULT_WIDTH
             drawing = CableTraceSVG(obj, base_url=request.build_absolute_uri('/'), width=width)
-            return HttpResponse(drawing.render().tostring(), content_type='image/svg+xml')
+            return HttpResponse(drawing.render_cached(), content_type='image/svg+xml')
 
         # Serialize path objects, iterating over each three-tuple in the path
         for near_ends, cable, far_ends in obj.trace():
@@ -207,18 +215,20 @@ class RackViewSet(NetBoxModelViewSet):
                 except ValueError:
                     pass
 
-            # Render and return the elevation as an SVG drawing with the correct content type
-            drawing = rack.get_elevation_svg(
+            # Render (or retrieve from cache) and return the elevation as an SVG drawing with the correct content type
+            svg = render_rack_elevations(
+                [rack],
                 face=data['face'],
                 user=request.user,
                 unit_width=data['unit_width'],
                 unit_height=data['unit_height'],
                 legend_width=data['legend_width'],
+                margin_width=data['margin_width'],
                 include_images=data['include_images'],
                 base_url=request.build_absolute_uri('/'),
                 highlight_params=highlight_params
-            )
-            return HttpResponse(drawing.tostring(), content_type='image/svg+xml')
+            )[rack.pk]
+            return HttpResponse(svg, content_type='image/svg+xml')
 
         else:
             # Return a JSON representation of the rack units in the elevation
@@ -239,6 +249,58 @@ class RackViewSet(NetBoxModelViewSet):
                 rack_units = serializers.RackUnitSerializer(page, many=True, context={'request': request})
                 return self.get_paginated_response(rack_units.data)
 
+    @extend_schema(
+        operation_id='dcim_racks_available_space_list',
+        parameters=[serializers.RackSpaceFilterSerializer],
+        responses={200: serializers.AvailableRackSpaceSerializer(many=True)}
+    )
+    @action(detail=False, url_path='available-space')
+    def available_space(self, request):
+        """
+        Search all racks matching the specified filters for positions at which a device of the given height (and
+        depth) will fit. Returns up to the specified number of positions, ordered by rack and then by position.
+        """
+        serializer = serializers.RackSpaceFilterSerializer(data=request.GET)
+        if not serializer.is_valid():
+            return Response(serializer.errors, 400)
+        data = serializer.validated_data
+        face = None if data['is_full_depth'] else data['face']
+        limit = data['limit']
+        if max_page_size := get_config().MAX_PAGE_SIZE:
+            limit = min(limit, max_page_size)
+
+        # Filter racks using all remaining query parameters (some of which, e.g. u_height, are also rack filters)
+        params = request.GET.copy()
+        for field in serializer.fields:
+            params.pop(field, None)
+        filterset = self.filterset_class(params, self.get_queryset(), request=request)
+        if not filterset.is_valid():
+            return Response(filterset.errors, 400)
+        racks = filterset.qs.order_by('pk')
+
+        # Compute the occupancy of the racks in batches, stopping once enough positions have been found
+        available_space = []
+        for i in range(0, racks.count(), RACK_SPACE_SEARCH_BATCH_SIZE):
+            batch = list(racks[i:i + RACK_SPACE_SEARCH_BATCH_SIZE])
+            occupancies = Rack.get_occupancies(batch, include_reservations=not data['ignore_reservations'])
+            for rack in batch:
+                positions = occupancies[rack.pk].get_available_positions(
+                    u_height=data['u_height'],
+                    face=face,
+                    include_reserved=not data['ignore_reservations']
+                )
+                for position in positions[:limit - len(available_space)]:
+                    available_space.append({'rack': rack, 'position': position, 'face': face or ''})
+                if len(available_space) >= limit:
+                    break
+            if len(available_space) >= limit:
+                break
+
+        serializer = serializers.AvailableRackSpaceSerializer(
+            available_space, many=True, context={'request': request}
+        )
+        return Response(serializer.data)
+
 
 #
 # Rack reservations
@@ -398,6 +460,58 @@ class DeviceViewSet(
 
         return serializers.DeviceWithConfigContextSerializer
 
+    @extend_schema(
+        operation_id='dcim_devices_provision_create',
+        parameters=[
+            OpenApiParameter(
+                name='background',
+                type=OpenApiTypes.BOOL,
+                location='query',
+                description='Provision the devices in a background job'
+            ),
+        ],
+        request=serializers.DeviceProvisionSerializer(many=True),
+        responses={201: serializers.DeviceSerializer(many=True), 202: JobSerializer}
+    )
+    @action(detail=False, methods=['post'], url_path='provision')
+    def provision(self, request):
+        """
+        Create a batch of Devices along with their components in bulk. Rack placement is validated for the batch as
+        a whole, and all devices and components are created at once (rather than device by device). If `background`
+        is true, the batch is validated and created by a background job, which is returned.
+        """
+        serializer = serializers.DeviceProvisionSerializer(
+            data=request.data,
+            many=True,
+            context=self.get_serializer_context()
+        )
+
+        if request.query_params.get('background', '').lower() in ('true', '1'):
+            if not isinstance(request.data, list):
+                serializer.is_valid(raise_exception=True)
+
+            # Check that at least one RQ worker is running
+            if not Worker.count(get_connection('default')):
+                raise RQWorkerNotRunningException()
+
+            job = DeviceProvisioningJob.enqueue(
+                user=request.user,
+                data=request.data,
+                request=copy_safe_request(request)
+            )
+            return Response(
+                JobSerializer(job, context={'request': request}).data,
+                status=status.HTTP_202_ACCEPTED
+            )
+
+        serializer.is_valid(raise_exception=True)
+        self.perform_create(serializer)
+        devices = self.get_queryset().filter(pk__in=[device.pk for device in serializer.instance])
+        return Response(
+            serializers.DeviceSerializer(devices, many=True, context={'request': request}).data,
+            status=status.HTTP_201_CREATED
+        )
+
 
 class VirtualDeviceContextViewSet(NetBoxModelViewSet):
     queryset = VirtualDeviceContext.objects.all()
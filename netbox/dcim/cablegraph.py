@@ -0,0 +1,243 @@
+from collections import defaultdict
+
+from circuits.models import CircuitTermination
+from core.models import ObjectType
+from dcim.models import Cable, CableTermination, FrontPort, RearPort
+from dcim.utils import compile_path_node
+
+__all__ = (
+    'CableGraph',
+)
+
+
+class CableGraph:
+    """
+    An in-memory cache of the objects consulted when tracing CablePaths: cables and their terminations, the front and
+    rear ports of patch panels and similar devices, and circuit terminations. Objects are loaded in bulk and indexed
+    by path node, so that tracing can resolve each hop from memory rather than querying the database hop by hop.
+
+    Any object not already present is loaded on demand, so a graph is always complete, however it was populated. A
+    graph reflects the database as it was at the time each object was loaded, and should be discarded once any of
+    these objects have been modified.
+    """
+    def __init__(self):
+        # Objects indexed by path node
+        self._objects = {}
+        self._cables = {}
+        # CableTerminations indexed by Cable ID and by terminating path node
+        self._cable_terminations = {}
+        self._node_terminations = {}
+        # Ports indexed by parent device, and the order in which they were returned by the database
+        self._devices = set()
+        self._front_ports = defaultdict(list)
+        self._port_order = {}
+        # CircuitTerminations indexed by Circuit ID and term side
+        self._circuit_terminations = {}
+
+    @staticmethod
+    def _get_node(obj):
+        return compile_path_node(ObjectType.objects.get_for_model(obj).pk, obj.pk)
+
+    def _add_object(self, obj):
+        """
+        Cache an object, returning the already-cached instance if it has been loaded previously.
+        """
+        return self._objects.setdefault(self._get_node(obj), obj)
+
+    #
+    # Loading
+    #
+
+    def _load_cables(self, cable_ids):
+        """
+        Load the specified Cables along with all of their terminations.
+        """
+        cable_ids = set(cable_ids) - set(self._cables)
+        if not cable_ids:
+            return
+
+        for cable in Cable.objects.filter(pk__in=cable_ids):
+            self._cables[cable.pk] = cable
+            self._cable_terminations[cable.pk] = []
+        terminations_by_type = defaultdict(set)
+        for ct in CableTermination.objects.filter(cable_id__in=cable_ids):
+            self._cable_terminations[ct.cable_id].append(ct)
+            self._node_terminations[compile_path_node(ct.termination_type_id, ct.termination_id)] = ct
+            terminations_by_type[ct.termination_type_id].add(ct.termination_id)
+
+        # Load the terminating objects
+        for ct_id, object_ids in terminations_by_type.items():
+            model = ObjectType.objects.get_for_id(ct_id).model_class()
+            unloaded_ids = [pk for pk in object_ids if compile_path_node(ct_id, pk) not in self._objects]
+            for obj in model.objects.filter(pk__in=unloaded_ids):
+                self._add_object(obj)
+
+    def _load_terminations(self, terminations):
+        """
+        Load the Cables attached to the given termination objects (if any).
+        """
+        unknown = defaultdict(list)
+        for t in terminations:
+            node = self._get_node(t)
+            if node not in self._node_terminations:
+                unknown[ObjectType.objects.get_for_model(t).pk].append(t.pk)
+                # Record the termination as having no cable unless one is found below
+                self._node_terminations[node] = None
+        cable_ids = set()
+        for ct_id, object_ids in unknown.items():
+            cable_ids.update(
+                CableTermination.objects.filter(
+                    termination_type_id=ct_id,
+                    termination_id__in=object_ids
+                ).values_list('cable_id', flat=True)
+            )
+        self._load_cables(cable_ids)
+
+    def _load_devices(self, device_ids):
+        """
+        Load all front and rear ports belonging to the specified Devices.
+        """
+        device_ids = set(device_ids) - self._devices
+        if not device_ids:
+            return
+        self._devices.update(device_ids)
+
+        for model in (RearPort, FrontPort):
+            for i, port in enumerate(model.objects.filter(device_id__in=device_ids)):
+                port = self._add_object(port)
+                self._port_order[self._get_node(port)] = i
+                if model is FrontPort:
+                    self._front_ports[port.rear_port_id].append(port)
+
+    def _load_circuits(self, circuit_ids):
+        """
+        Load all CircuitTerminations belonging to the specified Circuits.
+        """
+        circuit_ids = set(circuit_ids) - {circuit_id for circuit_id, _ in self._circuit_terminations}
+        if not circuit_ids:
+            return
+
+        for circuit_id in circuit_ids:
+            for term_side in ('A', 'Z'):
+                self._circuit_terminations[(circuit_id, term_side)] = None
+        for termination in CircuitTermination.objects.filter(circuit_id__in=circuit_ids):
+            termination = self._add_object(termination)
+            self._circuit_terminations[(termination.circuit_id, termination.term_side)] = termination
+
+    def preload(self, terminations):
+        """
+        Load everything reachable from the given terminations. The graph is expanded one hop at a time for all
+        terminations at once, so the number of queries is bounded by the length of the longest path rather than the
+        number of terminations.
+        """
+        frontier = list(terminations)
+        seen = set()
+        while frontier:
+            self._load_terminations(frontier)
+
+            # Determine the far-end terminations of each cable attached to the frontier
+            far_ends = []
+            for t in frontier:
+                ct = self._node_terminations.get(self._get_node(t))
+                if ct is None:
+                    continue
+                for remote_ct in self._cable_terminations[ct.cable_id]:
+                    if remote_ct.cable_end != ct.cable_end:
+                        node = compile_path_node(remote_ct.termination_type_id, remote_ct.termination_id)
+                        if node not in seen and node in self._objects:
+                            seen.add(node)
+                            far_ends.append(self._objects[node])
+
+            # Follow the far-end terminations to their next hops
+            self._load_devices([t.device_id for t in far_ends if isinstance(t, (FrontPort, RearPort))])
+            self._load_circuits([t.circuit_id for t in far_ends if isinstance(t, CircuitTermination)])
+            frontier = []
+            for t in far_ends:
+                if isinstance(t, FrontPort):
+                    frontier.append(self._objects[compile_path_node(
+                        ObjectType.objects.get_for_model(RearPort).pk, t.rear_port_id
+                    )])
+                elif isinstance(t, RearPort):
+                    frontier.extend(self._front_ports[t.pk])
+                elif isinstance(t, CircuitTermination):
+                    if peer := self.get_peer_circuit_termination(t):
+                        frontier.append(peer)
+            frontier = [t for t in frontier if self._get_node(t) not in seen]
+            seen.update(self._get_node(t) for t in frontier)
+
+    #
+    # Lookups
+    #
+
+    def get_link(self, termination):
+        """
+        Return the Cable or WirelessLink attached to a termination (if any).
+        """
+        if termination.cable_id:
+            self._load_cables([termination.cable_id])
+            return self._cables.get(termination.cable_id)
+        return termination.link
+
+    def get_far_end(self, terminations):
+        """
+        Return the terminations at the far end(s) of the Cable(s) attached to the given terminations, ordered by
+        cable, cable end, and ID. Returns None if none of the terminations is attached to a Cable.
+        """
+        self._load_terminations(terminations)
+        local_terminations = [
+            ct for ct in (self._node_terminations[self._get_node(t)] for t in terminations) if ct is not None
+        ]
+        if not local_terminations:
+            return None
+
+        remote_ends = {(ct.cable_id, 'A' if ct.cable_end == 'B' else 'B') for ct in local_terminations}
+        remote_terminations = sorted(
+            (
+                ct for cable_id in {ct.cable_id for ct in local_terminations}
+                for ct in self._cable_terminations[cable_id]
+                if (ct.cable_id, ct.cable_end) in remote_ends
+            ),
+            key=lambda ct: (ct.cable_id, ct.cable_end, ct.pk)
+        )
+        return [
+            self._objects.get(compile_path_node(ct.termination_type_id, ct.termination_id))
+            for ct in remote_terminations
+        ]
+
+    def get_rear_ports(self, front_ports):
+        """
+        Return the RearPorts to which the given FrontPorts are mapped.
+        """
+        self._load_devices([fp.device_id for fp in front_ports])
+        rear_port_type = ObjectType.objects.get_for_model(RearPort).pk
+        rear_ports = {
+            node: self._objects[node] for node in (
+                compile_path_node(rear_port_type, fp.rear_port_id) for fp in front_ports
+            )
+        }
+        return [rear_ports[node] for node in sorted(rear_ports, key=lambda node: self._port_order[node])]
+
+    def get_front_ports(self, rear_ports):
+        """
+        Return all FrontPorts mapped to the given RearPorts.
+        """
+        self._load_devices([rp.device_id for rp in rear_ports])
+        front_ports = [fp for rp in {rp.pk for rp in rear_ports} for fp in self._front_ports[rp]]
+        return sorted(front_ports, key=lambda fp: self._port_order[self._get_node(fp)])
+
+    def get_peer_circuit_termination(self, termination):
+        """
+        Return the CircuitTermination on the opposite side of the given termination's Circuit (if any).
+        """
+        self._load_circuits([termination.circuit_id])
+        peer_side = 'Z' if termination.term_side == 'A' else 'A'
+        return self._circuit_terminations[(termination.circuit_id, peer_side)]
+
+    @staticmethod
+    def get_parent_id(termination):
+        """
+        Return the ID of the object (Device or Circuit) to which a mid-span termination belongs.
+        """
+        if isinstance(termination, CircuitTermination):
+            return termination.circuit_id
+        return termination.device_id
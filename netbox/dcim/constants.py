@@ -16,9 +16,13 @@ RACK_U_HEIGHT_MAX = 100
 RACK_ELEVATION_BORDER_WIDTH = 2
 RACK_ELEVATION_DEFAULT_LEGEND_WIDTH = 30
 RACK_ELEVATION_DEFAULT_MARGIN_WIDTH = 15
+RACK_ELEVATION_SVG_CACHE_TIMEOUT = 300  # seconds
 
 RACK_STARTING_UNIT_DEFAULT = 1
 
+# Number of racks whose occupancy is computed at once when searching for available space
+RACK_SPACE_SEARCH_BATCH_SIZE = 500
+
 
 #
 # RearPorts
@@ -94,6 +98,7 @@ MODULAR_COMPONENT_MODELS = Q(
 #
 
 CABLE_TRACE_SVG_DEFAULT_WIDTH = 400
+CABLE_TRACE_SVG_CACHE_TIMEOUT = 3600  # seconds
 
 # Cable endpoint types
 CABLE_TERMINATION_MODELS = Q(
@@ -18,8 +18,8 @@ from tenancy.filtersets import TenancyFilterSet, ContactModelFilterSet
 from tenancy.models import *
 from users.models import User
 from utilities.filters import (
-    ContentTypeFilter, MultiValueCharFilter, MultiValueMACAddressFilter, MultiValueNumberFilter, MultiValueWWNFilter,
-    NumericArrayFilter, TreeNodeMultipleChoiceFilter,
+    ContentTypeFilter, MultiValueCharFilter, MultiValueDecimalFilter, MultiValueMACAddressFilter,
+    MultiValueNumberFilter, MultiValueWWNFilter, NumericArrayFilter, TreeNodeMultipleChoiceFilter,
 )
 from virtualization.models import Cluster, ClusterGroup, VMInterface, VirtualMachine
 from vpn.models import L2VPN
@@ -422,6 +422,14 @@ class RackFilterSet(NetBoxModelFilterSet, TenancyFilterSet, ContactModelFilterSe
     serial = MultiValueCharFilter(
         lookup_expr='iexact'
     )
+    utilization = MultiValueDecimalFilter(
+        field_name='_utilization',
+        label=_('Space utilization (%)'),
+    )
+    power_utilization = MultiValueDecimalFilter(
+        field_name='_power_utilization',
+        label=_('Power utilization (%)'),
+    )
 
     class Meta:
         model = Rack
@@ -0,0 +1,51 @@
+from contextlib import ExitStack
+
+from django.core.exceptions import PermissionDenied
+from django.db import transaction
+from django.utils.translation import gettext as _
+
+from dcim.api.serializers import DeviceProvisionSerializer
+from dcim.models import Device
+from netbox.jobs import JobRunner
+from netbox.registry import registry
+
+__all__ = (
+    'DeviceProvisioningJob',
+)
+
+
+class DeviceProvisioningJob(JobRunner):
+    """
+    Provision a batch of Devices in the background (see provision_devices()).
+    """
+
+    class Meta:
+        name = 'Device provisioning'
+
+    def run(self, data, request=None, **kwargs):
+        """
+        Args:
+            data: A list of Device representations, as accepted by the REST API
+            request: The WSGI request associated with this execution (if any)
+        """
+        serializer = DeviceProvisionSerializer(data=data, many=True, context={'request': request})
+        if not serializer.is_valid():
+            self.job.data = {'errors': serializer.errors}
+            raise ValueError(_("Validation failed for one or more devices."))
+
+        # Process change logging, event rules, etc. in the context of the original request
+        with ExitStack() as stack:
+            for request_processor in registry['request_processors']:
+                stack.enter_context(request_processor(request))
+            with transaction.atomic():
+                devices = serializer.save()
+
+                # Enforce object-level permissions
+                if self.job.user:
+                    permitted_count = Device.objects.restrict(self.job.user, 'add').filter(
+                        pk__in=[device.pk for device in devices]
+                    ).count()
+                    if permitted_count != len(devices):
+                        raise PermissionDenied(_("This user does not have permission to create these devices."))
+
+        self.job.data = {'devices': [device.pk for device in devices]}
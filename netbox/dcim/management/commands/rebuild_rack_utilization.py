@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from dcim.models import Rack
+from dcim.utils import update_rack_utilization
+
+
+class Command(BaseCommand):
+    help = "Recalculate the cached space and power utilization of all racks"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=500, dest='batch_size',
+            help="Number of racks to recalculate per batch (default: 500)"
+        )
+
+    def handle(self, *args, **options):
+        batch_size = max(options['batch_size'], 1)
+        rack_ids = list(Rack.objects.order_by('pk').values_list('pk', flat=True))
+        self.stdout.write(f'Recalculating utilization for {len(rack_ids)} racks...')
+
+        for i in range(0, len(rack_ids), batch_size):
+            update_rack_utilization(rack_ids[i:i + batch_size])
+            self.stdout.write(f'  {min(i + batch_size, len(rack_ids))}/{len(rack_ids)}')
+
+        self.stdout.write(self.style.SUCCESS('Finished.'))
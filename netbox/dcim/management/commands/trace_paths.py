@@ -1,10 +1,13 @@
+import multiprocessing
+import time
+
 from django.core.management.base import BaseCommand
 from django.core.management.color import no_style
-from django.db import connection
+from django.db import connection, connections
 from django.db.models import Q
 
 from dcim.models import CablePath, ConsolePort, ConsoleServerPort, Interface, PowerFeed, PowerOutlet, PowerPort
-from dcim.signals import create_cablepath
+from dcim.utils import bulk_create_cablepaths
 
 ENDPOINT_MODELS = (
     ConsolePort,
@@ -16,6 +19,19 @@ ENDPOINT_MODELS = (
 )
 
 
+def trace_chunk(model, pks):
+    """
+    Trace and create CablePaths for the specified origins of the given model. Returns the number of paths created.
+    """
+    return bulk_create_cablepaths(model.objects.filter(pk__in=pks).order_by('pk'))
+
+
+def _trace_chunk(args):
+    # Entry point for worker processes; returns the number of origins processed along with the number of paths created
+    model, pks = args
+    return len(pks), trace_chunk(model, pks)
+
+
 class Command(BaseCommand):
     help = "Generate any missing cable paths among all cable termination objects in NetBox"
 
@@ -28,6 +44,14 @@ class Command(BaseCommand):
             "--no-input", action='store_true', dest='no_input',
             help="Do not prompt user for any input/confirmation"
         )
+        parser.add_argument(
+            "--workers", type=int, default=1,
+            help="Number of worker processes among which to distribute origins (default: 1)"
+        )
+        parser.add_argument(
+            "--batch-size", type=int, default=500, dest='batch_size',
+            help="Number of origins to trace and write per batch (default: 500)"
+        )
 
     def draw_progress_bar(self, percentage):
         """
@@ -36,7 +60,19 @@ class Command(BaseCommand):
         bar_size = int(percentage / 5)
         self.stdout.write(f"\r  [{'#' * bar_size}{' ' * (20 - bar_size)}] {int(percentage)}%", ending='')
 
+    @staticmethod
+    def get_chunks(origins, batch_size):
+        """
+        Partition origins into chunks of PKs. Origins are grouped by their parent object (device or power panel),
+        ensuring that the components of a device are generally traced together.
+        """
+        parent_field = 'power_panel' if origins.model is PowerFeed else 'device'
+        pks = list(origins.order_by(parent_field, 'pk').values_list('pk', flat=True))
+        return [pks[i:i + batch_size] for i in range(0, len(pks), batch_size)]
+
     def handle(self, *model_names, **options):
+        workers = max(options['workers'], 1)
+        batch_size = max(options['batch_size'], 1)
 
         # If --force was passed, first delete all existing CablePaths
         if options['force']:
@@ -66,25 +102,55 @@ class Command(BaseCommand):
                 for sql in sequence_sql:
                     cursor.execute(sql)
 
+        # Worker processes are forked and must not share the parent's database connections
+        pool = None
+        if workers > 1:
+            connections.close_all()
+            pool = multiprocessing.get_context('fork').Pool(workers)
+            self.stdout.write(f'Distributing origins among {workers} worker processes')
+
         # Retrace paths
-        for model in ENDPOINT_MODELS:
-            params = Q(cable__isnull=False)
-            if hasattr(model, 'wireless_link'):
-                params |= Q(wireless_link__isnull=False)
-            origins = model.objects.filter(params)
-            if not options['force']:
-                origins = origins.filter(_path__isnull=True)
-            origins_count = origins.count()
-            if not origins_count:
-                self.stdout.write(f'Found no missing {model._meta.verbose_name} paths; skipping')
-                continue
-            self.stdout.write(f'Retracing {origins_count} cabled {model._meta.verbose_name_plural}...')
-            i = 0
-            for i, obj in enumerate(origins, start=1):
-                create_cablepath([obj])
-                if not i % 100:
+        start_time = time.monotonic()
+        total_count = 0
+        try:
+            for model in ENDPOINT_MODELS:
+                params = Q(cable__isnull=False)
+                if hasattr(model, 'wireless_link'):
+                    params |= Q(wireless_link__isnull=False)
+                origins = model.objects.filter(params)
+                if not options['force']:
+                    origins = origins.filter(_path__isnull=True)
+                origins_count = origins.count()
+                if not origins_count:
+                    self.stdout.write(f'Found no missing {model._meta.verbose_name} paths; skipping')
+                    continue
+                self.stdout.write(f'Retracing {origins_count} cabled {model._meta.verbose_name_plural}...')
+
+                model_start_time = time.monotonic()
+                chunks = [(model, pks) for pks in self.get_chunks(origins, batch_size)]
+                if pool is not None:
+                    results = pool.imap_unordered(_trace_chunk, chunks)
+                else:
+                    results = (_trace_chunk(chunk) for chunk in chunks)
+
+                i = 0
+                paths_count = 0
+                for origins_traced, count in results:
+                    i += origins_traced
+                    paths_count += count
                     self.draw_progress_bar(i * 100 / origins_count)
-            self.draw_progress_bar(100)
-            self.stdout.write(self.style.SUCCESS(f'\n  Retraced {i} {model._meta.verbose_name_plural}'))
+                elapsed = time.monotonic() - model_start_time
+                total_count += paths_count
+                self.stdout.write(self.style.SUCCESS(
+                    f'\n  Retraced {i} {model._meta.verbose_name_plural} ({paths_count} paths created) in '
+                    f'{elapsed:.2f}s ({i / elapsed if elapsed else i:.1f}/s)'
+                ))
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
 
-        self.stdout.write(self.style.SUCCESS('Finished.'))
+        elapsed = time.monotonic() - start_time
+        self.stdout.write(self.style.SUCCESS(
+            f'Finished. Created {total_count} paths in {elapsed:.2f}s ({total_count / elapsed if elapsed else 0:.1f}/s)'
+        ))
@@ -0,0 +1,44 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dcim', '0208_cablepath_nodes_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rack',
+            name='_allocated_power',
+            field=models.PositiveBigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='rack',
+            name='_available_power',
+            field=models.PositiveBigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='rack',
+            name='_occupied_units',
+            field=models.DecimalField(decimal_places=1, default=0, editable=False, max_digits=4),
+        ),
+        migrations.AddField(
+            model_name='rack',
+            name='_power_utilization',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=8),
+        ),
+        migrations.AddField(
+            model_name='rack',
+            name='_utilization',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=5),
+        ),
+        migrations.AddIndex(
+            model_name='rack',
+            index=models.Index(fields=['_utilization'], name='dcim_rack__utiliz_ca294e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rack',
+            index=models.Index(fields=['_power_utilization'], name='dcim_rack__power__d2eca6_idx'),
+        ),
+    ]
@@ -1,6 +1,8 @@
 import itertools
+from collections import defaultdict
 
 from django.contrib.contenttypes.fields import GenericForeignKey
+from django.contrib.postgres.indexes import GinIndex
 from django.core.exceptions import ValidationError
 from django.db import models
 from django.dispatch import Signal
@@ -10,7 +12,7 @@ from core.models import ObjectType
 from dcim.choices import *
 from dcim.constants import *
 from dcim.fields import PathField
-from dcim.utils import decompile_path_node, object_to_path_node
+from dcim.utils import compile_path_node, decompile_path_node, object_to_path_node
 from netbox.models import ChangeLoggedModel, PrimaryModel
 from utilities.conversion import to_meters
 from utilities.exceptions import AbortRequest
@@ -434,7 +436,8 @@ class CablePath(models.Model):
     if the instance represents a complete end-to-end path from origin(s) to destination(s). `is_split` is True if the
     path diverges across multiple cables.
 
-    `_nodes` retains a flattened list of all nodes within the path to enable simple filtering.
+    `_nodes` retains a flattened list of all nodes within the path to enable simple filtering. It is indexed to
+    efficiently find all paths which traverse a particular object.
     """
     path = models.JSONField(
         verbose_name=_('path'),
@@ -457,6 +460,9 @@ class CablePath(models.Model):
     _netbox_private = True
 
     class Meta:
+        indexes = (
+            GinIndex(fields=('_nodes',)),
+        )
         verbose_name = _('cable path')
         verbose_name_plural = _('cable paths')
 
@@ -520,14 +526,15 @@ class CablePath(models.Model):
         return int(len(self.path) / 3)
 
     @classmethod
-    def from_origin(cls, terminations):
+    def from_origin(cls, terminations, graph=None):
         """
         Create a new CablePath instance as traced from the given termination objects. These can be any object to which a
         Cable or WirelessLink connects (interfaces, console ports, circuit termination, etc.). All terminations must be
         of the same type and must belong to the same parent object.
-        """
-        from circuits.models import CircuitTermination
 
+        A CableGraph may be passed to resolve the path from objects already loaded into memory (e.g. when tracing many
+        paths at once). Otherwise, objects are loaded as the trace progresses.
+        """
         if not terminations:
             return None
 
@@ -535,11 +542,22 @@ class CablePath(models.Model):
         if len(terminations) > 1 and not all(t.link == terminations[0].link for t in terminations[1:]):
             raise UnsupportedCablePath(_("All originating terminations must be attached to the same link"))
 
-        path = []
-        position_stack = []
+        return cls._trace(terminations, graph=graph)
+
+    @classmethod
+    def _trace(cls, terminations, path=None, position_stack=None, is_active=True, is_split=False, graph=None):
+        """
+        Trace a path hop by hop beginning with the given near-end terminations. If the leading portion of an existing
+        path is provided (along with the position stack and status accumulated over it), the trace resumes from that
+        point rather than from the path's origin.
+        """
+        from circuits.models import CircuitTermination
+        from dcim.cablegraph import CableGraph
+
+        graph = graph or CableGraph()
+        path = path or []
+        position_stack = position_stack or []
         is_complete = False
-        is_active = True
-        is_split = False
 
         while terminations:
 
@@ -549,12 +567,12 @@ class CablePath(models.Model):
 
             # All mid-span terminations must all be attached to the same device
             if (not isinstance(terminations[0], PathEndpoint) and not
-                    all(t.parent_object == terminations[0].parent_object for t in terminations[1:])):
+                    all(graph.get_parent_id(t) == graph.get_parent_id(terminations[0]) for t in terminations[1:])):
                 raise UnsupportedCablePath(_("All mid-span terminations must have the same parent object"))
 
             # Check for a split path (e.g. rear port fanning out to multiple front ports with
             # different cables attached)
-            if len(set(t.link for t in terminations)) > 1 and (
+            if len(set(graph.get_link(t) for t in terminations)) > 1 and (
                     position_stack and len(terminations) != len(position_stack[-1])
             ):
                 is_split = True
@@ -566,7 +584,7 @@ class CablePath(models.Model):
             ])
 
             # Step 2: Determine the attached links (Cable or WirelessLink), if any
-            links = [termination.link for termination in terminations if termination.link is not None]
+            links = [link for link in (graph.get_link(t) for t in terminations) if link is not None]
             if len(links) == 0:
                 if len(path) == 1:
                     # If this is the start of the path and no link exists, return None
@@ -579,7 +597,7 @@ class CablePath(models.Model):
                 raise UnsupportedCablePath(_("All links must match first link type"))
 
             # Step 3: Record asymmetric paths as split
-            not_connected_terminations = [termination.link for termination in terminations if termination.link is None]
+            not_connected_terminations = [t for t in terminations if graph.get_link(t) is None]
             if len(not_connected_terminations) > 0:
                 is_complete = False
                 is_split = True
@@ -598,23 +616,11 @@ class CablePath(models.Model):
 
             # Step 6: Determine the far-end terminations
             if isinstance(links[0], Cable):
-                termination_type = ObjectType.objects.get_for_model(terminations[0])
-                local_cable_terminations = CableTermination.objects.filter(
-                    termination_type=termination_type,
-                    termination_id__in=[t.pk for t in terminations]
-                )
-
-                q_filter = Q()
-                for lct in local_cable_terminations:
-                    cable_end = 'A' if lct.cable_end == 'B' else 'B'
-                    q_filter |= Q(cable=lct.cable, cable_end=cable_end)
+                remote_terminations = graph.get_far_end(terminations)
 
-                # Make sure this filter has been populated; if not, we have probably been given invalid data
-                if not q_filter:
+                # If no CableTerminations were found, we have probably been given invalid data
+                if remote_terminations is None:
                     break
-
-                remote_cable_terminations = CableTermination.objects.filter(q_filter)
-                remote_terminations = [ct.termination for ct in remote_cable_terminations]
             else:
                 # WirelessLink
                 remote_terminations = [
@@ -638,20 +644,16 @@ class CablePath(models.Model):
 
             if isinstance(remote_terminations[0], FrontPort):
                 # Follow FrontPorts to their corresponding RearPorts
-                rear_ports = RearPort.objects.filter(
-                    pk__in=[t.rear_port_id for t in remote_terminations]
-                )
+                rear_ports = graph.get_rear_ports(remote_terminations)
                 if len(rear_ports) > 1 or rear_ports[0].positions > 1:
                     position_stack.append([fp.rear_port_position for fp in remote_terminations])
 
                 terminations = rear_ports
 
             elif isinstance(remote_terminations[0], RearPort):
+                mapped_front_ports = graph.get_front_ports(remote_terminations)
                 if len(remote_terminations) == 1 and remote_terminations[0].positions == 1:
-                    front_ports = FrontPort.objects.filter(
-                        rear_port_id__in=[rp.pk for rp in remote_terminations],
-                        rear_port_position=1
-                    )
+                    front_ports = [fp for fp in mapped_front_ports if fp.rear_port_position == 1]
                 # Obtain the individual front ports based on the termination and all positions
                 elif len(remote_terminations) > 1 and position_stack:
                     positions = position_stack.pop()
@@ -663,22 +665,20 @@ class CablePath(models.Model):
                         )
 
                     # Get our front ports
-                    q_filter = Q()
-                    for rt in remote_terminations:
-                        position = positions.pop()
-                        q_filter |= Q(rear_port_id=rt.pk, rear_port_position=position)
-                    if q_filter is Q():
-                        raise UnsupportedCablePath(_("Remote termination position filter is missing"))
-                    front_ports = FrontPort.objects.filter(q_filter)
+                    port_positions = {(rt.pk, positions.pop()) for rt in remote_terminations}
+                    front_ports = [
+                        fp for fp in mapped_front_ports if (fp.rear_port_id, fp.rear_port_position) in port_positions
+                    ]
                 # Obtain the individual front ports based on the termination and position
                 elif position_stack:
-                    front_ports = FrontPort.objects.filter(
-                        rear_port_id=remote_terminations[0].pk,
-                        rear_port_position__in=position_stack.pop()
-                    )
+                    positions = position_stack.pop()
+                    front_ports = [
+                        fp for fp in mapped_front_ports
+                        if fp.rear_port_id == remote_terminations[0].pk and fp.rear_port_position in positions
+                    ]
                 # If all rear ports have a single position, we can just get the front ports
                 elif all([rp.positions == 1 for rp in remote_terminations]):
-                    front_ports = FrontPort.objects.filter(rear_port_id__in=[rp.pk for rp in remote_terminations])
+                    front_ports = mapped_front_ports
 
                     if len(front_ports) != len(remote_terminations):
                         # Some rear ports does not have a front port
@@ -696,10 +696,7 @@ class CablePath(models.Model):
                 if len(remote_terminations) > 1:
                     is_split = True
                     break
-                circuit_termination = CircuitTermination.objects.filter(
-                    circuit=remote_terminations[0].circuit,
-                    term_side='Z' if remote_terminations[0].term_side == 'A' else 'A'
-                ).first()
+                circuit_termination = graph.get_peer_circuit_termination(remote_terminations[0])
                 if circuit_termination is None:
                     break
                 elif circuit_termination._provider_network:
@@ -739,21 +736,109 @@ class CablePath(models.Model):
             is_split=is_split
         )
 
-    def retrace(self):
+    def retrace(self, graph=None):
         """
         Retrace the path from the currently-defined originating termination(s)
         """
-        _new = self.from_origin(self.origins)
-        if _new:
-            self.path = _new.path
-            self.is_complete = _new.is_complete
-            self.is_active = _new.is_active
-            self.is_split = _new.is_split
-            self.save()
-        else:
-            self.delete()
+        self._update_from_trace(self.from_origin(self.origins, graph=graph))
     retrace.alters_data = True
 
+    def retrace_from(self, nodes, graph=None):
+        """
+        Retrace only the portion of the path beginning with the first hop which includes any of the given nodes
+        (compiled path node strings). The preceding hops are reused as stored, so the objects they reference are
+        fetched once in bulk rather than being traced hop by hop. Falls back to a full retrace if the trace state
+        cannot be reconstructed from the stored path.
+        """
+        from circuits.models import CircuitTermination
+
+        hop = None
+        for i, step in enumerate(self.path):
+            if any(node in nodes for node in step):
+                hop = i // 3
+                break
+        if hop is None:
+            return
+
+        # How a hop leading to a CircuitTermination concludes depends on the state of that termination, so resume
+        # from the preceding hop instead
+        circuittermination_type = ObjectType.objects.get_for_model(CircuitTermination)
+        while hop and decompile_path_node(self.path[hop * 3][0])[0] == circuittermination_type.pk:
+            hop -= 1
+        if not hop:
+            return self.retrace(graph=graph)
+
+        # Fetch all objects up to and including the near-end terminations of the affected hop
+        index = hop * 3
+        steps = self._get_path_objects(self.path[:index + 1])
+        if steps is None:
+            return self.retrace(graph=graph)
+
+        # Replay the stored hops to reconstruct the trace state at the point of resumption
+        position_stack = []
+        is_active = True
+        is_split = False
+        for i in range(0, index, 3):
+            near_end, links, far_end, next_hop = steps[i:i + 4]
+            if any(t.cable_id is None and getattr(t, 'wireless_link_id', None) is None for t in near_end):
+                is_split = True
+            if any(link.status != LinkStatusChoices.STATUS_CONNECTED for link in links):
+                is_active = False
+            if isinstance(far_end[0], FrontPort):
+                if len(next_hop) > 1 or next_hop[0].positions > 1:
+                    position_stack.append([fp.rear_port_position for fp in far_end])
+            elif isinstance(far_end[0], RearPort):
+                if position_stack and not (len(far_end) == 1 and far_end[0].positions == 1):
+                    position_stack.pop()
+
+        self._update_from_trace(self._trace(
+            steps[index],
+            path=[list(step) for step in self.path[:index]],
+            position_stack=position_stack,
+            is_active=is_active,
+            is_split=is_split,
+            graph=graph
+        ))
+    retrace_from.alters_data = True
+
+    def _update_from_trace(self, cablepath):
+        """
+        Apply the result of a trace to this CablePath, saving it only if it has changed. If the trace produced no
+        path, delete this CablePath.
+        """
+        if cablepath is None:
+            self.delete()
+            return
+        attrs = ('path', 'is_complete', 'is_active', 'is_split')
+        if all(getattr(self, attr) == getattr(cablepath, attr) for attr in attrs):
+            return
+        for attr in attrs:
+            setattr(self, attr, getattr(cablepath, attr))
+        self.save()
+
+    @staticmethod
+    def _get_path_objects(path):
+        """
+        Resolve the nodes of a (partial) path to their objects using one query per object type. Returns None if any
+        node no longer exists.
+        """
+        nodes_by_type = defaultdict(set)
+        for step in path:
+            for node in step:
+                ct_id, object_id = decompile_path_node(node)
+                nodes_by_type[ct_id].add(object_id)
+
+        objects = {}
+        for ct_id, object_ids in nodes_by_type.items():
+            model = ObjectType.objects.get_for_id(ct_id).model_class()
+            for obj in model.objects.filter(pk__in=object_ids):
+                objects[compile_path_node(ct_id, obj.pk)] = obj
+
+        try:
+            return [[objects[node] for node in step] for step in path]
+        except KeyError:
+            return None
+
     def get_cable_ids(self):
         """
         Return all Cable IDs within the path.
@@ -1,7 +1,10 @@
+from collections import defaultdict
+
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.core.exceptions import ValidationError
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
+from django.db.models import prefetch_related_objects
 from django.utils.translation import gettext_lazy as _
 from mptt.models import MPTTModel, TreeForeignKey
 
@@ -378,10 +381,18 @@ class PowerOutletTemplate(ModularComponentTemplateModel):
                     )
                 )
 
-    def instantiate(self, **kwargs):
+    def instantiate(self, power_ports=None, **kwargs):
+        """
+        Args:
+            power_ports: An optional mapping of names to the parent's PowerPorts, used to resolve the assigned power
+                         port without querying the database
+        """
         if self.power_port:
             power_port_name = self.power_port.resolve_name(kwargs.get('module'))
-            power_port = PowerPort.objects.get(name=power_port_name, **kwargs)
+            if power_ports is not None:
+                power_port = power_ports[power_port_name]
+            else:
+                power_port = PowerPort.objects.get(name=power_port_name, **kwargs)
         else:
             power_port = None
         return self.component_model(
@@ -589,10 +600,18 @@ class FrontPortTemplate(ModularComponentTemplateModel):
         except RearPortTemplate.DoesNotExist:
             pass
 
-    def instantiate(self, **kwargs):
+    def instantiate(self, rear_ports=None, **kwargs):
+        """
+        Args:
+            rear_ports: An optional mapping of names to the parent's RearPorts, used to resolve the assigned rear port
+                        without querying the database
+        """
         if self.rear_port:
             rear_port_name = self.rear_port.resolve_name(kwargs.get('module'))
-            rear_port = RearPort.objects.get(name=rear_port_name, **kwargs)
+            if rear_ports is not None:
+                rear_port = rear_ports[rear_port_name]
+            else:
+                rear_port = RearPort.objects.get(name=rear_port_name, **kwargs)
         else:
             rear_port = None
         return self.component_model(
@@ -820,3 +839,48 @@ class InventoryItemTemplate(MPTTModel, ComponentTemplateModel):
             **kwargs
         )
     instantiate.do_not_call_in_templates = True
+
+    @classmethod
+    def instantiate_tree(cls, templates, components=None, **kwargs):
+        """
+        Instantiate InventoryItems for a set of templates at once, resolving parents and assigned components in bulk
+        rather than querying for each item. Each item's parent is set to the (unsaved) item instantiated from its
+        template's parent, ready to be passed to bulk_create_tree().
+
+        Args:
+            templates: An iterable of InventoryItemTemplates
+            components: An optional mapping of (model, name) to the parent's components, used to resolve assigned
+                        components without querying the database
+        """
+        templates = list(templates)
+        prefetch_related_objects(templates, 'component')
+
+        # Retrieve the components to which items are to be assigned
+        if components is None:
+            component_names = defaultdict(set)
+            for template in templates:
+                if template.component:
+                    component_names[template.component.component_model].add(template.component.name)
+            components = {}
+            for model, names in component_names.items():
+                for component in model.objects.filter(name__in=names, **kwargs):
+                    components[(model, component.name)] = component
+
+        items = {
+            template.pk: cls.component_model(
+                name=template.name,
+                label=template.label,
+                component=components.get(
+                    (template.component.component_model, template.component.name)
+                ) if template.component else None,
+                role=template.role,
+                manufacturer=template.manufacturer,
+                part_id=template.part_id,
+                **kwargs
+            ) for template in templates
+        }
+        for template in templates:
+            if template.parent_id:
+                items[template.pk].parent = items[template.parent_id]
+
+        return list(items.values())
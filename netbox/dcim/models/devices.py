@@ -3,6 +3,7 @@ import yaml
 
 from functools import cached_property
 
+from django.apps import apps
 from django.contrib.contenttypes.fields import GenericForeignKey, GenericRelation
 from django.core.exceptions import ValidationError
 from django.core.files.storage import default_storage
@@ -14,6 +15,7 @@ from django.db.models.signals import post_save
 from django.urls import reverse
 from django.utils.safestring import mark_safe
 from django.utils.translation import gettext_lazy as _
+from mptt.models import MPTTModel
 
 from core.models import ObjectType
 from dcim.choices import *
@@ -216,6 +218,7 @@ class DeviceType(ImageAttachmentsMixin, PrimaryModel, WeightMixin):
 
         # Save a copy of u_height for validation in clean()
         self._original_u_height = self.__dict__.get('u_height')
+        self._original_exclude_from_utilization = self.__dict__.get('exclude_from_utilization')
 
         # Save references to the original front/rear images
         self._original_front_image = self.__dict__.get('front_image')
@@ -295,14 +298,19 @@ class DeviceType(ImageAttachmentsMixin, PrimaryModel, WeightMixin):
         # room to expand within their racks. This validation will impose a very high performance penalty when there are
         # many instances to check, but increasing the u_height of a DeviceType should be a very rare occurrence.
         if not self._state.adding and self.u_height > self._original_u_height:
-            for d in Device.objects.filter(device_type=self, position__isnull=False):
+            instances = Device.objects.filter(device_type=self, position__isnull=False).select_related('rack')
+            # Compute the occupancy of each rack once, omitting all instances of this DeviceType. Each instance is
+            # then checked at its new height and added back in turn.
+            occupancies = apps.get_model('dcim', 'Rack').get_occupancies(
+                {d.rack for d in instances},
+                exclude=[d.pk for d in instances]
+            )
+            for d in instances:
                 face_required = None if self.is_full_depth else d.face
-                u_available = d.rack.get_available_units(
-                    u_height=self.u_height,
-                    rack_face=face_required,
-                    exclude=[d.pk]
-                )
-                if d.position not in u_available:
+                occupancy = occupancies[d.rack_id]
+                if occupancy.fits(d.position, self.u_height, face=face_required):
+                    occupancy.occupy(d.position, self.u_height, face=d.face, is_full_depth=self.is_full_depth)
+                else:
                     raise ValidationError({
                         'u_height': _(
                             "Device {device} in rack {rack} does not have sufficient space to accommodate a "
@@ -706,6 +714,15 @@ class Device(
             return f'{self.device_type.manufacturer} {self.device_type.model} ({self.pk})'
         return super().__str__()
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        # Save a copy of the rack placement for updating cached rack utilization
+        self._original_rack_placement = self._get_rack_placement()
+
+    def _get_rack_placement(self):
+        return tuple(self.__dict__.get(field) for field in ('rack_id', 'position', 'face', 'device_type_id'))
+
     def clean(self):
         super().clean()
 
@@ -778,10 +795,9 @@ class Device(
                 # Validate rack space
                 rack_face = self.face if not self.device_type.is_full_depth else None
                 exclude_list = [self.pk] if self.pk else []
-                available_units = self.rack.get_available_units(
-                    u_height=self.device_type.u_height, rack_face=rack_face, exclude=exclude_list
-                )
-                if self.position and self.position not in available_units:
+                # A snapshot of the rack's occupancy may have been provided when validating devices in bulk
+                occupancy = getattr(self, '_rack_occupancy', None) or self.rack.get_occupancy(exclude=exclude_list)
+                if self.position and not occupancy.fits(self.position, self.device_type.u_height, face=rack_face):
                     raise ValidationError({
                         'position': _(
                             "U{position} is already occupied or does not have sufficient space to accommodate this "
@@ -895,14 +911,21 @@ class Device(
         model = queryset.model.component_model
 
         if bulk_create:
-            components = [obj.instantiate(device=self) for obj in queryset]
+            if issubclass(queryset.model, MPTTModel):
+                components = queryset.model.instantiate_tree(queryset, device=self)
+            else:
+                components = [obj.instantiate(device=self) for obj in queryset]
             if not components:
                 return
             # Set default values for any applicable custom fields
             if cf_defaults := CustomField.objects.get_defaults_for_model(model):
                 for component in components:
                     component.custom_field_data = cf_defaults
-            model.objects.bulk_create(components)
+            # MPTT models require their tree attributes to be computed prior to creation
+            if issubclass(model, MPTTModel):
+                model.objects.bulk_create_tree(components)
+            else:
+                model.objects.bulk_create(components)
             # Manually send the post_save signal for each of the newly created components
             for component in components:
                 post_save.send(
@@ -921,9 +944,7 @@ class Device(
                     component.custom_field_data = cf_defaults
                 component.save()
 
-    def save(self, *args, **kwargs):
-        is_new = not bool(self.pk)
-
+    def _inherit_attributes(self, is_new):
         # Inherit airflow attribute from DeviceType if not set
         if is_new and not self.airflow:
             self.airflow = self.device_type.airflow
@@ -936,6 +957,11 @@ class Device(
         if self.rack and self.rack.location:
             self.location = self.rack.location
 
+    def save(self, *args, **kwargs):
+        is_new = not bool(self.pk)
+
+        self._inherit_attributes(is_new)
+
         super().save(*args, **kwargs)
 
         # If this is a new Device, instantiate all the related components per the DeviceType definition
@@ -947,11 +973,9 @@ class Device(
             self._instantiate_components(self.device_type.interfacetemplates.all())
             self._instantiate_components(self.device_type.rearporttemplates.all())
             self._instantiate_components(self.device_type.frontporttemplates.all())
-            # Disable bulk_create to accommodate MPTT
-            self._instantiate_components(self.device_type.modulebaytemplates.all(), bulk_create=False)
+            self._instantiate_components(self.device_type.modulebaytemplates.all())
             self._instantiate_components(self.device_type.devicebaytemplates.all())
-            # Disable bulk_create to accommodate MPTT
-            self._instantiate_components(self.device_type.inventoryitemtemplates.all(), bulk_create=False)
+            self._instantiate_components(self.device_type.inventoryitemtemplates.all())
             # Interface bridges have to be set after interface instantiation
             update_interface_bridges(self, self.device_type.interfacetemplates.all())
 
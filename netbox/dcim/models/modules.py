@@ -327,23 +327,24 @@ class Module(PrimaryModel, ConfigContextModel):
                 for component in create_instances:
                     component.custom_field_data = cf_defaults
 
-            if component_model is not ModuleBay:
-                component_model.objects.bulk_create(create_instances)
-                # Emit the post_save signal for each newly created object
-                for component in create_instances:
-                    post_save.send(
-                        sender=component_model,
-                        instance=component,
-                        created=True,
-                        raw=False,
-                        using='default',
-                        update_fields=None
-                    )
-            else:
-                # ModuleBays must be saved individually for MPTT
+            if component_model is ModuleBay:
+                # ModuleBays are nested beneath the bay in which the module is installed
                 for instance in create_instances:
                     instance.name = instance.name.replace(MODULE_TOKEN, str(self.module_bay.position))
-                    instance.save()
+                    instance.parent = self.module_bay
+                component_model.objects.bulk_create_tree(create_instances)
+            else:
+                component_model.objects.bulk_create(create_instances)
+            # Emit the post_save signal for each newly created object
+            for component in create_instances:
+                post_save.send(
+                    sender=component_model,
+                    instance=component,
+                    created=True,
+                    raw=False,
+                    using='default',
+                    update_fields=None
+                )
 
             update_fields = ['module']
             component_model.objects.bulk_update(update_instances, update_fields)
@@ -165,6 +165,12 @@ class PowerFeed(PrimaryModel, PathEndpoint, CabledObjectModel):
     def __str__(self):
         return self.name
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        # Save a copy of the rack assignment for updating cached rack power utilization
+        self._original_rack_id = self.__dict__.get('rack_id')
+
     def clean(self):
         super().clean()
 
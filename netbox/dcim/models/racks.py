@@ -12,6 +12,7 @@ from django.utils.translation import gettext_lazy as _
 
 from dcim.choices import *
 from dcim.constants import *
+from dcim.occupancy import RackOccupancy
 from dcim.svg import RackElevationSVG
 from netbox.choices import ColorChoices
 from netbox.models import OrganizationalModel, PrimaryModel
@@ -325,6 +326,34 @@ class Rack(ContactsMixin, ImageAttachmentsMixin, RackBase):
         null=True
     )
 
+    # Cached space & power utilization
+    _occupied_units = models.DecimalField(
+        max_digits=4,
+        decimal_places=1,
+        default=0,
+        editable=False
+    )
+    _utilization = models.DecimalField(
+        max_digits=5,
+        decimal_places=2,
+        default=0,
+        editable=False
+    )
+    _allocated_power = models.PositiveBigIntegerField(
+        default=0,
+        editable=False
+    )
+    _available_power = models.PositiveBigIntegerField(
+        default=0,
+        editable=False
+    )
+    _power_utilization = models.DecimalField(
+        max_digits=8,
+        decimal_places=2,
+        default=0,
+        editable=False
+    )
+
     # Generic relations
     vlan_groups = GenericRelation(
         to='ipam.VLANGroup',
@@ -355,6 +384,10 @@ class Rack(ContactsMixin, ImageAttachmentsMixin, RackBase):
                 name='%(app_label)s_%(class)s_unique_location_facility_id'
             ),
         )
+        indexes = (
+            models.Index(fields=('_utilization',)),
+            models.Index(fields=('_power_utilization',)),
+        )
         verbose_name = _('rack')
         verbose_name_plural = _('racks')
 
@@ -446,7 +479,8 @@ class Rack(ContactsMixin, ImageAttachmentsMixin, RackBase):
     def get_status_color(self):
         return RackStatusChoices.colors.get(self.status)
 
-    def get_rack_units(self, user=None, face=DeviceFaceChoices.FACE_FRONT, exclude=None, expand_devices=True):
+    def get_rack_units(self, user=None, face=DeviceFaceChoices.FACE_FRONT, exclude=None, expand_devices=True,
+                       devices=None):
         """
         Return a list of rack units as dictionaries. Example: {'device': None, 'face': 0, 'id': 48, 'name': 'U48'}
         Each key 'device' is either a Device or None. By default, multi-U devices are repeated for each U they occupy.
@@ -458,6 +492,8 @@ class Rack(ContactsMixin, ImageAttachmentsMixin, RackBase):
         :param expand_devices: When True, all units that a device occupies will be listed with each containing a
             reference to the device. When False, only the bottom most unit for a device is included and that unit
             contains a height attribute for the device
+        :param devices: An iterable of all Devices installed within the rack, annotated with devicebay_count
+            (optional). If specified, these are used instead of querying the database.
         """
         elevation = {}
         for u in self.units:
@@ -474,21 +510,29 @@ class Rack(ContactsMixin, ImageAttachmentsMixin, RackBase):
         if not self._state.adding:
 
             # Retrieve all devices installed within the rack
-            devices = Device.objects.prefetch_related(
-                'device_type',
-                'device_type__manufacturer',
-                'role'
-            ).annotate(
-                devicebay_count=Count('devicebays')
-            ).exclude(
-                pk=exclude
-            ).filter(
-                rack=self,
-                position__gt=0,
-                device_type__u_height__gt=0
-            ).filter(
-                Q(face=face) | Q(device_type__is_full_depth=True)
-            )
+            if devices is not None:
+                devices = [
+                    device for device in devices
+                    if device.pk != exclude and device.position and device.device_type.u_height and (
+                        device.face == face or device.device_type.is_full_depth
+                    )
+                ]
+            else:
+                devices = Device.objects.prefetch_related(
+                    'device_type',
+                    'device_type__manufacturer',
+                    'role'
+                ).annotate(
+                    devicebay_count=Count('devicebays')
+                ).exclude(
+                    pk=exclude
+                ).filter(
+                    rack=self,
+                    position__gt=0,
+                    device_type__u_height__gt=0
+                ).filter(
+                    Q(face=face) | Q(device_type__is_full_depth=True)
+                )
 
             # Determine which devices the user has permission to view
             permitted_device_ids = []
@@ -509,45 +553,71 @@ class Rack(ContactsMixin, ImageAttachmentsMixin, RackBase):
 
         return [u for u in elevation.values()]
 
-    def get_available_units(self, u_height=1, rack_face=None, exclude=None, ignore_excluded_devices=False):
+    @staticmethod
+    def get_occupancies(racks, exclude=None, ignore_excluded_devices=False, include_reservations=False):
         """
-        Return a list of units within the rack available to accommodate a device of a given U height (default 1).
-        Optionally exclude one or more devices when calculating empty units (needed when moving a device from one
-        position to another within a rack).
+        Return a dictionary mapping the PK of each of the given racks to a RackOccupancy representing the space
+        consumed by its devices. Devices (and reservations) are retrieved for all racks at once.
 
-        :param u_height: Minimum number of contiguous free units required
-        :param rack_face: The face of the rack (front or rear) required; 'None' if device is full depth
+        :param racks: An iterable of Racks
         :param exclude: List of devices IDs to exclude (useful when moving a device within a rack)
         :param ignore_excluded_devices: Ignore devices that are marked to exclude from utilization calculations
+        :param include_reservations: Also record any reserved units
         """
-        # Gather all devices which consume U space within the rack
-        devices = self.devices.prefetch_related('device_type').filter(position__gte=1)
+        occupancies = {rack.pk: RackOccupancy(rack.starting_unit, rack.u_height) for rack in racks}
+
+        # Gather all devices which consume U space within the racks
+        devices = Device.objects.filter(
+            rack__in=occupancies.keys(),
+            position__gte=1
+        )
         if ignore_excluded_devices:
             devices = devices.exclude(device_type__exclude_from_utilization=True)
-
         if exclude is not None:
             devices = devices.exclude(pk__in=exclude)
+        for rack_id, position, face, u_height, is_full_depth in devices.values_list(
+            'rack', 'position', 'face', 'device_type__u_height', 'device_type__is_full_depth'
+        ):
+            occupancies[rack_id].occupy(position, u_height, face=face, is_full_depth=is_full_depth)
+
+        if include_reservations:
+            for rack_id, units in RackReservation.objects.filter(
+                rack__in=occupancies.keys()
+            ).values_list('rack', 'units'):
+                occupancies[rack_id].reserve(units)
+
+        return occupancies
 
-        # Initialize the rack unit skeleton
-        units = list(self.units)
+    def get_occupancy(self, exclude=None, ignore_excluded_devices=False, include_reservations=False):
+        """
+        Return a RackOccupancy representing the space consumed within the rack. See get_occupancies().
+        """
+        return self.get_occupancies(
+            [self],
+            exclude=exclude,
+            ignore_excluded_devices=ignore_excluded_devices,
+            include_reservations=include_reservations
+        )[self.pk]
+
+    def get_available_units(self, u_height=1, rack_face=None, exclude=None, ignore_excluded_devices=False):
+        """
+        Return a list of units within the rack available to accommodate a device of a given U height (default 1).
+        Optionally exclude one or more devices when calculating empty units (needed when moving a device from one
+        position to another within a rack).
 
-        # Remove units consumed by installed devices
-        for d in devices:
-            if rack_face is None or d.face == rack_face or d.device_type.is_full_depth:
-                for u in drange(d.position, d.position + d.device_type.u_height, 0.5):
-                    try:
-                        units.remove(u)
-                    except ValueError:
-                        # Found overlapping devices in the rack!
-                        pass
+        :param u_height: Minimum number of contiguous free units required
+        :param rack_face: The face of the rack (front or rear) required; 'None' if device is full depth
+        :param exclude: List of devices IDs to exclude (useful when moving a device within a rack)
+        :param ignore_excluded_devices: Ignore devices that are marked to exclude from utilization calculations
+        """
+        occupancy = self.get_occupancy(exclude=exclude, ignore_excluded_devices=ignore_excluded_devices)
+        available_units = occupancy.get_available_positions(u_height=u_height, face=rack_face)
 
-        # Remove units without enough space above them to accommodate a device of the specified height
-        available_units = []
-        for u in units:
-            if set(drange(u, u + decimal.Decimal(u_height), 0.5)).issubset(units):
-                available_units.append(u)
+        # Order units bottom to top, or top to bottom if units are numbered in descending order
+        if self.desc_units:
+            available_units.reverse()
 
-        return list(reversed(available_units))
+        return available_units
 
     def get_reserved_units(self):
         """
@@ -569,7 +639,8 @@ class Rack(ContactsMixin, ImageAttachmentsMixin, RackBase):
             margin_width=RACK_ELEVATION_DEFAULT_MARGIN_WIDTH,
             include_images=True,
             base_url=None,
-            highlight_params=None
+            highlight_params=None,
+            snapshot=None
     ):
         """
         Return an SVG of the rack elevation
@@ -584,6 +655,7 @@ class Rack(ContactsMixin, ImageAttachmentsMixin, RackBase):
         :param margin_width: Width of the rigth-hand margin, in pixels
         :param include_images: Embed front/rear device images where available
         :param base_url: Base URL for links and images. If none, URLs will be relative.
+        :param snapshot: A RackElevationSnapshot from which to draw the rack's devices and reservations (optional)
         """
         elevation = RackElevationSVG(
             self,
@@ -594,7 +666,8 @@ class Rack(ContactsMixin, ImageAttachmentsMixin, RackBase):
             user=user,
             include_images=include_images,
             base_url=base_url,
-            highlight_params=highlight_params
+            highlight_params=highlight_params,
+            snapshot=snapshot
         )
 
         return elevation.render(face)
@@ -607,29 +680,22 @@ class Rack(ContactsMixin, ImageAttachmentsMixin, RackBase):
         Determine the utilization rate of the rack and return it as a percentage. Occupied and reserved units both count
         as utilized.
         """
-        # Determine unoccupied units
-        total_units = len(list(self.units))
-        available_units = self.get_available_units(u_height=0.5, ignore_excluded_devices=True)
-
-        # Remove reserved units
-        for ru in self.get_reserved_units():
-            for u in drange(ru, ru + 1, 0.5):
-                if u in available_units:
-                    available_units.remove(u)
-
-        occupied_unit_count = total_units - len(available_units)
-        percentage = float(occupied_unit_count) / total_units * 100
+        occupancy = self.get_occupancy(ignore_excluded_devices=True, include_reservations=True)
 
-        return percentage
+        return occupancy.get_utilization()
 
-    def get_power_utilization(self):
+    def get_power_draw(self):
         """
-        Determine the utilization rate of power in the rack and return it as a percentage.
+        Return the total power (in VA) allocated to PowerPorts connected to the rack's PowerFeeds, and the total power
+        available from those PowerFeeds.
         """
         powerfeeds = PowerFeed.objects.filter(rack=self)
         available_power_total = sum(pf.available_power for pf in powerfeeds)
         if not available_power_total:
-            return 0
+            return {
+                'allocated': 0,
+                'available': 0,
+            }
 
         powerports = []
         for powerfeed in powerfeeds:
@@ -641,7 +707,28 @@ class Rack(ContactsMixin, ImageAttachmentsMixin, RackBase):
             powerport.get_power_draw()['allocated'] for powerport in powerports
         ])
 
-        return round(allocated_draw / available_power_total * 100, 1)
+        return {
+            'allocated': allocated_draw,
+            'available': available_power_total,
+        }
+
+    def get_power_utilization(self):
+        """
+        Determine the utilization rate of power in the rack and return it as a percentage.
+        """
+        power_draw = self.get_power_draw()
+        if not power_draw['available']:
+            return 0
+
+        return round(power_draw['allocated'] / power_draw['available'] * 100, 1)
+
+    @property
+    def utilization(self):
+        return self._utilization
+
+    @property
+    def power_utilization(self):
+        return self._power_utilization
 
     @cached_property
     def total_weight(self):
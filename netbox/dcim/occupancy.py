@@ -0,0 +1,120 @@
+import decimal
+
+from dcim.choices import DeviceFaceChoices
+
+__all__ = (
+    'RackOccupancy',
+)
+
+
+class RackOccupancy:
+    """
+    A bitmap of the space consumed within a rack, at a resolution of half a rack unit. Bit n represents the half-unit
+    beginning n/2 units above the rack's starting unit. Space is tracked separately for each face of the rack (a
+    full-depth device occupies both), for the rack as a whole, and for reservations.
+
+    Because each mask is a single integer, the positions available to a device of any height are found with a handful
+    of bitwise operations rather than by testing every candidate unit.
+
+    :param starting_unit: The number of the rack's lowest unit
+    :param u_height: The height of the rack, in units
+    """
+    def __init__(self, starting_unit, u_height):
+        self.starting_unit = decimal.Decimal(starting_unit)
+        self.slots = int(u_height * 2)
+        self.full_mask = (1 << self.slots) - 1
+        self.face_masks = {
+            DeviceFaceChoices.FACE_FRONT: 0,
+            DeviceFaceChoices.FACE_REAR: 0,
+        }
+        self.mask = 0
+        self.reserved_mask = 0
+
+    def __repr__(self):
+        return f'<RackOccupancy: {self.mask.bit_count()}/{self.slots} half-units occupied>'
+
+    @staticmethod
+    def _get_slot_count(u_height):
+        # A device with no height still requires its position to be unoccupied
+        return max(int(decimal.Decimal(u_height) * 2), 1)
+
+    def _get_slot(self, position):
+        return int((decimal.Decimal(position) - self.starting_unit) * 2)
+
+    def _get_bits(self, position, u_height):
+        """
+        Return the bits representing the units spanned by an object at the given position, clipped to the rack.
+        """
+        bits = (1 << self._get_slot_count(u_height)) - 1
+        slot = self._get_slot(position)
+        bits = bits << slot if slot >= 0 else bits >> -slot
+        return bits & self.full_mask
+
+    def _get_position(self, slot):
+        return self.starting_unit + decimal.Decimal(slot) / 2
+
+    def occupy(self, position, u_height, face=None, is_full_depth=False):
+        """
+        Mark the units consumed by a device as occupied.
+        """
+        bits = self._get_bits(position, u_height)
+        self.mask |= bits
+        for rack_face in self.face_masks:
+            if is_full_depth or face == rack_face:
+                self.face_masks[rack_face] |= bits
+
+    def reserve(self, units):
+        """
+        Mark the specified (whole) units as reserved.
+        """
+        for u in units:
+            self.reserved_mask |= self._get_bits(u, 1)
+
+    def get_mask(self, face=None, include_reserved=False):
+        """
+        Return the mask of occupied units on the given face of the rack, or on either face if none is specified.
+        """
+        mask = self.mask if face is None else self.face_masks[face]
+        if include_reserved:
+            mask |= self.reserved_mask
+        return mask
+
+    def get_available_mask(self, u_height=1, face=None, include_reserved=False):
+        """
+        Return a mask of the positions at which a device of the given height would fit.
+        """
+        free = ~self.get_mask(face, include_reserved) & self.full_mask
+        available = free
+        for i in range(1, self._get_slot_count(u_height)):
+            available &= free >> i
+        return available
+
+    def get_available_positions(self, u_height=1, face=None, include_reserved=False):
+        """
+        Return a list of the positions (in ascending order) at which a device of the given height would fit.
+        """
+        available = self.get_available_mask(u_height, face, include_reserved)
+        return [self._get_position(slot) for slot in range(self.slots) if available >> slot & 1]
+
+    def fits(self, position, u_height=1, face=None, include_reserved=False):
+        """
+        Return True if a device of the given height would fit at the specified position.
+        """
+        slot = self._get_slot(position)
+        if slot < 0 or slot + self._get_slot_count(u_height) > self.slots:
+            return False
+        return not self._get_bits(position, u_height) & self.get_mask(face, include_reserved)
+
+    def get_occupied_units(self):
+        """
+        Return the number of units which are either occupied or reserved.
+        """
+        return decimal.Decimal((self.mask | self.reserved_mask).bit_count()) / 2
+
+    def get_utilization(self):
+        """
+        Return the percentage of the rack which is either occupied or reserved.
+        """
+        if not self.slots:
+            return 0
+        return float((self.mask | self.reserved_mask).bit_count()) / self.slots * 100
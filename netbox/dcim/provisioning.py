@@ -0,0 +1,199 @@
+from collections import defaultdict
+
+from django.core.exceptions import ValidationError
+from django.utils.translation import gettext as _
+from mptt.models import MPTTModel
+
+from core.models import ObjectType
+from core.signals import record_created_objects
+from dcim.models import *
+from dcim.utils import enqueue_rack_utilization_update
+from extras.models import CustomField, TaggedItem
+from utilities.counters import get_counters_for_model
+
+__all__ = (
+    'provision_devices',
+    'validate_devices',
+)
+
+# Component templates in order of instantiation: components referenced by others (e.g. the PowerPort assigned to a
+# PowerOutlet) must be created first.
+COMPONENT_TEMPLATE_MODELS = (
+    ConsolePortTemplate,
+    ConsoleServerPortTemplate,
+    PowerPortTemplate,
+    PowerOutletTemplate,
+    InterfaceTemplate,
+    RearPortTemplate,
+    FrontPortTemplate,
+    ModuleBayTemplate,
+    DeviceBayTemplate,
+    InventoryItemTemplate,
+)
+
+# Related objects consulted when instantiating components from each type of template
+TEMPLATE_PREFETCHES = {
+    PowerOutletTemplate: ('power_port',),
+    InterfaceTemplate: ('bridge',),
+    FrontPortTemplate: ('rear_port',),
+    InventoryItemTemplate: ('component',),
+}
+
+
+def validate_devices(devices):
+    """
+    Validate a batch of new Devices. Each Device is validated with full_clean(), except that rack placement is checked
+    against a single snapshot of the occupancy of all affected racks, which accounts for the devices earlier in the
+    batch. Names, asset tags, and virtual chassis positions must also be unique within the batch.
+
+    Returns a list of dictionaries mapping field names to error messages, one for each device (empty if valid).
+    """
+    racks = {device.rack.pk: device.rack for device in devices if device.rack}
+    occupancies = Rack.get_occupancies(racks.values())
+    errors = []
+    seen = defaultdict(set)
+
+    for device in devices:
+        device_errors = {}
+        device._rack_occupancy = occupancies.get(device.rack_id)
+        try:
+            device.full_clean()
+        except ValidationError as e:
+            device_errors.update(e.message_dict)
+
+        # Enforce uniqueness among the devices in the batch
+        unique_values = {
+            'name': (device.name.lower(), device.site_id, device.tenant_id) if device.name else None,
+            'asset_tag': device.asset_tag,
+            'vc_position': (device.virtual_chassis_id, device.vc_position) if device.virtual_chassis_id else None,
+        }
+        for field_name, value in unique_values.items():
+            if value is None:
+                continue
+            if value in seen[field_name]:
+                device_errors.setdefault(field_name, []).append(
+                    _("Duplicate {field} within the batch.").format(field=field_name)
+                )
+            seen[field_name].add(value)
+
+        # Record the space consumed by the device
+        if not device_errors and device.rack_id and device.position:
+            device._rack_occupancy.occupy(
+                device.position,
+                device.device_type.u_height,
+                face=device.face,
+                is_full_depth=device.device_type.is_full_depth
+            )
+        del device._rack_occupancy
+
+        errors.append(device_errors)
+
+    return errors
+
+
+def provision_devices(devices, tags=None):
+    """
+    Create a batch of new Devices (which should first be validated with validate_devices()) along with their
+    components. All Devices are created at once, followed by the components of all Devices, one model at a time.
+
+    As with bulk_create(), no post_save signals are sent. Instead, the changes which would have been recorded by their
+    receivers (change records, events, search cache entries, component counters, and rack utilization) are written in
+    bulk.
+
+    Args:
+        devices: A list of unsaved Devices
+        tags: An optional list of the Tags to be assigned to each Device
+    """
+    if not devices:
+        return devices
+    device_types = {device.device_type.pk: device.device_type for device in devices}
+
+    # Retrieve the component templates for all device types
+    templates = {}
+    for template_model in COMPONENT_TEMPLATE_MODELS:
+        templates[template_model] = defaultdict(list)
+        queryset = template_model.objects.filter(device_type__in=device_types)
+        for template in queryset.prefetch_related(*TEMPLATE_PREFETCHES.get(template_model, ())):
+            templates[template_model][template.device_type_id].append(template)
+
+    # Create the devices, populating their component counters in advance
+    counters = {}
+    for template_model in COMPONENT_TEMPLATE_MODELS:
+        for field_name, counter_name in get_counters_for_model(template_model.component_model):
+            if field_name == 'device_id':
+                counters[counter_name] = templates[template_model]
+    for device in devices:
+        device._inherit_attributes(is_new=True)
+        for counter_name, device_type_templates in counters.items():
+            setattr(device, counter_name, len(device_type_templates[device.device_type_id]))
+    Device.objects.bulk_create(devices)
+    created = {Device: devices}
+
+    # Assign tags
+    if tags:
+        object_type = ObjectType.objects.get_for_model(Device)
+        TaggedItem.objects.bulk_create([
+            TaggedItem(tag=tag, content_type=object_type, object_id=device.pk)
+            for device, device_tags in zip(devices, tags) for tag in device_tags
+        ])
+
+    # Create components. These are indexed by device, model, and name to resolve references among them.
+    components = defaultdict(lambda: defaultdict(dict))
+    for template_model in COMPONENT_TEMPLATE_MODELS:
+        model = template_model.component_model
+        instances = []
+        for device in devices:
+            device_templates = templates[template_model][device.device_type_id]
+            device_components = components[device.pk]
+            if not device_templates:
+                continue
+            if template_model is InventoryItemTemplate:
+                instances.extend(template_model.instantiate_tree(
+                    device_templates,
+                    components={
+                        (component_model, name): component
+                        for component_model, by_name in device_components.items()
+                        for name, component in by_name.items()
+                    },
+                    device=device
+                ))
+            elif template_model is PowerOutletTemplate:
+                instances.extend(
+                    t.instantiate(device=device, power_ports=device_components[PowerPort]) for t in device_templates
+                )
+            elif template_model is FrontPortTemplate:
+                instances.extend(
+                    t.instantiate(device=device, rear_ports=device_components[RearPort]) for t in device_templates
+                )
+            else:
+                instances.extend(t.instantiate(device=device) for t in device_templates)
+        if not instances:
+            continue
+
+        # Set default values for any applicable custom fields
+        if cf_defaults := CustomField.objects.get_defaults_for_model(model):
+            for instance in instances:
+                instance.custom_field_data = cf_defaults
+        if issubclass(model, MPTTModel):
+            model.objects.bulk_create_tree(instances)
+        else:
+            model.objects.bulk_create(instances)
+        for instance in instances:
+            components[instance.device_id][model][instance.name] = instance
+        created[model] = instances
+
+    # Interface bridges can be assigned only once all interfaces have been created
+    bridged_interfaces = []
+    for device in devices:
+        interfaces = components[device.pk][Interface]
+        for template in templates[InterfaceTemplate][device.device_type_id]:
+            if template.bridge:
+                interface = interfaces[template.resolve_name(None)]
+                interface.bridge = interfaces[template.bridge.resolve_name(None)]
+                bridged_interfaces.append(interface)
+    Interface.objects.bulk_update(bridged_interfaces, ['bridge'])
+
+    record_created_objects(created)
+    enqueue_rack_utilization_update({device.rack_id for device in devices if device.position}, space=True)
+
+    return devices
@@ -3,12 +3,16 @@ import logging
 from django.db.models.signals import post_save, post_delete, pre_delete
 from django.dispatch import receiver
 
+from core.models import ObjectType
 from .choices import CableEndChoices, LinkStatusChoices
 from .models import (
-    Cable, CablePath, CableTermination, Device, FrontPort, PathEndpoint, PowerPanel, Rack, Location, VirtualChassis,
+    Cable, CablePath, CableTermination, Device, DeviceType, FrontPort, PathEndpoint, PowerFeed, PowerOutlet,
+    PowerPanel, PowerPort, Rack, RackReservation, Location, VirtualChassis,
 )
 from .models.cables import trace_paths
-from .utils import create_cablepath, rebuild_paths
+from .utils import (
+    create_cablepath, enqueue_rack_utilization_update, get_power_rack_ids, object_to_path_node, rebuild_paths,
+)
 
 
 #
@@ -113,8 +117,7 @@ def retrace_cable_paths(instance, **kwargs):
     """
     When a Cable is deleted, check for and update its connected endpoints
     """
-    for cablepath in CablePath.objects.filter(_nodes__contains=instance):
-        cablepath.retrace()
+    rebuild_paths([instance])
 
 
 @receiver(post_delete, sender=CableTermination)
@@ -125,11 +128,14 @@ def nullify_connected_endpoints(instance, **kwargs):
     model = instance.termination_type.model_class()
     model.objects.filter(pk=instance.termination_id).update(cable=None, cable_end='')
 
+    cable_node = object_to_path_node(instance.cable)
     for cablepath in CablePath.objects.filter(_nodes__contains=instance.cable):
         # Remove the deleted CableTermination if it's one of the path's originating nodes
         if instance.termination in cablepath.origins:
             cablepath.origins.remove(instance.termination)
-        cablepath.retrace()
+            cablepath.retrace()
+        else:
+            cablepath.retrace_from([cable_node])
 
 
 @receiver(post_save, sender=FrontPort)
@@ -138,6 +144,126 @@ def extend_rearport_cable_paths(instance, created, raw, **kwargs):
     When a new FrontPort is created, add it to any CablePaths which end at its corresponding RearPort.
     """
     if created and not raw:
-        rearport = instance.rear_port
-        for cablepath in CablePath.objects.filter(_nodes__contains=rearport):
-            cablepath.retrace()
+        rebuild_paths([instance.rear_port])
+
+
+#
+# Rack utilization
+#
+
+@receiver(post_save, sender=Rack)
+def update_rack_utilization_on_rack_change(instance, raw=False, **kwargs):
+    """
+    Recalculate the utilization of a Rack when it is saved (e.g. its height may have changed). This also corrects any
+    stale cached figures written by the save itself.
+    """
+    if not raw:
+        enqueue_rack_utilization_update([instance.pk], space=True, power=True)
+
+
+@receiver(post_save, sender=Device)
+def update_rack_utilization_on_device_change(instance, created, raw=False, **kwargs):
+    """
+    Recalculate the space utilization of the Rack(s) affected by a Device being installed, moved, or removed.
+    """
+    if raw:
+        return
+    placement = instance._get_rack_placement()
+    if created or placement != instance._original_rack_placement:
+        enqueue_rack_utilization_update([instance.rack_id, instance._original_rack_placement[0]], space=True)
+        instance._original_rack_placement = placement
+
+
+@receiver(post_delete, sender=Device)
+def update_rack_utilization_on_device_delete(instance, **kwargs):
+    enqueue_rack_utilization_update([instance.rack_id], space=True)
+
+
+@receiver(post_save, sender=DeviceType)
+def update_rack_utilization_on_devicetype_change(instance, created, raw=False, **kwargs):
+    """
+    Recalculate the space utilization of all Racks containing instances of a DeviceType whose height or utilization
+    exclusion has changed.
+    """
+    if created or raw:
+        return
+    if (
+        instance.u_height != instance._original_u_height or
+        instance.exclude_from_utilization != instance._original_exclude_from_utilization
+    ):
+        rack_ids = Device.objects.filter(
+            device_type=instance,
+            position__isnull=False
+        ).values_list('rack', flat=True).distinct()
+        enqueue_rack_utilization_update(rack_ids, space=True)
+
+
+@receiver((post_save, post_delete), sender=RackReservation)
+def update_rack_utilization_on_reservation_change(instance, raw=False, **kwargs):
+    if not raw:
+        enqueue_rack_utilization_update([instance.rack_id], space=True)
+
+
+@receiver(post_save, sender=PowerFeed)
+def update_rack_utilization_on_powerfeed_change(instance, raw=False, **kwargs):
+    """
+    Recalculate the power utilization of the Rack(s) to which a PowerFeed is (or was) assigned.
+    """
+    if not raw:
+        enqueue_rack_utilization_update([instance.rack_id, instance._original_rack_id], power=True)
+        instance._original_rack_id = instance.rack_id
+
+
+@receiver(post_delete, sender=PowerFeed)
+def update_rack_utilization_on_powerfeed_delete(instance, **kwargs):
+    enqueue_rack_utilization_update([instance.rack_id], power=True)
+
+
+@receiver(post_save, sender=PowerPort)
+def update_rack_utilization_on_powerport_change(instance, raw=False, **kwargs):
+    """
+    Recalculate the power utilization of any Racks supplying a connected PowerPort (whose allocated draw may have
+    changed).
+    """
+    if not raw and instance.cable_id:
+        enqueue_rack_utilization_update(get_power_rack_ids(power_port_ids=[instance.pk]), power=True)
+
+
+@receiver(trace_paths, sender=Cable)
+def update_rack_utilization_on_cable_change(instance, raw=False, **kwargs):
+    """
+    Recalculate the power utilization of any Racks affected by connecting a PowerFeed, PowerPort, or PowerOutlet.
+    """
+    if not raw and instance._terminations_modified:
+        enqueue_rack_utilization_update(
+            get_power_rack_ids(**_get_power_termination_ids(CableTermination.objects.filter(cable=instance))),
+            power=True
+        )
+
+
+@receiver(post_delete, sender=CableTermination)
+def update_rack_utilization_on_cable_termination_delete(instance, **kwargs):
+    """
+    Recalculate the power utilization of any Racks affected by disconnecting a PowerFeed, PowerPort, or PowerOutlet.
+    The remaining terminations of the Cable are considered as well, since they may be all that is left.
+    """
+    terminations = [instance, *CableTermination.objects.filter(cable_id=instance.cable_id)]
+    enqueue_rack_utilization_update(get_power_rack_ids(**_get_power_termination_ids(terminations)), power=True)
+
+
+def _get_power_termination_ids(cable_terminations):
+    """
+    Return keyword arguments for get_power_rack_ids() listing the power-related objects among the given
+    CableTerminations.
+    """
+    model_args = {
+        PowerFeed: 'power_feed_ids',
+        PowerPort: 'power_port_ids',
+        PowerOutlet: 'power_outlet_ids',
+    }
+    ids = {}
+    for ct in cable_terminations:
+        model = ObjectType.objects.get_for_id(ct.termination_type_id).model_class()
+        if model in model_args:
+            ids.setdefault(model_args[model], []).append(ct.termination_id)
+    return ids
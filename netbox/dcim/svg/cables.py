@@ -1,11 +1,17 @@
+import hashlib
+
 import svgwrite
 from svgwrite.container import Group, Hyperlink
 from svgwrite.shapes import Line, Polyline, Rect
 from svgwrite.text import Text
 
 from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Max
 
-from dcim.constants import CABLE_TRACE_SVG_DEFAULT_WIDTH
+from core.models import ObjectType
+from dcim.constants import CABLE_TRACE_SVG_CACHE_TIMEOUT, CABLE_TRACE_SVG_DEFAULT_WIDTH
+from dcim.utils import compile_path_node, decompile_path_node
 from utilities.html import foreground_color
 
 __all__ = (
@@ -335,6 +341,79 @@ class CableTraceSVG:
 
         return group
 
+    def _get_cable_paths(self):
+        """
+        Return the chain of CablePaths rendered for the origin (including those of any bridged interfaces), resolved
+        by ID only.
+        """
+        from dcim.models import CablePath
+
+        cable_paths = []
+        cable_path = getattr(self.origin, '_path', None)
+        while cable_path is not None and cable_path not in cable_paths:
+            cable_paths.append(cable_path)
+            destinations = cable_path.path[-1] if cable_path.is_complete else []
+            if len(destinations) != 1:
+                break
+            ct_id, object_id = decompile_path_node(destinations[0])
+            model = ObjectType.objects.get_for_id(ct_id).model_class()
+            if not hasattr(model, 'bridge'):
+                break
+            cable_path = CablePath.objects.filter(
+                pk__in=model.objects.filter(pk=object_id).values('bridge___path')
+            ).first()
+        return cable_paths
+
+    def get_fingerprint(self):
+        """
+        Return a digest identifying the current version of the trace: the CablePath(s) it comprises, along with the
+        last modification times of every object in them (and their parent objects).
+        """
+        cable_paths = self._get_cable_paths()
+        fingerprint = [
+            (cp.pk, cp.path, cp.is_active, cp.is_complete, cp.is_split) for cp in cable_paths
+        ]
+
+        # Group nodes by object type
+        nodes_by_type = {}
+        for cp in cable_paths:
+            for node in cp._nodes:
+                ct_id, object_id = decompile_path_node(node)
+                nodes_by_type.setdefault(ct_id, set()).add(object_id)
+
+        # Record the most recent modification time for each type of object
+        for ct_id, object_ids in sorted(nodes_by_type.items()):
+            model = ObjectType.objects.get_for_id(ct_id).model_class()
+            fields = [
+                f'{field}__last_updated' for field in ('device', 'circuit', 'power_panel') if hasattr(model, field)
+            ]
+            if hasattr(model, 'last_updated'):
+                fields.append('last_updated')
+            if fields:
+                last_updated = model.objects.filter(pk__in=object_ids).aggregate(
+                    *[Max(field) for field in fields]
+                )
+                fingerprint.append((ct_id, sorted(object_ids), sorted(last_updated.items())))
+
+        return hashlib.sha256(repr(fingerprint).encode()).hexdigest()
+
+    def get_cache_key(self):
+        node = compile_path_node(ObjectType.objects.get_for_model(self.origin).pk, self.origin.pk)
+        base_url = hashlib.sha256(self.base_url.encode()).hexdigest()[:16]
+        return f'dcim.cabletracesvg:{node}:{self.width}:{base_url}:{self.get_fingerprint()}'
+
+    def render_cached(self):
+        """
+        Return the SVG document text for the cable trace, rendering it only if no rendering of the current version
+        of the trace has been cached. Because the cache key incorporates the trace's fingerprint, any change to its
+        path, cables, or terminations results in a fresh rendering.
+        """
+        cache_key = self.get_cache_key()
+        if (svg := cache.get(cache_key)) is None:
+            svg = self.render().tostring()
+            cache.set(cache_key, svg, CABLE_TRACE_SVG_CACHE_TIMEOUT)
+        return svg
+
     def render(self):
         """
         Return an SVG document representing a cable trace.
@@ -1,4 +1,7 @@
 import decimal
+import hashlib
+from collections import defaultdict
+
 import svgwrite
 from svgwrite.container import Hyperlink
 from svgwrite.image import Image
@@ -7,8 +10,9 @@ from svgwrite.shapes import Rect
 from svgwrite.text import Text
 
 from django.conf import settings
+from django.core.cache import cache
 from django.core.exceptions import FieldError
-from django.db.models import Q
+from django.db.models import Count, Max, Q
 from django.template.defaultfilters import floatformat
 from django.urls import reverse
 from django.utils.http import urlencode
@@ -16,11 +20,16 @@ from django.utils.http import urlencode
 from netbox.config import get_config
 from utilities.data import array_to_ranges
 from utilities.html import foreground_color
-from dcim.constants import RACK_ELEVATION_BORDER_WIDTH
+from dcim.constants import (
+    RACK_ELEVATION_BORDER_WIDTH, RACK_ELEVATION_DEFAULT_LEGEND_WIDTH, RACK_ELEVATION_DEFAULT_MARGIN_WIDTH,
+    RACK_ELEVATION_SVG_CACHE_TIMEOUT,
+)
 
 
 __all__ = (
     'RackElevationSVG',
+    'RackElevationSnapshot',
+    'render_rack_elevations',
 )
 
 GRADIENT_RESERVED = '#b0b0ff'
@@ -29,13 +38,15 @@ GRADIENT_BLOCKED = '#ffc0c0'
 STROKE_RESERVED = '#4d4dff'
 
 
-def get_device_name(device):
+def get_device_name(device, child_count=None):
     if device.label:
         name = device.label
     else:
         name = str(device.device_type)
     if device.devicebay_count:
-        name += ' ({}/{})'.format(device.get_children().count(), device.devicebay_count)
+        if child_count is None:
+            child_count = device.get_children().count()
+        name += ' ({}/{})'.format(child_count, device.devicebay_count)
 
     return name
 
@@ -67,6 +78,123 @@ def get_device_description(device):
     return description
 
 
+class RackElevationSnapshot:
+    """
+    The devices and reservations within a set of racks, loaded in bulk so that the elevations of all the racks can be
+    rendered without querying the database for each rack individually. Device permissions and highlighting are
+    evaluated once for the entire set.
+
+    :param racks: An iterable of Rack instances
+    :param user: User instance. If specified, only devices viewable by this user will be fully displayed.
+    :param highlight_params: Iterable of two-tuples which identifies attributes of devices to highlight
+    :param permitted_device_ids: A mapping of rack PKs to the PKs of devices viewable by the user, as returned by
+        get_permitted_device_ids() (optional). If not specified, it is determined from the user.
+    """
+    def __init__(self, racks, user=None, highlight_params=None, permitted_device_ids=None):
+        from dcim.models import Device, RackReservation
+
+        rack_ids = [rack.pk for rack in racks]
+
+        # Retrieve all devices which occupy space within the racks
+        self.devices = defaultdict(list)
+        devices = Device.objects.select_related(
+            'device_type',
+            'device_type__manufacturer',
+            'role'
+        ).annotate(
+            devicebay_count=Count('devicebays')
+        ).filter(
+            rack_id__in=rack_ids,
+            position__gt=0,
+            device_type__u_height__gt=0
+        )
+        for device in devices:
+            self.devices[device.rack_id].append(device)
+
+        # Count the child devices installed in any device bays
+        parent_ids = [d.pk for rack_devices in self.devices.values() for d in rack_devices if d.devicebay_count]
+        self.child_counts = dict(
+            Device.objects.filter(parent_bay__device__in=parent_ids).order_by().values(
+                'parent_bay__device'
+            ).annotate(count=Count('pk')).values_list('parent_bay__device', 'count')
+        ) if parent_ids else {}
+
+        # Retrieve all reservations within the racks
+        self.reservations = defaultdict(list)
+        for reservation in RackReservation.objects.filter(rack_id__in=rack_ids):
+            self.reservations[reservation.rack_id].append(reservation)
+
+        # Determine the subset of devices within the racks that are viewable by the user, if any
+        if permitted_device_ids is None:
+            permitted_device_ids = self.get_permitted_device_ids(racks, user=user)
+        self.permitted_device_ids = {pk for rack_id in rack_ids for pk in permitted_device_ids.get(rack_id, [])}
+        permitted_devices = Device.objects.filter(pk__in=self.permitted_device_ids)
+
+        # Determine device(s) to highlight within the elevations (if any)
+        self.highlight_devices = set()
+        if highlight_params:
+            q = Q()
+            for k, v in highlight_params:
+                q |= Q(**{k: v})
+            try:
+                self.highlight_devices = set(permitted_devices.filter(q).only('pk'))
+            except FieldError:
+                pass
+
+    @staticmethod
+    def get_permitted_device_ids(racks, user=None):
+        """
+        Return a mapping of each rack's PK to a sorted list of the PKs of the devices within it which are viewable by
+        the user (or all devices, if no user is specified).
+        """
+        from dcim.models import Device
+
+        permitted_devices = Device.objects.filter(rack_id__in=[rack.pk for rack in racks])
+        if user is not None:
+            permitted_devices = permitted_devices.restrict(user, 'view')
+        permitted_device_ids = defaultdict(list)
+        for pk, rack_id in permitted_devices.order_by('pk').values_list('pk', 'rack_id'):
+            permitted_device_ids[rack_id].append(pk)
+        return permitted_device_ids
+
+    @staticmethod
+    def get_versions(racks, permitted_device_ids=None):
+        """
+        Return a mapping of each rack's PK to a token which changes whenever the rack, or any device or reservation
+        within it, is created, modified, or deleted. This includes changes to the roles, types, and manufacturers of
+        the devices, which are reflected in their renderings. If a mapping of permitted device IDs is given (as
+        returned by get_permitted_device_ids()), the token also changes when the set of devices viewable by the user
+        changes.
+        """
+        from dcim.models import Device, RackReservation
+
+        versions = {rack.pk: [rack.last_updated] for rack in racks}
+        for model, related_fields in (
+            (Device, ('role', 'device_type', 'device_type__manufacturer')),
+            (RackReservation, ()),
+        ):
+            related_last_updated = {
+                f'{field}_last_updated': Max(f'{field}__last_updated') for field in related_fields
+            }
+            changes = {
+                rack_id: version for rack_id, *version in model.objects.filter(
+                    rack_id__in=versions.keys()
+                ).order_by().values('rack_id').annotate(
+                    last_updated=Max('last_updated'),
+                    count=Count('pk'),
+                    **related_last_updated
+                ).values_list('rack_id', 'last_updated', 'count', *related_last_updated)
+            }
+            for rack_id, version in versions.items():
+                version.append(changes.get(rack_id))
+
+        if permitted_device_ids is not None:
+            for rack_id, version in versions.items():
+                version.append(permitted_device_ids.get(rack_id, []))
+
+        return {rack_id: hashlib.sha256(repr(version).encode()).hexdigest() for rack_id, version in versions.items()}
+
+
 class RackElevationSVG:
     """
     Use this class to render a rack elevation as an SVG image.
@@ -80,19 +208,29 @@ class RackElevationSVG:
     :param include_images: If true, the SVG document will embed front/rear device face images, where available
     :param base_url: Base URL for links within the SVG document. If none, links will be relative.
     :param highlight_params: Iterable of two-tuples which identifies attributes of devices to highlight
+    :param snapshot: A RackElevationSnapshot which includes the rack (optional). If specified, devices, reservations,
+        and permissions are drawn from the snapshot rather than queried.
     """
     def __init__(self, rack, unit_height=None, unit_width=None, legend_width=None, margin_width=None, user=None,
-                 include_images=True, base_url=None, highlight_params=None):
+                 include_images=True, base_url=None, highlight_params=None, snapshot=None):
         self.rack = rack
+        self.user = user
         self.include_images = include_images
         self.base_url = base_url.rstrip('/') if base_url is not None else ''
+        self.highlight_params = highlight_params
+        self.snapshot = snapshot
 
         # Set drawing dimensions
         config = get_config()
         self.unit_width = unit_width or config.RACK_ELEVATION_DEFAULT_UNIT_WIDTH
         self.unit_height = unit_height or config.RACK_ELEVATION_DEFAULT_UNIT_HEIGHT
-        self.legend_width = legend_width or config.RACK_ELEVATION_DEFAULT_LEGEND_WIDTH
-        self.margin_width = margin_width or config.RACK_ELEVATION_DEFAULT_MARGIN_WIDTH
+        self.legend_width = legend_width or RACK_ELEVATION_DEFAULT_LEGEND_WIDTH
+        self.margin_width = margin_width or RACK_ELEVATION_DEFAULT_MARGIN_WIDTH
+
+        if snapshot is not None:
+            self.permitted_device_ids = snapshot.permitted_device_ids
+            self.highlight_devices = snapshot.highlight_devices
+            return
 
         # Determine the subset of devices within this rack that are viewable by the user, if any
         permitted_devices = self.rack.devices
@@ -161,7 +299,8 @@ class RackElevationSVG:
         return x, y
 
     def _draw_device(self, device, coords, size, color=None, image=None):
-        name = get_device_name(device)
+        child_count = self.snapshot.child_counts.get(device.pk, 0) if self.snapshot is not None else None
+        name = get_device_name(device, child_count=child_count)
         description = get_device_description(device)
         text_color = f'#{foreground_color(color)}' if color else '#000000'
         text_coords = (
@@ -250,7 +389,11 @@ class RackElevationSVG:
         """
         Draw any rack reservations in the right-hand margin alongside the rack elevation.
         """
-        for reservation in self.rack.reservations.all():
+        if self.snapshot is not None:
+            reservations = self.snapshot.reservations[self.rack.pk]
+        else:
+            reservations = self.rack.reservations.all()
+        for reservation in reservations:
             for segment in array_to_ranges(reservation.units):
                 u_height = 1 if len(segment) == 1 else segment[1] + 1 - segment[0]
                 coords = self._get_device_coords(segment[0], u_height)
@@ -274,8 +417,8 @@ class RackElevationSVG:
         url_string = '{}?{}&position={{}}'.format(
             reverse('dcim:device_add'),
             urlencode({
-                'site': self.rack.site.pk,
-                'location': self.rack.location.pk if self.rack.location else '',
+                'site': self.rack.site_id,
+                'location': self.rack.location_id or '',
                 'rack': self.rack.pk,
                 'face': face,
             })
@@ -300,7 +443,8 @@ class RackElevationSVG:
         """
         Draw any occupied rack units for the specified rack face.
         """
-        for unit in self.rack.get_rack_units(face=face, expand_devices=False):
+        devices = self.snapshot.devices[self.rack.pk] if self.snapshot is not None else None
+        for unit in self.rack.get_rack_units(face=face, expand_devices=False, devices=devices):
 
             # Loop through all units in the elevation
             device = unit['device']
@@ -323,6 +467,20 @@ class RackElevationSVG:
                 # Devices which the user does not have permission to view are rendered only as unavailable space
                 self.drawing.add(Rect(device_coords, device_size, class_='blocked'))
 
+    def get_cache_key(self, face, version):
+        params = (
+            face,
+            self.unit_width,
+            self.unit_height,
+            self.legend_width,
+            self.margin_width,
+            self.include_images,
+            self.base_url,
+            [tuple(param) for param in self.highlight_params or []],
+        )
+        digest = hashlib.sha256(repr(params).encode()).hexdigest()[:16]
+        return f'dcim.rackelevationsvg:{self.rack.pk}:{digest}:{version}'
+
     def render(self, face):
         """
         Return an SVG document representing a rack elevation.
@@ -343,3 +501,48 @@ class RackElevationSVG:
         self.draw_border()
 
         return self.drawing
+
+
+def render_rack_elevations(racks, face, user=None, highlight_params=None, **kwargs):
+    """
+    Render the elevations of multiple racks, returning a dictionary mapping each rack's PK to its SVG document text.
+    Elevations are rendered from a single RackElevationSnapshot, and cached until the contents of each rack (or the
+    devices within it which the user may view) change; only racks without a cached rendering are loaded. Additional
+    keyword arguments are passed to RackElevationSVG.
+    """
+    racks = list(racks)
+
+    # Renderings are specific to the set of devices the user may view, rather than to the user
+    permitted_device_ids = RackElevationSnapshot.get_permitted_device_ids(racks, user=user)
+    versions = RackElevationSnapshot.get_versions(racks, permitted_device_ids=permitted_device_ids)
+    cache_keys = {
+        rack.pk: RackElevationSVG(
+            rack, user=user, highlight_params=highlight_params, **kwargs
+        ).get_cache_key(face, versions[rack.pk])
+        for rack in racks
+    }
+    cached = cache.get_many(cache_keys.values())
+
+    svgs = {}
+    uncached = []
+    for rack in racks:
+        if cache_keys[rack.pk] in cached:
+            svgs[rack.pk] = cached[cache_keys[rack.pk]]
+        else:
+            uncached.append(rack)
+
+    if uncached:
+        snapshot = RackElevationSnapshot(
+            uncached, user=user, highlight_params=highlight_params, permitted_device_ids=permitted_device_ids
+        )
+        for rack in uncached:
+            elevation = RackElevationSVG(
+                rack, user=user, highlight_params=highlight_params, snapshot=snapshot, **kwargs
+            )
+            svgs[rack.pk] = elevation.render(face).tostring()
+        cache.set_many(
+            {cache_keys[rack.pk]: svgs[rack.pk] for rack in uncached},
+            RACK_ELEVATION_SVG_CACHE_TIMEOUT
+        )
+
+    return svgs
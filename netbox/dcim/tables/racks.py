@@ -153,11 +153,11 @@ class RackTable(TenancyColumnsMixin, ContactsColumnMixin, NetBoxTable):
         verbose_name=_('Devices')
     )
     get_utilization = columns.UtilizationColumn(
-        orderable=False,
+        accessor=Accessor('_utilization'),
         verbose_name=_('Space')
     )
     get_power_utilization = columns.UtilizationColumn(
-        orderable=False,
+        accessor=Accessor('_power_utilization'),
         verbose_name=_('Power')
     )
     tags = columns.TagColumn(
@@ -5,10 +5,11 @@ from django.urls import reverse
 from django.utils.translation import gettext as _
 from rest_framework import status
 
+from core.models import ObjectChange
 from dcim.choices import *
 from dcim.constants import *
 from dcim.models import *
-from extras.models import ConfigTemplate
+from extras.models import ConfigTemplate, Tag
 from ipam.choices import VLANQinQRoleChoices
 from ipam.models import ASN, RIR, VLAN, VRF
 from netbox.api.serializers import GenericObjectSerializer
@@ -462,6 +463,35 @@ class RackTest(APIViewTestCases.APIViewTestCase):
         self.assertHttpStatus(response, status.HTTP_200_OK)
         self.assertEqual(response.get('Content-Type'), 'image/svg+xml')
 
+    def test_get_available_space(self):
+        """
+        Search for available space across multiple racks.
+        """
+        racks = Rack.objects.filter(site__slug='site-1').order_by('pk')
+        manufacturer = Manufacturer.objects.create(name='Manufacturer 1', slug='manufacturer-1')
+        device_type = DeviceType.objects.create(
+            manufacturer=manufacturer, model='Device Type 1', u_height=41, is_full_depth=False
+        )
+        role = DeviceRole.objects.create(name='Device Role 1', slug='device-role-1')
+        Device.objects.create(
+            device_type=device_type, role=role, site=racks[0].site, rack=racks[0], position=1,
+            face=DeviceFaceChoices.FACE_FRONT
+        )
+        self.add_permissions('dcim.view_rack')
+        url = reverse('dcim-api:rack-available-space')
+
+        response = self.client.get(f'{url}?site_id={racks[0].site_id}&u_height=2&limit=3', **self.header)
+        self.assertHttpStatus(response, status.HTTP_200_OK)
+        self.assertEqual(
+            [(s['rack']['id'], float(s['position'])) for s in response.data],
+            [(racks[1].pk, 1.0), (racks[1].pk, 1.5), (racks[1].pk, 2.0)]
+        )
+
+        # The rear face of the first rack is still available
+        response = self.client.get(f'{url}?site_id={racks[0].site_id}&u_height=2&face=rear&limit=1', **self.header)
+        self.assertEqual(response.data[0]['rack']['id'], racks[0].pk)
+        self.assertEqual(response.data[0]['face']['value'], DeviceFaceChoices.FACE_REAR)
+
 
 class RackReservationTest(APIViewTestCases.APIViewTestCase):
     model = RackReservation
@@ -1455,6 +1485,65 @@ class DeviceTest(APIViewTestCases.APIViewTestCase):
 
         self.assertHttpStatus(response, status.HTTP_400_BAD_REQUEST)
 
+    def test_provision(self):
+        """
+        Check that devices provisioned in bulk are created along with their components.
+        """
+        device_type = DeviceType.objects.get(slug='device-type-2')
+        power_port = PowerPortTemplate.objects.create(device_type=device_type, name='PSU1')
+        PowerOutletTemplate.objects.create(device_type=device_type, name='Outlet 1', power_port=power_port)
+        interface = InterfaceTemplate.objects.create(device_type=device_type, name='eth0', type='1000base-t')
+        InterfaceTemplate.objects.create(device_type=device_type, name='eth1', type='1000base-t', bridge=interface)
+        rear_port = RearPortTemplate.objects.create(device_type=device_type, name='Rear 1', type='8p8c')
+        FrontPortTemplate.objects.create(device_type=device_type, name='Front 1', type='8p8c', rear_port=rear_port)
+        inventory_item = InventoryItemTemplate.objects.create(device_type=device_type, name='Chassis')
+        InventoryItemTemplate.objects.create(
+            device_type=device_type, name='Line Card', parent=inventory_item, component=interface
+        )
+        tag = Tag.objects.create(name='Tag 1', slug='tag-1')
+        data = [
+            {**device, 'face': 'front', 'position': i * 2 + 1, 'tags': [tag.pk]}
+            for i, device in enumerate(self.create_data)
+        ]
+
+        self.add_permissions('dcim.add_device')
+        url = reverse('dcim-api:device-list') + 'provision/'
+        response = self.client.post(url, data, format='json', **self.header)
+        self.assertHttpStatus(response, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data), 3)
+
+        for device in Device.objects.filter(pk__in=[d['id'] for d in response.data]):
+            self.assertEqual(device.interface_count, 2)
+            self.assertEqual(device.power_outlet_count, 1)
+            self.assertEqual(list(device.tags.all()), [tag])
+            self.assertEqual(device.interfaces.get(name='eth1').bridge, device.interfaces.get(name='eth0'))
+            self.assertEqual(device.poweroutlets.get().power_port, device.powerports.get())
+            self.assertEqual(device.frontports.get().rear_port, device.rearports.get())
+            line_card = device.inventoryitems.get(name='Line Card')
+            self.assertEqual(line_card.parent, device.inventoryitems.get(name='Chassis'))
+            self.assertEqual(line_card.component, device.interfaces.get(name='eth0'))
+            self.assertEqual(
+                ObjectChange.objects.filter(related_object_id=device.pk, action='create').count(), 8
+            )
+            self.assertTrue(ObjectChange.objects.filter(changed_object_id=device.pk, action='create').exists())
+
+    def test_provision_rack_fit(self):
+        """
+        Check that devices provisioned in bulk are validated against each other's rack placement.
+        """
+        data = [
+            {**device, 'face': 'front', 'position': 1}
+            for device in self.create_data[:2]
+        ]
+
+        self.add_permissions('dcim.add_device')
+        url = reverse('dcim-api:device-list') + 'provision/'
+        response = self.client.post(url, data, format='json', **self.header)
+        self.assertHttpStatus(response, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data[0], {})
+        self.assertIn('position', response.data[1])
+        self.assertFalse(Device.objects.filter(name=data[0]['name']).exists())
+
     def test_render_config(self):
         configtemplate = ConfigTemplate.objects.create(
             name='Config Template 1',
@@ -1,6 +1,9 @@
+from unittest.mock import patch
+
 from django.test import TestCase
 
 from circuits.models import *
+from dcim.cablegraph import CableGraph
 from dcim.choices import LinkStatusChoices
 from dcim.models import *
 from dcim.svg import CableTraceSVG
@@ -2421,6 +2424,142 @@ class CablePathTestCase(TestCase):
             is_active=True
         )
 
+    def test_304_splice_path_on_cable_replacement(self):
+        """
+        [IF1] --C1-- [FP1:1] [RP1] --C2-- [RP2] [FP2:1] --C3-- [IF2]
+        [IF3] --C4-- [FP1:2]                    [FP2:2] --C5-- [IF4]
+        """
+        interface1 = Interface.objects.create(device=self.device, name='Interface 1')
+        interface2 = Interface.objects.create(device=self.device, name='Interface 2')
+        interface3 = Interface.objects.create(device=self.device, name='Interface 3')
+        interface4 = Interface.objects.create(device=self.device, name='Interface 4')
+        interface5 = Interface.objects.create(device=self.device, name='Interface 5')
+        rearport1 = RearPort.objects.create(device=self.device, name='Rear Port 1', positions=2)
+        rearport2 = RearPort.objects.create(device=self.device, name='Rear Port 2', positions=2)
+        frontport1_1 = FrontPort.objects.create(
+            device=self.device, name='Front Port 1:1', rear_port=rearport1, rear_port_position=1
+        )
+        frontport1_2 = FrontPort.objects.create(
+            device=self.device, name='Front Port 1:2', rear_port=rearport1, rear_port_position=2
+        )
+        frontport2_1 = FrontPort.objects.create(
+            device=self.device, name='Front Port 2:1', rear_port=rearport2, rear_port_position=1
+        )
+        frontport2_2 = FrontPort.objects.create(
+            device=self.device, name='Front Port 2:2', rear_port=rearport2, rear_port_position=2
+        )
+
+        # Create cables
+        cable1 = Cable(a_terminations=[interface1], b_terminations=[frontport1_1])
+        cable1.save()
+        cable2 = Cable(a_terminations=[rearport1], b_terminations=[rearport2])
+        cable2.save()
+        cable3 = Cable(a_terminations=[frontport2_1], b_terminations=[interface2])
+        cable3.save()
+        cable4 = Cable(a_terminations=[interface3], b_terminations=[frontport1_2])
+        cable4.save()
+        cable5 = Cable(a_terminations=[frontport2_2], b_terminations=[interface4])
+        cable5.save()
+        path1 = self.assertPathExists(
+            (interface1, cable1, frontport1_1, rearport1, cable2, rearport2, frontport2_1, cable3, interface2),
+            is_complete=True,
+            is_active=True
+        )
+        path2 = self.assertPathExists(
+            (interface3, cable4, frontport1_2, rearport1, cable2, rearport2, frontport2_2, cable5, interface4),
+            is_complete=True,
+            is_active=True
+        )
+        self.assertEqual(CablePath.objects.count(), 4)
+
+        # Replace cable 3 with a cable to interface 5
+        cable3.delete()
+        self.assertPathExists(
+            (interface1, cable1, frontport1_1, rearport1, cable2, rearport2, frontport2_1),
+            is_complete=False
+        )
+        cable6 = Cable(a_terminations=[frontport2_1], b_terminations=[interface5])
+        cable6.save()
+
+        # The affected path should be updated in place; the unaffected path should be left untouched
+        self.assertEqual(
+            self.assertPathExists(
+                (interface1, cable1, frontport1_1, rearport1, cable2, rearport2, frontport2_1, cable6, interface5),
+                is_complete=True,
+                is_active=True
+            ).pk,
+            path1.pk
+        )
+        self.assertEqual(CablePath.objects.get(pk=path2.pk).path, path2.path)
+        self.assertEqual(CablePath.objects.count(), 4)
+
+    def test_305_trace_from_preloaded_graph(self):
+        """
+        [IF1] --C1-- [FP1:1] [RP1] --C2-- [RP2] [FP2:1] --C3-- [IF2]
+        [IF3] --C4-- [FP1:2]                    [FP2:2] --C5-- [IF4]
+        """
+        interfaces = [
+            Interface.objects.create(device=self.device, name=f'Interface {i}') for i in range(1, 5)
+        ]
+        rearport1 = RearPort.objects.create(device=self.device, name='Rear Port 1', positions=2)
+        rearport2 = RearPort.objects.create(device=self.device, name='Rear Port 2', positions=2)
+        frontports1 = [
+            FrontPort.objects.create(
+                device=self.device, name=f'Front Port 1:{i}', rear_port=rearport1, rear_port_position=i
+            ) for i in (1, 2)
+        ]
+        frontports2 = [
+            FrontPort.objects.create(
+                device=self.device, name=f'Front Port 2:{i}', rear_port=rearport2, rear_port_position=i
+            ) for i in (1, 2)
+        ]
+        Cable(a_terminations=[interfaces[0]], b_terminations=[frontports1[0]]).save()
+        Cable(a_terminations=[rearport1], b_terminations=[rearport2]).save()
+        Cable(a_terminations=[frontports2[0]], b_terminations=[interfaces[1]]).save()
+        Cable(a_terminations=[interfaces[2]], b_terminations=[frontports1[1]]).save()
+        Cable(a_terminations=[frontports2[1]], b_terminations=[interfaces[3]]).save()
+        self.assertEqual(CablePath.objects.count(), 4)
+
+        # Tracing from a preloaded graph should produce identical paths without querying the database
+        interfaces = list(Interface.objects.filter(pk__in=[i.pk for i in interfaces]))
+        graph = CableGraph()
+        graph.preload(interfaces)
+        for interface in interfaces:
+            with self.assertNumQueries(0):
+                cablepath = CablePath.from_origin([interface], graph=graph)
+            self.assertEqual(cablepath.path, interface._path.path)
+            self.assertTrue(cablepath.is_complete)
+
+    def test_306_cached_trace_svg(self):
+        """
+        [IF1] --C1-- [FP1] [RP1] --C2-- [IF2]
+        """
+        interface1 = Interface.objects.create(device=self.device, name='Interface 1')
+        interface2 = Interface.objects.create(device=self.device, name='Interface 2')
+        rearport1 = RearPort.objects.create(device=self.device, name='Rear Port 1', positions=1)
+        frontport1 = FrontPort.objects.create(
+            device=self.device, name='Front Port 1', rear_port=rearport1, rear_port_position=1
+        )
+        Cable(a_terminations=[interface1], b_terminations=[frontport1]).save()
+        cable2 = Cable(a_terminations=[rearport1], b_terminations=[interface2])
+        cable2.save()
+        interface1.refresh_from_db()
+
+        # Repeated renderings of an unchanged trace should be served from the cache
+        svg = CableTraceSVG(interface1).render_cached()
+        fingerprint = CableTraceSVG(interface1).get_fingerprint()
+        with patch.object(CableTraceSVG, 'render') as render:
+            self.assertEqual(CableTraceSVG(interface1).render_cached(), svg)
+            render.assert_not_called()
+
+        # Modifying a cable within the path should change the trace's fingerprint
+        cable2 = Cable.objects.get(pk=cable2.pk)
+        cable2.label = 'Cable 2'
+        cable2.save()
+        interface1 = Interface.objects.get(pk=interface1.pk)
+        self.assertNotEqual(CableTraceSVG(interface1).get_fingerprint(), fingerprint)
+        self.assertIn('Cable 2', CableTraceSVG(interface1).render_cached())
+
     def test_401_exclude_midspan_devices(self):
         """
         [IF1] --C1-- [FP1][Test Device][RP1] --C2-- [RP2][Test Device][FP2] --C3-- [IF2]
@@ -5,9 +5,11 @@ from circuits.models import *
 from core.models import ObjectType
 from dcim.choices import *
 from dcim.models import *
+from dcim.svg import render_rack_elevations
 from extras.models import CustomField
 from netbox.choices import WeightUnitChoices
 from tenancy.models import Tenant
+from users.models import ObjectPermission, User
 from utilities.data import drange
 from virtualization.models import Cluster, ClusterType
 
@@ -368,6 +370,186 @@ class RackTestCase(TestCase):
         rack.refresh_from_db()
         self.assertEqual(rack.get_utilization(), 1 / 42 * 100)
 
+    def test_get_occupancy(self):
+        """
+        Check that the occupancy bitmap reflects devices on each face of the rack, and reservations.
+        """
+        site = Site.objects.first()
+        rack = Rack.objects.first()
+        half_depth_type = DeviceType.objects.create(
+            manufacturer=Manufacturer.objects.first(), model='Device Type 4', slug='device-type-4', u_height=1,
+            is_full_depth=False
+        )
+        full_depth_type = DeviceType.objects.create(
+            manufacturer=Manufacturer.objects.first(), model='Device Type 5', slug='device-type-5', u_height=2
+        )
+        Device(
+            name='Device 1',
+            role=DeviceRole.objects.first(),
+            device_type=half_depth_type,
+            site=site,
+            rack=rack,
+            position=1,
+            face=DeviceFaceChoices.FACE_FRONT
+        ).save()
+        Device(
+            name='Device 2',
+            role=DeviceRole.objects.first(),
+            device_type=full_depth_type,
+            site=site,
+            rack=rack,
+            position=40,
+            face=DeviceFaceChoices.FACE_REAR
+        ).save()
+        RackReservation.objects.create(rack=rack, units=[3], user=User.objects.create(username='user1'))
+
+        occupancy = rack.get_occupancy(include_reservations=True)
+        self.assertFalse(occupancy.fits(1, face=DeviceFaceChoices.FACE_FRONT))
+        self.assertTrue(occupancy.fits(1, face=DeviceFaceChoices.FACE_REAR))
+        self.assertFalse(occupancy.fits(1.5, face=None))
+        self.assertFalse(occupancy.fits(39, u_height=2, face=DeviceFaceChoices.FACE_FRONT))
+        self.assertFalse(occupancy.fits(42, u_height=2))
+        self.assertTrue(occupancy.fits(3))
+        self.assertFalse(occupancy.fits(3, include_reserved=True))
+        self.assertEqual(
+            occupancy.get_available_positions(u_height=2, face=DeviceFaceChoices.FACE_REAR, include_reserved=True)[:3],
+            [1, 4, 4.5]
+        )
+
+        # Available units exclude occupied units, but not reserved units
+        self.assertEqual(
+            rack.get_available_units(u_height=1, rack_face=DeviceFaceChoices.FACE_FRONT)[:3],
+            [2, 2.5, 3]
+        )
+        self.assertEqual(rack.get_utilization(), 8 / 84 * 100)
+
+    def test_render_rack_elevations(self):
+        """
+        Check that elevations rendered in bulk match those rendered individually, and are cached.
+        """
+        site = Site.objects.first()
+        racks = (
+            Rack.objects.first(),
+            Rack.objects.create(name='Rack 2', site=site, location=Location.objects.first(), u_height=42),
+        )
+        for i, rack in enumerate(racks, start=1):
+            Device(
+                name=f'Device {i}',
+                role=DeviceRole.objects.first(),
+                device_type=DeviceType.objects.first(),
+                site=site,
+                rack=rack,
+                position=i,
+                face=DeviceFaceChoices.FACE_FRONT
+            ).save()
+        RackReservation.objects.create(rack=racks[1], units=[10, 11], user=User.objects.create(username='user1'))
+        racks = list(Rack.objects.filter(pk__in=[rack.pk for rack in racks]))
+
+        # Permitted devices, versions (2), devices, reservations
+        with self.assertNumQueries(5):
+            svgs = render_rack_elevations(racks, face=DeviceFaceChoices.FACE_FRONT)
+        for rack in racks:
+            self.assertEqual(svgs[rack.pk], rack.get_elevation_svg(face=DeviceFaceChoices.FACE_FRONT).tostring())
+
+        # Elevations should now be retrieved from the cache
+        with self.assertNumQueries(3):
+            self.assertEqual(render_rack_elevations(racks, face=DeviceFaceChoices.FACE_FRONT), svgs)
+
+    def test_render_rack_elevations_invalidation(self):
+        """
+        Check that cached elevations are invalidated by changes to device roles and to the user's permissions.
+        """
+        rack = Rack.objects.first()
+        role = DeviceRole.objects.first()
+        Device.objects.create(
+            name='Device 1',
+            role=role,
+            device_type=DeviceType.objects.first(),
+            site=rack.site,
+            rack=rack,
+            position=1,
+            face=DeviceFaceChoices.FACE_FRONT
+        )
+        user = User.objects.create(username='user1')
+        permission = ObjectPermission.objects.create(name='View devices', actions=['view'])
+        permission.object_types.add(ObjectType.objects.get_for_model(Device))
+        permission.users.add(user)
+
+        def render():
+            # Retrieve a fresh instance of the user to avoid its cached permissions
+            user_ = User.objects.get(pk=user.pk)
+            return render_rack_elevations([rack], face=DeviceFaceChoices.FACE_FRONT, user=user_)[rack.pk]
+
+        self.assertIn('Name: Device 1', render())
+
+        # Changing the device's role should invalidate the cached elevation
+        role.color = '123456'
+        role.save()
+        self.assertIn('fill: #123456', render())
+
+        # Narrowing the user's permissions should invalidate the cached elevation
+        permission.constraints = {'name': 'Device 2'}
+        permission.save()
+        self.assertNotIn('Name: Device 1', render())
+
+    def test_cached_utilization(self):
+        """
+        Check that the cached space and power utilization of a rack are updated as devices, reservations, and power
+        feeds change.
+        """
+        site = Site.objects.first()
+        rack = Rack.objects.first()
+        rack2 = Rack.objects.create(name='Rack 2', site=site, location=Location.objects.first(), u_height=42)
+        user = User.objects.create(username='user1')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            device = Device.objects.create(
+                name='Device 1',
+                role=DeviceRole.objects.first(),
+                device_type=DeviceType.objects.first(),
+                site=site,
+                rack=rack,
+                position=1,
+                face=DeviceFaceChoices.FACE_FRONT
+            )
+            RackReservation.objects.create(rack=rack, units=[10, 11], user=user)
+        rack.refresh_from_db()
+        self.assertEqual(rack._occupied_units, 3)
+        self.assertEqual(float(rack.utilization), round(3 / 42 * 100, 2))
+
+        # Move the device to another rack
+        with self.captureOnCommitCallbacks(execute=True):
+            device.rack = rack2
+            device.save()
+        rack.refresh_from_db()
+        rack2.refresh_from_db()
+        self.assertEqual(rack._occupied_units, 2)
+        self.assertEqual(rack2._occupied_units, 1)
+
+        # Connect the device to a power feed in the rack
+        power_panel = PowerPanel.objects.create(name='Power Panel 1', site=site)
+        with self.captureOnCommitCallbacks(execute=True):
+            power_feed = PowerFeed.objects.create(
+                name='Power Feed 1',
+                power_panel=power_panel,
+                rack=rack,
+                voltage=120,
+                amperage=20,
+                max_utilization=80
+            )
+            power_port = PowerPort.objects.create(device=device, name='Power Port 1', allocated_draw=960)
+            Cable(a_terminations=[power_port], b_terminations=[power_feed]).save()
+        rack.refresh_from_db()
+        self.assertEqual(rack._available_power, 1920)
+        self.assertEqual(rack._allocated_power, 960)
+        self.assertEqual(float(rack.power_utilization), 50)
+
+        # Delete the power feed
+        with self.captureOnCommitCallbacks(execute=True):
+            power_feed.delete()
+        rack.refresh_from_db()
+        self.assertEqual(rack.power_utilization, 0)
+
 
 class DeviceTestCase(TestCase):
 
@@ -551,6 +733,58 @@ class DeviceTestCase(TestCase):
         )
         self.assertEqual(inventoryitem.cf['cf1'], 'foo')
 
+    def test_device_creation_component_trees(self):
+        """
+        Check that nested inventory items and module bays are created in bulk with valid tree attributes.
+        """
+        device_type = DeviceType.objects.first()
+        parent_item = InventoryItemTemplate.objects.get(device_type=device_type, name='Inventory Item 1')
+        child_item = InventoryItemTemplate.objects.create(
+            device_type=device_type,
+            parent=parent_item,
+            name='Inventory Item 2',
+            component=ConsolePortTemplate.objects.get(device_type=device_type)
+        )
+        InventoryItemTemplate.objects.create(device_type=device_type, parent=child_item, name='Inventory Item 3')
+        InventoryItemTemplate.objects.create(device_type=device_type, parent=parent_item, name='Inventory Item 4')
+        ModuleBayTemplate.objects.create(device_type=device_type, name='Module Bay 2')
+
+        devices = []
+        for i in range(1, 3):
+            device = Device(
+                site=Site.objects.first(),
+                device_type=device_type,
+                role=DeviceRole.objects.first(),
+                name=f'Test Device {i}'
+            )
+            device.save()
+            devices.append(device)
+
+        for device in devices:
+            root = InventoryItem.objects.get(device=device, parent__isnull=True)
+            self.assertEqual(root.name, 'Inventory Item 1')
+            self.assertEqual(
+                [(item.name, item.level) for item in root.get_descendants()],
+                [('Inventory Item 2', 1), ('Inventory Item 3', 2), ('Inventory Item 4', 1)]
+            )
+            self.assertEqual(root.rght, 8)
+            self.assertEqual(
+                InventoryItem.objects.get(device=device, name='Inventory Item 2').component,
+                ConsolePort.objects.get(device=device)
+            )
+
+            # Each module bay forms its own tree
+            module_bays = ModuleBay.objects.filter(device=device)
+            self.assertEqual(len({module_bay.tree_id for module_bay in module_bays}), 2)
+            for module_bay in module_bays:
+                self.assertEqual((module_bay.level, module_bay.lft, module_bay.rght), (0, 1, 2))
+
+        # Adding an item beneath a bulk-created item should maintain the tree
+        root = InventoryItem.objects.get(device=devices[0], parent__isnull=True)
+        InventoryItem.objects.create(device=devices[0], parent=root, name='Inventory Item 5')
+        root.refresh_from_db()
+        self.assertEqual(root.get_descendant_count(), 4)
+
     def test_multiple_unnamed_devices(self):
 
         device1 = Device(
@@ -764,6 +998,26 @@ class ModuleBayTestCase(TestCase):
             module_1.clean()
             module_1.save()
 
+    def test_module_installation(self):
+        """
+        Check that module bays replicated from a module type are nested beneath the bay in which it is installed.
+        """
+        module_bay = ModuleBay.objects.create(device=Device.objects.first(), name='Module Bay 4', position='4')
+        module_type = ModuleType.objects.create(
+            manufacturer=Manufacturer.objects.first(), model='Module Type 2'
+        )
+        ModuleBayTemplate.objects.create(module_type=module_type, name='Sub-bay {module}-1', position='1')
+        ModuleBayTemplate.objects.create(module_type=module_type, name='Sub-bay {module}-2', position='2')
+
+        Module.objects.create(device=module_bay.device, module_bay=module_bay, module_type=module_type)
+
+        module_bay.refresh_from_db()
+        self.assertEqual(
+            [bay.name for bay in module_bay.get_children()],
+            ['Sub-bay 4-1', 'Sub-bay 4-2']
+        )
+        self.assertEqual(module_bay.get_descendant_count(), 2)
+
     def test_single_module_token(self):
         device_type = DeviceType.objects.first()
         device_role = DeviceRole.objects.first()
@@ -1,6 +1,13 @@
+import itertools
+import threading
+
 from django.apps import apps
 from django.contrib.contenttypes.models import ContentType
 from django.db import transaction
+from django.db.models import Q, Sum
+
+# Racks awaiting recalculation of their cached utilization (see enqueue_rack_utilization_update())
+_rack_utilization_queue = threading.local()
 
 
 def compile_path_node(ct_id, object_id):
@@ -44,19 +51,56 @@ def create_cablepath(terminations):
         cp.save()
 
 
+def bulk_create_cablepaths(origins):
+    """
+    Trace and create a CablePath for each of the given PathEndpoints, inserting the paths in bulk and recording each
+    on its origin with a single UPDATE. All origins must be of the same type. Returns the number of paths created.
+
+    :param origins: Iterable of PathEndpoint instances
+    """
+    from dcim.cablegraph import CableGraph
+    from dcim.models import CablePath
+
+    # Load everything reachable from the origins up front
+    origins = list(origins)
+    graph = CableGraph()
+    graph.preload(origins)
+
+    cable_paths = []
+    traced_origins = []
+    for origin in origins:
+        if cp := CablePath.from_origin([origin], graph=graph):
+            cp._nodes = list(itertools.chain(*cp.path))
+            cable_paths.append(cp)
+            traced_origins.append(origin)
+    if not cable_paths:
+        return 0
+
+    with transaction.atomic():
+        CablePath.objects.bulk_create(cable_paths)
+        for origin, cp in zip(traced_origins, cable_paths):
+            origin._path_id = cp.pk
+        type(traced_origins[0]).objects.bulk_update(traced_origins, ['_path'], batch_size=len(traced_origins))
+
+    return len(cable_paths)
+
+
 def rebuild_paths(terminations):
     """
-    Rebuild all CablePaths which traverse the specified nodes.
+    Rebuild all CablePaths which traverse the specified nodes. Each affected path is retraced only from the first hop
+    which includes any of the nodes, and is saved only if its trace has changed.
     """
+    from dcim.cablegraph import CableGraph
     from dcim.models import CablePath
 
-    for obj in terminations:
-        cable_paths = CablePath.objects.filter(_nodes__contains=obj)
+    nodes = [object_to_path_node(obj) for obj in terminations]
+    cable_paths = CablePath.objects.filter(_nodes__overlap=nodes)
 
-        with transaction.atomic():
-            for cp in cable_paths:
-                cp.delete()
-                create_cablepath(cp.origins)
+    # Share a single CableGraph among all retraced paths, so that each object is loaded only once
+    graph = CableGraph()
+    with transaction.atomic():
+        for cp in cable_paths:
+            cp.retrace_from(nodes, graph=graph)
 
 
 def update_interface_bridges(device, interface_templates, module=None):
@@ -76,3 +120,116 @@ def update_interface_bridges(device, interface_templates, module=None):
             )
             interface.full_clean()
             interface.save()
+
+
+def get_power_rack_ids(power_feed_ids=(), power_port_ids=(), power_outlet_ids=()):
+    """
+    Return the IDs of all racks whose power utilization depends on the specified PowerFeeds, PowerPorts, and/or
+    PowerOutlets: the racks of the PowerFeeds themselves, and of the PowerFeeds supplying the PowerPorts (or the
+    PowerPorts upstream of the PowerOutlets, or of any PowerOutlets to which the PowerPorts are connected).
+    """
+    PowerFeed = apps.get_model('dcim', 'PowerFeed')
+    PowerPort = apps.get_model('dcim', 'PowerPort')
+
+    rack_ids = set()
+    if power_feed_ids:
+        rack_ids.update(PowerFeed.objects.filter(pk__in=power_feed_ids).values_list('rack', flat=True))
+    if power_port_ids or power_outlet_ids:
+        power_port_cables = PowerPort.objects.filter(pk__in=power_port_ids, cable__isnull=False).values('cable')
+        upstream_ports = PowerPort.objects.filter(
+            Q(pk__in=power_port_ids) |
+            Q(poweroutlets__in=power_outlet_ids) |
+            Q(poweroutlets__cable__in=power_port_cables)
+        ).filter(cable__isnull=False)
+        rack_ids.update(
+            PowerFeed.objects.filter(cable__in=upstream_ports.values('cable')).values_list('rack', flat=True)
+        )
+    rack_ids.discard(None)
+
+    return rack_ids
+
+
+def update_rack_utilization(rack_ids, space=True, power=True):
+    """
+    Recalculate the cached space and/or power utilization figures for the specified racks.
+    """
+    Rack = apps.get_model('dcim', 'Rack')
+
+    racks = list(Rack.objects.filter(pk__in=rack_ids))
+    fields = []
+
+    if space:
+        occupancies = Rack.get_occupancies(racks, ignore_excluded_devices=True, include_reservations=True)
+        for rack in racks:
+            rack._occupied_units = occupancies[rack.pk].get_occupied_units()
+            rack._utilization = round(occupancies[rack.pk].get_utilization(), 2)
+        fields.extend(('_occupied_units', '_utilization'))
+
+    if power:
+        for rack in racks:
+            power_draw = rack.get_power_draw()
+            rack._allocated_power = power_draw['allocated']
+            rack._available_power = power_draw['available']
+            if power_draw['available']:
+                rack._power_utilization = round(power_draw['allocated'] / power_draw['available'] * 100, 2)
+            else:
+                rack._power_utilization = 0
+        fields.extend(('_allocated_power', '_available_power', '_power_utilization'))
+
+    if racks and fields:
+        Rack.objects.bulk_update(racks, fields)
+
+
+def enqueue_rack_utilization_update(rack_ids, space=False, power=False):
+    """
+    Schedule the cached utilization figures of the specified racks to be recalculated once the current transaction has
+    been committed. A rack queued several times within a transaction is recalculated only once.
+    """
+    rack_ids = {pk for pk in rack_ids if pk}
+    if not rack_ids:
+        return
+    if space:
+        _get_rack_utilization_queue('space').update(rack_ids)
+    if power:
+        _get_rack_utilization_queue('power').update(rack_ids)
+    transaction.on_commit(flush_rack_utilization_updates)
+
+
+def _get_rack_utilization_queue(name):
+    if not hasattr(_rack_utilization_queue, name):
+        setattr(_rack_utilization_queue, name, set())
+    return getattr(_rack_utilization_queue, name)
+
+
+def flush_rack_utilization_updates():
+    """
+    Recalculate the utilization of all racks queued by enqueue_rack_utilization_update().
+    """
+    space_ids = _get_rack_utilization_queue('space')
+    power_ids = _get_rack_utilization_queue('power')
+    _rack_utilization_queue.space = set()
+    _rack_utilization_queue.power = set()
+
+    if space_ids & power_ids:
+        update_rack_utilization(space_ids & power_ids)
+    if space_ids - power_ids:
+        update_rack_utilization(space_ids - power_ids, power=False)
+    if power_ids - space_ids:
+        update_rack_utilization(power_ids - space_ids, space=False)
+
+
+def get_rack_utilization(racks):
+    """
+    Return the aggregate space and power utilization (as percentages) of the given queryset of racks, computed from
+    their cached figures in a single query.
+    """
+    totals = racks.aggregate(
+        occupied_units=Sum('_occupied_units'),
+        total_units=Sum('u_height'),
+        allocated_power=Sum('_allocated_power'),
+        available_power=Sum('_available_power'),
+    )
+    return {
+        'space': float(totals['occupied_units'] / totals['total_units'] * 100) if totals['total_units'] else 0,
+        'power': totals['allocated_power'] / totals['available_power'] * 100 if totals['available_power'] else 0,
+    }
@@ -34,6 +34,8 @@ from wireless.models import WirelessLAN
 from . import filtersets, forms, tables
 from .choices import DeviceFaceChoices, InterfaceModeChoices
 from .models import *
+from .svg import render_rack_elevations
+from .utils import get_rack_utilization
 
 CABLE_TERMINATION_TYPES = {
     'dcim.consoleport': ConsolePort,
@@ -482,6 +484,9 @@ class SiteView(GetRelatedModelsMixin, generic.ObjectView):
                     (CircuitTermination.objects.restrict(request.user, 'view').filter(_site=instance), 'site_id'),
                 ),
             ),
+            'rack_utilization': get_rack_utilization(
+                Rack.objects.restrict(request.user, 'view').filter(site=instance)
+            ),
         }
 
 
@@ -580,6 +585,9 @@ class LocationView(GetRelatedModelsMixin, generic.ObjectView):
                         scope_type_id=location_content_type.id, scope_id=instance.id), 'location'),
                 ),
             ),
+            'rack_utilization': get_rack_utilization(
+                Rack.objects.restrict(request.user, 'view').filter(location__in=locations)
+            ),
         }
 
 
@@ -800,6 +808,15 @@ class RackElevationListView(generic.ObjectListView):
         if rack_face not in DeviceFaceChoices.values():
             rack_face = DeviceFaceChoices.FACE_FRONT
 
+        # Render the elevations for the current page in bulk. Each elevation is embedded from the REST API, which
+        # will then retrieve it from the cache rather than render it individually.
+        render_rack_elevations(
+            page.object_list,
+            face=rack_face,
+            user=request.user,
+            base_url=request.build_absolute_uri('/')
+        )
+
         return render(request, 'dcim/rack_elevation_list.html', {
             'paginator': paginator,
             'page': page,
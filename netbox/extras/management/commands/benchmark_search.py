@@ -0,0 +1,73 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.module_loading import import_string
+
+from netbox.search import LookupTypes
+
+DEFAULT_BACKENDS = (
+    'netbox.search.backends.CachedValueSearchBackend',
+    'netbox.search.backends.TrigramSearchBackend',
+)
+
+
+class Command(BaseCommand):
+    help = "Time searches of the cached values using one or more search backends"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'values',
+            metavar='value',
+            nargs='+',
+            help='One or more values to search for',
+        )
+        parser.add_argument(
+            '--backend',
+            action='append',
+            dest='backends',
+            metavar='BACKEND',
+            help="Dotted path to a search backend class (may be specified multiple times; default: all built-in "
+                 "backends)"
+        )
+        parser.add_argument(
+            '--lookup',
+            choices=[
+                LookupTypes.PARTIAL, LookupTypes.EXACT, LookupTypes.STARTSWITH, LookupTypes.ENDSWITH,
+                LookupTypes.REGEX,
+            ],
+            default=LookupTypes.PARTIAL,
+            help=f"The lookup type (default: {LookupTypes.PARTIAL})"
+        )
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=5,
+            help="Number of times to repeat each search (default: 5)"
+        )
+
+    def get_backends(self, paths):
+        backends = {}
+        for path in paths:
+            try:
+                backends[path.rsplit('.', 1)[-1]] = import_string(path)()
+            except ImportError:
+                raise CommandError(f"Failed to import search backend: {path}")
+        return backends
+
+    def handle(self, *values, **options):
+        backends = self.get_backends(options['backends'] or DEFAULT_BACKENDS)
+        iterations = max(options['iterations'], 1)
+
+        for value in options['values']:
+            self.stdout.write(f'Searching for "{value}" ({options["lookup"]}, {iterations} iterations)...')
+            for name, backend in backends.items():
+                timings = []
+                for _ in range(iterations):
+                    start_time = time.perf_counter()
+                    results = backend.search(value, lookup=options['lookup'])
+                    timings.append((time.perf_counter() - start_time) * 1000)
+                self.stdout.write(
+                    f'  {name}: {len(results)} results; min {min(timings):.1f}ms, '
+                    f'median {statistics.median(timings):.1f}ms, max {max(timings):.1f}ms'
+                )
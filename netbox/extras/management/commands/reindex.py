@@ -1,10 +1,55 @@
+import multiprocessing
+import time
+
 from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist
 from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.models import Count, Max, Min
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from django.utils.translation import gettext as _
 
 from netbox.registry import registry
 from netbox.search.backends import search_backend
 
+LAST_INDEXED_CACHE_KEY = 'search_last_indexed_{}'
+
+
+def _get_queryset(label, since=None):
+    model = registry['search'][label].model
+    queryset = model.objects.order_by()
+    if since is not None:
+        queryset = queryset.filter(last_updated__gt=since)
+    return queryset
+
+
+def _cache_objects(task):
+    # Entry point for worker processes; caches the objects of a model within a range of primary keys and returns the
+    # model label along with the number of objects processed, the number of entries cached, and the elapsed time
+    label, pk_range, since, remove_existing = task
+    start_time = time.monotonic()
+    queryset = _get_queryset(label, since)
+    if pk_range is not None:
+        queryset = queryset.filter(pk__gte=pk_range[0], pk__lt=pk_range[1])
+
+    object_count = 0
+
+    def counted(objects):
+        nonlocal object_count
+        for obj in objects:
+            object_count += 1
+            yield obj
+
+    cached_count = search_backend.cache(
+        counted(queryset.iterator()),
+        indexer=registry['search'][label],
+        remove_existing=remove_existing
+    )
+
+    return label, object_count, cached_count, time.monotonic() - start_time
+
 
 class Command(BaseCommand):
     help = 'Reindex objects for search'
@@ -21,6 +66,27 @@ class Command(BaseCommand):
             action='store_true',
             help="For each model, reindex objects only if no cache entries already exist"
         )
+        parser.add_argument(
+            '--since',
+            nargs='?',
+            const='last',
+            metavar='DATETIME',
+            help="Reindex only objects updated after the specified date & time (YYYY-MM-DD HH:MM:SS), or if no value "
+                 "is given, after the last successful reindexing of each model"
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help="Number of worker processes among which to distribute the objects to be indexed (default: 1)"
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=10000,
+            dest='chunk_size',
+            help="Number of primary key values comprising each unit of work distributed to workers (default: 10000)"
+        )
 
     def _get_indexers(self, *model_names):
         indexers = {}
@@ -59,7 +125,44 @@ class Command(BaseCommand):
 
         return indexers
 
+    def _get_since(self, value, label):
+        """
+        Return the date & time after which objects of the specified model must be reindexed, or None if all objects
+        must be reindexed.
+        """
+        if value is None:
+            return None
+        try:
+            registry['search'][label].model._meta.get_field('last_updated')
+        except FieldDoesNotExist:
+            return None
+        if value == 'last':
+            return cache.get(LAST_INDEXED_CACHE_KEY.format(label))
+        if (since := parse_datetime(value)) is None:
+            raise CommandError(f"Invalid date & time: {value}")
+        if timezone.is_naive(since):
+            since = timezone.make_aware(since)
+        return since
+
+    def _get_tasks(self, label, since, remove_existing, chunk_size):
+        """
+        Return the number of objects to be indexed for a model, and the tasks among which they are divided.
+        """
+        stats = _get_queryset(label, since).aggregate(count=Count('pk'), min_pk=Min('pk'), max_pk=Max('pk'))
+        if not stats['count']:
+            return 0, []
+        if stats['count'] <= chunk_size:
+            return stats['count'], [(label, None, since, remove_existing)]
+        tasks = [
+            (label, (pk, pk + chunk_size), since, remove_existing)
+            for pk in range(stats['min_pk'], stats['max_pk'] + 1, chunk_size)
+        ]
+        return stats['count'], tasks
+
     def handle(self, *model_labels, **kwargs):
+        workers = max(kwargs['workers'], 1)
+        chunk_size = max(kwargs['chunk_size'], 1)
+        start_time = time.monotonic()
 
         # Determine which models to reindex
         indexers = self._get_indexers(*model_labels)
@@ -67,8 +170,8 @@ class Command(BaseCommand):
             raise CommandError(_("No indexers found!"))
         self.stdout.write(f'Reindexing {len(indexers)} models.')
 
-        # Clear cached values for the specified models (if not being lazy)
-        if not kwargs['lazy']:
+        # Clear cached values for the specified models (if not being lazy or incremental)
+        if not kwargs['lazy'] and kwargs['since'] is None:
             if model_labels:
                 content_types = [ContentType.objects.get_for_model(model) for model in indexers.keys()]
             else:
@@ -79,27 +182,87 @@ class Command(BaseCommand):
             deleted_count = search_backend.clear(object_types=content_types)
             self.stdout.write(f'{deleted_count} entries deleted.')
 
-        # Index models
-        self.stdout.write('Indexing models')
-        for model, idx in indexers.items():
-            app_label = model._meta.app_label
-            model_name = model._meta.model_name
-            self.stdout.write(f'  {app_label}.{model_name}... ', ending='')
-            self.stdout.flush()
+        # Determine the objects to be indexed for each model
+        self.stdout.write('Determining objects to index')
+        pending = {}
+        tasks = []
+        for model in indexers:
+            label = f'{model._meta.app_label}.{model._meta.model_name}'
+            content_type = ContentType.objects.get_for_model(model)
 
             if kwargs['lazy']:
-                content_type = ContentType.objects.get_for_model(model)
                 if cached_count := search_backend.count(object_types=[content_type]):
-                    self.stdout.write(f'Skipping (found {cached_count} existing).')
+                    self.stdout.write(f'  {label}: Skipping (found {cached_count} existing).')
                     continue
 
-            i = search_backend.cache(model.objects.iterator(), remove_existing=False)
-            if i:
-                self.stdout.write(f'{i} entries cached.')
+            # Reindex only recently updated objects (if possible), or else all objects. The time from which the next
+            # incremental reindexing must begin is taken before any objects are retrieved.
+            indexed_at = timezone.now()
+            since = self._get_since(kwargs['since'], label)
+            if kwargs['since'] is not None and since is None:
+                search_backend.clear(object_types=[content_type])
+            object_count, model_tasks = self._get_tasks(label, since, since is not None, chunk_size)
+            pending[label] = {
+                'indexed_at': indexed_at,
+                'objects': object_count,
+                'tasks': len(model_tasks),
+                'processed': 0,
+                'cached': 0,
+                'elapsed': 0,
+            }
+            if since is not None:
+                self.stdout.write(f'  {label}: {object_count} objects updated since {since.isoformat()}')
             else:
-                self.stdout.write('No objects found.')
+                self.stdout.write(f'  {label}: {object_count} objects')
+            tasks.extend(model_tasks)
 
-        msg = 'Completed.'
+        # Worker processes are forked and must not share the parent's database connections
+        pool = None
+        if workers > 1 and len(tasks) > 1:
+            connections.close_all()
+            pool = multiprocessing.get_context('fork').Pool(workers)
+            self.stdout.write(f'Indexing models using {workers} worker processes')
+        else:
+            self.stdout.write('Indexing models')
+
+        # Index models, reporting the progress of each as its tasks complete
+        total_objects = total_cached = 0
+        try:
+            if pool is not None:
+                results = pool.imap_unordered(_cache_objects, tasks)
+            else:
+                results = (_cache_objects(task) for task in tasks)
+            for label, object_count, cached_count, elapsed in results:
+                model_stats = pending[label]
+                model_stats['tasks'] -= 1
+                model_stats['processed'] += object_count
+                model_stats['cached'] += cached_count
+                model_stats['elapsed'] += elapsed
+                total_objects += object_count
+                total_cached += cached_count
+                if model_stats['tasks']:
+                    if kwargs['verbosity'] > 1:
+                        self.stdout.write(f'  {label}: {model_stats["processed"]}/{model_stats["objects"]} objects')
+                    continue
+                rate = model_stats['processed'] / model_stats['elapsed'] if model_stats['elapsed'] else 0
+                self.stdout.write(
+                    f'  {label}: {model_stats["cached"]} entries cached for {model_stats["processed"]} objects '
+                    f'({rate:.0f} objects/s)'
+                )
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+
+        # Record the completion of each model
+        for label, model_stats in pending.items():
+            cache.set(LAST_INDEXED_CACHE_KEY.format(label), model_stats['indexed_at'], None)
+
+        elapsed = time.monotonic() - start_time
+        msg = (
+            f'Completed. Indexed {total_objects} objects ({total_cached} entries) in {elapsed:.2f}s '
+            f'({total_objects / elapsed:.0f} objects/s).'
+        )
         if total_count := search_backend.size:
             msg += f' Total entries: {total_count}'
         self.stdout.write(msg, self.style.SUCCESS)
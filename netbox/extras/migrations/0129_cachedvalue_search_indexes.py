@@ -0,0 +1,50 @@
+from django.db import migrations, transaction
+from django.db.utils import ProgrammingError
+
+
+def create_trigram_index(apps, schema_editor):
+    """
+    Create a pg_trgm GIN index to support case-insensitive partial matching of cached values, i.e.
+    UPPER(value::text) LIKE UPPER('%foo%'). This is skipped if the pg_trgm extension is not available to the
+    database server, or if it is not installed and the database user lacks permission to install it.
+    """
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+        if cursor.fetchone() is None:
+            return
+        try:
+            # Use a savepoint so that a failure does not abort the migration's transaction
+            with transaction.atomic(using=schema_editor.connection.alias):
+                cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        except ProgrammingError:
+            return
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS extras_cachedvalue_value_trgm ON extras_cachedvalue "
+            "USING gin ((UPPER(value::text)) gin_trgm_ops)"
+        )
+
+
+def drop_trigram_index(apps, schema_editor):
+    schema_editor.execute("DROP INDEX IF EXISTS extras_cachedvalue_value_trgm")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('extras', '0128_tableconfig'),
+    ]
+
+    operations = [
+        # Supports the containment of IP addresses within cached CIDR values, i.e. CAST(value AS INET) >>= '10.0.0.1'
+        migrations.RunSQL(
+            sql=(
+                "CREATE INDEX extras_cachedvalue_value_cidr ON extras_cachedvalue "
+                "USING gist ((inet(value)) inet_ops) WHERE type = 'cidr'"
+            ),
+            reverse_sql="DROP INDEX extras_cachedvalue_value_cidr"
+        ),
+        migrations.RunPython(
+            code=create_trigram_index,
+            reverse_code=drop_trigram_index
+        ),
+    ]
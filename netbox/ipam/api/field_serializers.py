@@ -3,12 +3,40 @@ from rest_framework import serializers
 
 from netaddr import AddrFormatError, IPNetwork
 
+from netbox.config import get_config
+
 __all__ = (
+    'AllocationCountField',
     'IPAddressField',
     'IPNetworkField',
+    'validate_allocation_count',
 )
 
 
+class AllocationCountField(serializers.IntegerField):
+    """
+    The number of objects to be allocated by a single request, which may not exceed MAX_PAGE_SIZE (if set)
+    """
+    def __init__(self, **kwargs):
+        kwargs.setdefault('min_value', 1)
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        value = super().to_internal_value(data)
+        validate_allocation_count(value)
+        return value
+
+
+def validate_allocation_count(count):
+    """
+    Raise a ValidationError if the total number of objects to be allocated by a request exceeds MAX_PAGE_SIZE.
+    """
+    if (max_page_size := get_config().MAX_PAGE_SIZE) and count > max_page_size:
+        raise serializers.ValidationError(
+            _("No more than {max} objects may be allocated at once.").format(max=max_page_size)
+        )
+
+
 class IPAddressField(serializers.CharField):
     """
     An IPv4 or IPv6 address with optional mask
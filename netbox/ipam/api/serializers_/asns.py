@@ -4,11 +4,13 @@ from ipam.models import ASN, ASNRange, RIR
 from netbox.api.fields import RelatedObjectCountField
 from netbox.api.serializers import NetBoxModelSerializer
 from tenancy.api.serializers_.tenants import TenantSerializer
+from ..field_serializers import AllocationCountField
 
 __all__ = (
     'ASNRangeSerializer',
     'ASNSerializer',
     'AvailableASNSerializer',
+    'BulkCreateAvailableASNSerializer',
     'RIRSerializer',
 )
 
@@ -73,3 +75,21 @@ class AvailableASNSerializer(serializers.Serializer):
             'rir': rir,
             'asn': asn,
         }
+
+
+class BulkCreateAvailableASNSerializer(NetBoxModelSerializer):
+    """
+    Used to allocate a number of available ASNs at once. All attributes are applied to each ASN.
+    """
+    count = AllocationCountField()
+    tenant = TenantSerializer(nested=True, required=False, allow_null=True)
+
+    class Meta:
+        model = ASN
+        fields = [
+            'count', 'tenant', 'description', 'comments', 'tags', 'custom_fields',
+        ]
+
+    def validate(self, data):
+        # Bypass model validation since we don't have an ASN yet
+        return data
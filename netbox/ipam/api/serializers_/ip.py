@@ -6,6 +6,7 @@ from dcim.constants import LOCATION_SCOPE_TYPES
 from ipam.choices import *
 from ipam.constants import IPADDRESS_ASSIGNMENT_MODELS
 from ipam.models import Aggregate, IPAddress, IPRange, Prefix
+from ipam.utils import defer_ip_address_uniqueness_checks, validate_ip_address_uniqueness
 from netbox.api.fields import ChoiceField, ContentTypeField
 from netbox.api.serializers import NetBoxModelSerializer
 from tenancy.api.serializers_.tenants import TenantSerializer
@@ -15,7 +16,7 @@ from .nested import NestedIPAddressSerializer
 from .roles import RoleSerializer
 from .vlans import VLANSerializer
 from .vrfs import VRFSerializer
-from ..field_serializers import IPAddressField, IPNetworkField
+from ..field_serializers import AllocationCountField, IPAddressField, IPNetworkField
 
 __all__ = (
     'AggregateSerializer',
@@ -23,6 +24,7 @@ __all__ = (
     'AvailablePrefixSerializer',
     'IPAddressSerializer',
     'IPRangeSerializer',
+    'PrefixCarveSerializer',
     'PrefixLengthSerializer',
     'PrefixSerializer',
 )
@@ -62,6 +64,7 @@ class PrefixSerializer(NetBoxModelSerializer):
     role = RoleSerializer(nested=True, required=False, allow_null=True)
     children = serializers.IntegerField(read_only=True)
     _depth = serializers.IntegerField(read_only=True)
+    utilization = serializers.DecimalField(max_digits=5, decimal_places=2, read_only=True)
     prefix = IPNetworkField()
 
     class Meta:
@@ -69,7 +72,7 @@ class PrefixSerializer(NetBoxModelSerializer):
         fields = [
             'id', 'url', 'display_url', 'display', 'family', 'prefix', 'vrf', 'scope_type', 'scope_id', 'scope',
             'tenant', 'vlan', 'status', 'role', 'is_pool', 'mark_utilized', 'description', 'comments', 'tags',
-            'custom_fields', 'created', 'last_updated', 'children', '_depth',
+            'custom_fields', 'created', 'last_updated', 'children', '_depth', 'utilization',
         ]
         brief_fields = ('id', 'url', 'display', 'family', 'prefix', 'description', '_depth')
 
@@ -109,6 +112,48 @@ class PrefixLengthSerializer(serializers.Serializer):
         return data
 
 
+class PrefixCarveSerializer(PrefixSerializer):
+    """
+    A request to carve a number of child prefixes of equal length from the available space within a parent prefix. All
+    other attributes are applied to each new prefix. Model validation is performed by the view once the prefixes have
+    been allocated.
+    """
+    prefix = None
+    vrf = None
+    prefix_length = serializers.IntegerField(min_value=0, max_value=128)
+    count = AllocationCountField(default=1)
+    align_length = serializers.IntegerField(
+        min_value=0,
+        max_value=128,
+        required=False,
+        help_text='Each prefix must begin on a boundary of this prefix length (default: the prefix length)'
+    )
+    contiguous = serializers.BooleanField(
+        default=False,
+        help_text='All prefixes must be adjacent (at the requested alignment) within a single block of free space'
+    )
+
+    class Meta(PrefixSerializer.Meta):
+        fields = [
+            'prefix_length', 'count', 'align_length', 'contiguous', 'scope_type', 'scope_id', 'tenant', 'vlan',
+            'status', 'role', 'is_pool', 'mark_utilized', 'description', 'comments', 'tags', 'custom_fields',
+        ]
+
+    def validate(self, data):
+        parent = self.context['prefix']
+        max_length = 32 if parent.family == 4 else 128
+        prefix_length = data['prefix_length']
+        if not parent.prefix.prefixlen <= prefix_length <= max_length:
+            raise serializers.ValidationError({
+                'prefix_length': f'Prefix length must be between {parent.prefix.prefixlen} and {max_length}'
+            })
+        if 'align_length' in data and not parent.prefix.prefixlen <= data['align_length'] <= prefix_length:
+            raise serializers.ValidationError({
+                'align_length': f'Alignment length must be between {parent.prefix.prefixlen} and {prefix_length}'
+            })
+        return data
+
+
 class AvailablePrefixSerializer(serializers.Serializer):
     """
     Representation of a prefix which does not exist in the database.
@@ -141,13 +186,14 @@ class IPRangeSerializer(NetBoxModelSerializer):
     tenant = TenantSerializer(nested=True, required=False, allow_null=True)
     status = ChoiceField(choices=IPRangeStatusChoices, required=False)
     role = RoleSerializer(nested=True, required=False, allow_null=True)
+    utilization = serializers.DecimalField(max_digits=5, decimal_places=2, read_only=True)
 
     class Meta:
         model = IPRange
         fields = [
             'id', 'url', 'display_url', 'display', 'family', 'start_address', 'end_address', 'size', 'vrf', 'tenant',
             'status', 'role', 'description', 'comments', 'tags', 'custom_fields', 'created', 'last_updated',
-            'mark_populated', 'mark_utilized',
+            'mark_populated', 'mark_utilized', 'utilization',
         ]
         brief_fields = ('id', 'url', 'display', 'family', 'start_address', 'end_address', 'description')
 
@@ -156,6 +202,25 @@ class IPRangeSerializer(NetBoxModelSerializer):
 # IP addresses
 #
 
+class IPAddressListSerializer(serializers.ListSerializer):
+    """
+    Enforces unique IP space for a batch of IPAddresses as a whole (see validate_ip_address_uniqueness()), rather than
+    for each IPAddress individually.
+    """
+    def to_internal_value(self, data):
+        with defer_ip_address_uniqueness_checks():
+            attrs = super().to_internal_value(data)
+
+        errors = validate_ip_address_uniqueness([
+            IPAddress(address=ip_attrs.get('address'), vrf=ip_attrs.get('vrf'), role=ip_attrs.get('role', ''))
+            for ip_attrs in attrs
+        ])
+        if any(errors):
+            raise serializers.ValidationError(errors)
+
+        return attrs
+
+
 class IPAddressSerializer(NetBoxModelSerializer):
     family = ChoiceField(choices=IPAddressFamilyChoices, read_only=True)
     address = IPAddressField()
@@ -180,6 +245,7 @@ class IPAddressSerializer(NetBoxModelSerializer):
             'dns_name', 'description', 'comments', 'tags', 'custom_fields', 'created', 'last_updated',
         ]
         brief_fields = ('id', 'url', 'display', 'family', 'address', 'description')
+        list_serializer_class = IPAddressListSerializer
 
     @extend_schema_field(serializers.JSONField(allow_null=True))
     def get_assigned_object(self, obj):
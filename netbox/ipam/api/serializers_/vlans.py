@@ -13,9 +13,11 @@ from utilities.api import get_serializer_for_model
 from vpn.api.serializers_.l2vpn import L2VPNTerminationSerializer
 from .nested import NestedVLANSerializer
 from .roles import RoleSerializer
+from ..field_serializers import AllocationCountField
 
 __all__ = (
     'AvailableVLANSerializer',
+    'BulkCreateAvailableVLANSerializer',
     'CreateAvailableVLANSerializer',
     'VLANGroupSerializer',
     'VLANSerializer',
@@ -118,6 +120,24 @@ class CreateAvailableVLANSerializer(NetBoxModelSerializer):
         return data
 
 
+class BulkCreateAvailableVLANSerializer(CreateAvailableVLANSerializer):
+    """
+    Used to allocate a number of available VLANs at once. All attributes are applied to each VLAN; the placeholder
+    {vid} within the name is replaced with each VLAN's ID.
+    """
+    count = AllocationCountField()
+
+    class Meta(CreateAvailableVLANSerializer.Meta):
+        fields = ['count', *CreateAvailableVLANSerializer.Meta.fields]
+
+    def validate(self, data):
+        if data['count'] > 1 and '{vid}' not in data['name']:
+            raise serializers.ValidationError({
+                'name': 'The name must include the placeholder {vid} when allocating multiple VLANs'
+            })
+        return data
+
+
 class VLANTranslationRuleSerializer(NetBoxModelSerializer):
 
     class Meta:
@@ -44,6 +44,11 @@ urlpatterns = [
         views.AvailablePrefixesView.as_view(),
         name='prefix-available-prefixes'
     ),
+    path(
+        'prefixes/<int:pk>/carve-prefixes/',
+        views.CarvePrefixesView.as_view(),
+        name='prefix-carve-prefixes'
+    ),
     path(
         'prefixes/<int:pk>/available-ips/',
         views.PrefixAvailableIPAddressesView.as_view(),
@@ -1,23 +1,27 @@
 from copy import deepcopy
 
 from django.contrib.contenttypes.prefetch import GenericPrefetch
-from django.core.exceptions import ObjectDoesNotExist, PermissionDenied
+from django.core.exceptions import ObjectDoesNotExist, PermissionDenied, ValidationError as DjangoValidationError
 from django.db import transaction
 from django.shortcuts import get_object_or_404
 from django.utils.translation import gettext as _
 from django_pglocks import advisory_lock
 from drf_spectacular.utils import extend_schema
-from netaddr import IPSet
+from netaddr import AddrFormatError, IPNetwork, IPSet
 from rest_framework import status
 from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework.routers import APIRootView
+from rest_framework.serializers import ListSerializer
 from rest_framework.views import APIView
 
 from dcim.models import Interface
 from ipam import filtersets
 from ipam.models import *
-from ipam.utils import get_next_available_prefix
+from ipam.utils import (
+    bulk_create_objects, bulk_create_prefixes, carve_prefixes, defer_prefix_hierarchy_updates,
+    get_next_available_prefix, ip_address_lock,
+)
 from netbox.api.viewsets import NetBoxModelViewSet
 from netbox.api.viewsets.mixins import ObjectValidationMixin
 from netbox.config import get_config
@@ -25,6 +29,7 @@ from netbox.constants import ADVISORY_LOCK_KEYS
 from utilities.api import get_serializer_for_model
 from virtualization.models import VMInterface
 from . import serializers
+from .field_serializers import validate_allocation_count
 
 
 class IPAMRootView(APIRootView):
@@ -93,6 +98,21 @@ class PrefixViewSet(NetBoxModelViewSet):
             return serializers.PrefixLengthSerializer
         return super().get_serializer_class()
 
+    def perform_create(self, serializer):
+        # When creating prefixes in bulk, rebuild the prefix hierarchy once all have been saved
+        if isinstance(serializer, ListSerializer):
+            with defer_prefix_hierarchy_updates():
+                return super().perform_create(serializer)
+        return super().perform_create(serializer)
+
+    def perform_bulk_update(self, objects, update_data, partial):
+        with defer_prefix_hierarchy_updates():
+            return super().perform_bulk_update(objects, update_data, partial)
+
+    def perform_bulk_destroy(self, objects):
+        with defer_prefix_hierarchy_updates():
+            return super().perform_bulk_destroy(objects)
+
 
 class IPRangeViewSet(NetBoxModelViewSet):
     queryset = IPRange.objects.all()
@@ -117,17 +137,45 @@ class IPAddressViewSet(NetBoxModelViewSet):
     serializer_class = serializers.IPAddressSerializer
     filterset_class = filtersets.IPAddressFilterSet
 
-    @advisory_lock(ADVISORY_LOCK_KEYS['available-ips'])
+    def _get_requested_addresses(self, data, instance=None):
+        """
+        Return the (VRF ID, address) pairs specified by the request data (a dict or list of dicts), falling back to
+        the current values of an existing instance. Invalid values are ignored; they will fail validation.
+        """
+        vrf_field = self.get_serializer().fields['vrf']
+        addresses = []
+        for item in (data if isinstance(data, list) else [data]):
+            if not isinstance(item, dict):
+                continue
+            try:
+                vrf_id = instance.vrf_id if instance else None
+                if item.get('vrf'):
+                    vrf_id = vrf_field.to_internal_value(item['vrf']).pk
+                elif 'vrf' in item:
+                    vrf_id = None
+                address = item.get('address', instance.address if instance else None)
+                addresses.append((vrf_id, IPNetwork(str(address))))
+            except (ValidationError, AddrFormatError, ValueError, TypeError):
+                continue
+        return addresses
+
     def create(self, request, *args, **kwargs):
-        return super().create(request, *args, **kwargs)
+        with ip_address_lock(self._get_requested_addresses(request.data)):
+            return super().create(request, *args, **kwargs)
 
-    @advisory_lock(ADVISORY_LOCK_KEYS['available-ips'])
     def update(self, request, *args, **kwargs):
-        return super().update(request, *args, **kwargs)
+        # Lock both the current and the requested addresses
+        addresses = []
+        if instance := IPAddress.objects.filter(pk=kwargs.get('pk')).first():
+            addresses.append((instance.vrf_id, instance.address))
+        addresses.extend(self._get_requested_addresses(request.data, instance=instance))
+        with ip_address_lock(addresses):
+            return super().update(request, *args, **kwargs)
 
-    @advisory_lock(ADVISORY_LOCK_KEYS['available-ips'])
     def destroy(self, request, *args, **kwargs):
-        return super().destroy(request, *args, **kwargs)
+        addresses = IPAddress.objects.filter(pk=kwargs.get('pk')).values_list('vrf_id', 'address')
+        with ip_address_lock(addresses):
+            return super().destroy(request, *args, **kwargs)
 
 
 class FHRPGroupViewSet(NetBoxModelViewSet):
@@ -205,6 +253,7 @@ class AvailableObjectsView(ObjectValidationMixin, APIView):
     """
     read_serializer_class = None
     write_serializer_class = None
+    bulk_write_serializer_class = None
     advisory_lock_key = None
 
     def get_parent(self, request, pk):
@@ -225,6 +274,12 @@ class AvailableObjectsView(ObjectValidationMixin, APIView):
         """
         return {}
 
+    def get_lock(self, parent):
+        """
+        Return the lock to be held while allocating objects within the parent.
+        """
+        return advisory_lock(ADVISORY_LOCK_KEYS[self.advisory_lock_key])
+
     def check_sufficient_available(self, requested_objects, available_objects):
         """
         Check if there exist a sufficient number of available objects to satisfy the request.
@@ -238,6 +293,21 @@ class AvailableObjectsView(ObjectValidationMixin, APIView):
         """
         return requested_objects
 
+    def get_bulk_objects(self, parent, available_objects, attrs):
+        """
+        Return the unsaved objects to be created by a bulk allocation, one for each of the allocated available
+        objects. All other attributes are applied to each object.
+        """
+        raise NotImplementedError()
+
+    def validate_bulk_objects(self, parent, instances):
+        """
+        Validate the objects to be created by a bulk allocation, raising a ValidationError if any is invalid. The
+        uniqueness of the allocated attributes is ensured by the allocation itself.
+        """
+        for instance in instances:
+            instance.full_clean(validate_unique=False, validate_constraints=False)
+
     def get(self, request, pk):
         parent = self.get_parent(request, pk)
         limit = get_results_limit(request)
@@ -251,6 +321,9 @@ class AvailableObjectsView(ObjectValidationMixin, APIView):
         return Response(serializer.data)
 
     def post(self, request, pk):
+        if self.bulk_write_serializer_class and isinstance(request.data, dict) and 'count' in request.data:
+            return self.bulk_allocate(request, pk)
+
         self.queryset = self.queryset.restrict(request.user, 'add')
         parent = self.get_parent(request, pk)
 
@@ -269,7 +342,7 @@ class AvailableObjectsView(ObjectValidationMixin, APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        with advisory_lock(ADVISORY_LOCK_KEYS[self.advisory_lock_key]):
+        with self.get_lock(parent):
             available_objects = self.get_available_objects(parent, limit)
 
             # Determine if the requested number of objects is available
@@ -303,18 +376,65 @@ class AvailableObjectsView(ObjectValidationMixin, APIView):
 
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+    def bulk_allocate(self, request, pk):
+        """
+        Allocate the next N available objects within the parent, creating all objects with a single INSERT.
+        """
+        model = self.queryset.model
+        self.queryset = self.queryset.restrict(request.user, 'add')
+        parent = self.get_parent(request, pk)
+
+        serializer = self.bulk_write_serializer_class(data=request.data, context={
+            'request': request,
+            **self.get_extra_context(parent),
+        })
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        attrs = serializer.validated_data.copy()
+        count = attrs.pop('count')
+        tags = attrs.pop('tags', [])
+
+        with self.get_lock(parent):
+            available_objects = self.get_available_objects(parent, count)
+            if len(available_objects) < count:
+                return Response(
+                    {"detail": "Insufficient resources are available to satisfy the request"},
+                    status=status.HTTP_409_CONFLICT
+                )
+
+            instances = self.get_bulk_objects(parent, available_objects, attrs)
+            try:
+                self.validate_bulk_objects(parent, instances)
+            except DjangoValidationError as e:
+                return Response(e.message_dict, status=status.HTTP_400_BAD_REQUEST)
+
+            try:
+                with transaction.atomic():
+                    bulk_create_objects(model, instances, [tags] * len(instances))
+                    self._validate_objects(instances)
+            except ObjectDoesNotExist:
+                raise PermissionDenied()
+
+        instances = model.objects.filter(pk__in=[instance.pk for instance in instances])
+        serializer_class = get_serializer_for_model(model)
+        return Response(
+            serializer_class(instances, many=True, context={'request': request}).data,
+            status=status.HTTP_201_CREATED
+        )
+
 
 class AvailableASNsView(AvailableObjectsView):
     queryset = ASN.objects.all()
     read_serializer_class = serializers.AvailableASNSerializer
     write_serializer_class = serializers.AvailableASNSerializer
+    bulk_write_serializer_class = serializers.BulkCreateAvailableASNSerializer
     advisory_lock_key = 'available-asns'
 
     def get_parent(self, request, pk):
         return get_object_or_404(ASNRange.objects.restrict(request.user), pk=pk)
 
     def get_available_objects(self, parent, limit=None):
-        return parent.get_available_asns()[:limit]
+        return parent.get_available_asns(limit)
 
     def get_extra_context(self, parent):
         return {
@@ -331,6 +451,9 @@ class AvailableASNsView(AvailableObjectsView):
 
         return requested_objects
 
+    def get_bulk_objects(self, parent, available_objects, attrs):
+        return [ASN(rir=parent.rir, asn=asn, **attrs) for asn in available_objects]
+
     @extend_schema(methods=["get"], responses={200: serializers.AvailableASNSerializer(many=True)})
     def get(self, request, pk):
         return super().get(request, pk)
@@ -397,6 +520,77 @@ class AvailablePrefixesView(AvailableObjectsView):
         return super().post(request, pk)
 
 
+class CarvePrefixesView(ObjectValidationMixin, APIView):
+    """
+    Carve batches of equally sized child prefixes from the available space within a parent prefix (see
+    carve_prefixes()), and create them in bulk.
+    """
+    queryset = Prefix.objects.all()
+
+    @extend_schema(
+        request=serializers.PrefixCarveSerializer(many=True),
+        responses={201: serializers.PrefixSerializer(many=True)},
+    )
+    def post(self, request, pk):
+        self.queryset = self.queryset.restrict(request.user, 'add')
+        parent = get_object_or_404(Prefix.objects.restrict(request.user), pk=pk)
+
+        # Normalize request data to a list of batches
+        requested_batches = request.data if isinstance(request.data, list) else [request.data]
+        serializer = serializers.PrefixCarveSerializer(data=requested_batches, many=True, context={
+            'request': request,
+            'prefix': parent,
+        })
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            validate_allocation_count(sum(attrs['count'] for attrs in serializer.validated_data))
+        except ValidationError as e:
+            return Response({'count': e.detail}, status=status.HTTP_400_BAD_REQUEST)
+
+        with advisory_lock(ADVISORY_LOCK_KEYS['available-prefixes']):
+            allocations = carve_prefixes(parent.get_available_ranges(), parent.family, serializer.validated_data)
+            if allocations is None:
+                return Response(
+                    {"detail": "Insufficient resources are available to satisfy the request"},
+                    status=status.HTTP_409_CONFLICT
+                )
+
+            # Instantiate and validate the prefixes of each batch, reporting the first error within each batch
+            prefixes = []
+            tags = []
+            errors = []
+            for attrs, networks in zip(serializer.validated_data, allocations):
+                attrs = attrs.copy()
+                batch_tags = attrs.pop('tags', [])
+                for field_name in ('prefix_length', 'count', 'align_length', 'contiguous'):
+                    attrs.pop(field_name, None)
+                batch = [Prefix(prefix=network, vrf=parent.vrf, **attrs) for network in networks]
+                try:
+                    for prefix in batch:
+                        prefix.full_clean()
+                    errors.append({})
+                except DjangoValidationError as e:
+                    errors.append(e.message_dict)
+                prefixes.extend(batch)
+                tags.extend([batch_tags] * len(batch))
+            if any(errors):
+                return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+
+            try:
+                with transaction.atomic():
+                    bulk_create_prefixes(prefixes, tags)
+                    self._validate_objects(prefixes)
+            except ObjectDoesNotExist:
+                raise PermissionDenied()
+
+        prefixes = Prefix.objects.filter(pk__in=[prefix.pk for prefix in prefixes])
+        return Response(
+            serializers.PrefixSerializer(prefixes, many=True, context={'request': request}).data,
+            status=status.HTTP_201_CREATED
+        )
+
+
 class AvailableIPAddressesView(AvailableObjectsView):
     queryset = IPAddress.objects.all()
     read_serializer_class = serializers.AvailableIPSerializer
@@ -404,12 +598,13 @@ class AvailableIPAddressesView(AvailableObjectsView):
     advisory_lock_key = 'available-ips'
 
     def get_available_objects(self, parent, limit=None):
-        # Calculate available IPs within the parent
+        # Calculate available IPs within the parent, retrieving only as many free ranges as are needed
         ip_list = []
-        for index, ip in enumerate(parent.get_available_ips(), start=1):
-            ip_list.append(ip)
-            if index == limit:
-                break
+        for iprange in parent.get_available_ip_ranges():
+            for ip in iprange:
+                ip_list.append(ip)
+                if len(ip_list) == limit:
+                    return ip_list
         return ip_list
 
     def get_extra_context(self, parent):
@@ -446,24 +641,33 @@ class PrefixAvailableIPAddressesView(AvailableIPAddressesView):
     def get_parent(self, request, pk):
         return get_object_or_404(Prefix.objects.restrict(request.user), pk=pk)
 
+    def get_lock(self, parent):
+        # Lock only the prefix tree containing the parent prefix
+        return ip_address_lock([(parent.vrf_id, parent.prefix)])
+
 
 class IPRangeAvailableIPAddressesView(AvailableIPAddressesView):
 
     def get_parent(self, request, pk):
         return get_object_or_404(IPRange.objects.restrict(request.user), pk=pk)
 
+    def get_lock(self, parent):
+        # Lock only the prefix tree containing the parent range
+        return ip_address_lock([(parent.vrf_id, parent.start_address)])
+
 
 class AvailableVLANsView(AvailableObjectsView):
     queryset = VLAN.objects.all()
     read_serializer_class = serializers.AvailableVLANSerializer
     write_serializer_class = serializers.CreateAvailableVLANSerializer
+    bulk_write_serializer_class = serializers.BulkCreateAvailableVLANSerializer
     advisory_lock_key = 'available-vlans'
 
     def get_parent(self, request, pk):
         return get_object_or_404(VLANGroup.objects.restrict(request.user), pk=pk)
 
     def get_available_objects(self, parent, limit=None):
-        return parent.get_available_vids()[:limit]
+        return parent.get_available_vids(limit)
 
     def get_extra_context(self, parent):
         return {
@@ -479,6 +683,22 @@ class AvailableVLANsView(AvailableObjectsView):
 
         return requested_objects
 
+    def get_bulk_objects(self, parent, available_objects, attrs):
+        attrs = attrs.copy()
+        name = attrs.pop('name')
+        return [
+            VLAN(group=parent, vid=vid, name=name.replace('{vid}', str(vid)), **attrs) for vid in available_objects
+        ]
+
+    def validate_bulk_objects(self, parent, instances):
+        super().validate_bulk_objects(parent, instances)
+
+        # Check the uniqueness of all names within the group with a single query
+        if existing := VLAN.objects.filter(group=parent, name__in=[vlan.name for vlan in instances]).first():
+            raise DjangoValidationError({
+                'name': _("A VLAN named {name} already exists in this group.").format(name=existing.name)
+            })
+
     @extend_schema(methods=["get"], responses={200: serializers.AvailableVLANSerializer(many=True)})
     def get(self, request, pk):
         return super().get(request, pk)
@@ -15,7 +15,8 @@ from netbox.filtersets import ChangeLoggedModelFilterSet, OrganizationalModelFil
 from tenancy.filtersets import ContactModelFilterSet, TenancyFilterSet
 
 from utilities.filters import (
-    ContentTypeFilter, MultiValueCharFilter, MultiValueNumberFilter, NumericArrayFilter, TreeNodeMultipleChoiceFilter,
+    ContentTypeFilter, MultiValueCharFilter, MultiValueDecimalFilter, MultiValueNumberFilter, NumericArrayFilter,
+    TreeNodeMultipleChoiceFilter,
 )
 from virtualization.models import VirtualMachine, VMInterface
 from vpn.models import L2VPN
@@ -385,6 +386,10 @@ class PrefixFilterSet(NetBoxModelFilterSet, ScopedFilterSet, TenancyFilterSet, C
         choices=PrefixStatusChoices,
         null_value=None
     )
+    utilization = MultiValueDecimalFilter(
+        field_name='_utilization',
+        label=_('Utilization (%)'),
+    )
 
     class Meta:
         model = Prefix
@@ -501,6 +506,10 @@ class IPRangeFilterSet(TenancyFilterSet, NetBoxModelFilterSet, ContactModelFilte
         method='search_by_parent',
         label=_('Parent prefix'),
     )
+    utilization = MultiValueDecimalFilter(
+        field_name='_utilization',
+        label=_('Utilization (%)'),
+    )
 
     class Meta:
         model = IPRange
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from ipam.models import IPRange, Prefix
+from ipam.utils import update_iprange_utilization, update_prefix_utilization
+
+
+class Command(BaseCommand):
+    help = "Recalculate the cached utilization of all prefixes and IP ranges"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=500, dest='batch_size',
+            help="Number of prefixes or IP ranges to recalculate per batch (default: 500)"
+        )
+
+    def handle(self, *args, **options):
+        batch_size = max(options['batch_size'], 1)
+
+        for model, update_utilization in (
+            (Prefix, update_prefix_utilization),
+            (IPRange, update_iprange_utilization),
+        ):
+            verbose_name = model._meta.verbose_name_plural
+            object_ids = list(model.objects.order_by('pk').values_list('pk', flat=True))
+            self.stdout.write(f'Recalculating utilization for {len(object_ids)} {verbose_name}...')
+
+            update_count = 0
+            for i in range(0, len(object_ids), batch_size):
+                update_count += update_utilization(object_ids[i:i + batch_size], batch_size=batch_size)
+                self.stdout.write(f'  {min(i + batch_size, len(object_ids))}/{len(object_ids)}')
+            self.stdout.write(f'Updated {update_count} {verbose_name}')
+
+        self.stdout.write(self.style.SUCCESS('Finished.'))
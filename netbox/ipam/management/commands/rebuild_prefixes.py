@@ -1,27 +1,101 @@
-from django.core.management.base import BaseCommand
+import multiprocessing
+import time
+
+import netaddr
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.models import Count
 
 from ipam.models import Prefix, VRF
-from ipam.utils import rebuild_prefixes
+from ipam.utils import rebuild_prefixes, update_prefix_hierarchy
+
+
+def _rebuild_vrf(args):
+    # Entry point for worker processes; returns the VRF ID along with the number of prefixes updated
+    vrf_id, batch_size = args
+    return vrf_id, rebuild_prefixes(vrf_id, batch_size=batch_size)
 
 
 class Command(BaseCommand):
     help = "Rebuild the prefix hierarchy (depth and children counts)"
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--vrf", dest='vrf',
+            help="Rebuild only the specified VRF (by ID), or 'global' for the global table"
+        )
+        parser.add_argument(
+            "--prefix", dest='prefix',
+            help="Rebuild only the subtree containing the specified prefix (within the global table unless --vrf is "
+                 "also specified)"
+        )
+        parser.add_argument(
+            "--workers", type=int, default=1,
+            help="Number of worker processes among which to distribute VRFs (default: 1)"
+        )
+        parser.add_argument(
+            "--batch-size", type=int, default=1000, dest='batch_size',
+            help="Number of prefixes to retrieve and update per batch (default: 1000)"
+        )
+
+    def get_vrf_id(self, value):
+        if value is None or value == 'global':
+            return None
+        try:
+            return VRF.objects.get(pk=value).pk
+        except (ValueError, VRF.DoesNotExist):
+            raise CommandError(f"VRF not found: {value}")
+
     def handle(self, *model_names, **options):
-        self.stdout.write(f'Rebuilding {Prefix.objects.count()} prefixes...')
+        workers = max(options['workers'], 1)
+        batch_size = max(options['batch_size'], 1)
+        start_time = time.monotonic()
+
+        # Rebuild a single subtree
+        if options['prefix']:
+            try:
+                network = netaddr.IPNetwork(options['prefix']).cidr
+            except (netaddr.AddrFormatError, ValueError):
+                raise CommandError(f"Invalid prefix: {options['prefix']}")
+            vrf_id = self.get_vrf_id(options['vrf'])
+            self.stdout.write(f'Rebuilding the subtree containing {network}...')
+            update_count = update_prefix_hierarchy({vrf_id: [network]}, batch_size=batch_size)
+            self.stdout.write(self.style.SUCCESS(f'Finished. Updated {update_count} prefixes.'))
+            return
 
-        # Reset existing counts
-        Prefix.objects.update(_depth=0, _children=0)
+        # Determine which VRFs to rebuild, largest first to balance the load among workers
+        counts = {
+            vrf['vrf']: vrf['count'] for vrf in Prefix.objects.order_by().values('vrf').annotate(count=Count('pk'))
+        }
+        if options['vrf']:
+            vrf_ids = [self.get_vrf_id(options['vrf'])]
+        else:
+            vrf_ids = sorted(counts, key=counts.get, reverse=True)
+        vrf_names = {vrf.pk: str(vrf) for vrf in VRF.objects.filter(pk__in=vrf_ids)}
+        vrf_names[None] = 'Global'
+        self.stdout.write(f'Rebuilding {sum(counts.get(vrf_id, 0) for vrf_id in vrf_ids)} prefixes...')
 
-        # Rebuild the global table
-        global_count = Prefix.objects.filter(vrf__isnull=True).count()
-        self.stdout.write(f'Global: {global_count} prefixes...')
-        rebuild_prefixes(None)
+        # Worker processes are forked and must not share the parent's database connections
+        tasks = [(vrf_id, batch_size) for vrf_id in vrf_ids]
+        pool = None
+        if workers > 1 and len(tasks) > 1:
+            connections.close_all()
+            pool = multiprocessing.get_context('fork').Pool(workers)
+            self.stdout.write(f'Distributing VRFs among {workers} worker processes')
 
-        # Rebuild each VRF
-        for vrf in VRF.objects.all():
-            vrf_count = Prefix.objects.filter(vrf=vrf).count()
-            self.stdout.write(f'VRF {vrf}: {vrf_count} prefixes...')
-            rebuild_prefixes(vrf.pk)
+        total_count = 0
+        try:
+            if pool is not None:
+                results = pool.imap_unordered(_rebuild_vrf, tasks)
+            else:
+                results = (_rebuild_vrf(task) for task in tasks)
+            for vrf_id, update_count in results:
+                total_count += update_count
+                self.stdout.write(f'{vrf_names[vrf_id]}: updated {update_count} prefixes')
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
 
-        self.stdout.write(self.style.SUCCESS('Finished.'))
+        elapsed = time.monotonic() - start_time
+        self.stdout.write(self.style.SUCCESS(f'Finished. Updated {total_count} prefixes in {elapsed:.2f}s.'))
@@ -0,0 +1,36 @@
+import django.contrib.postgres.indexes
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ipam', '0081_remove_service_device_virtual_machine_add_parent_gfk_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ipaddress',
+            index=django.contrib.postgres.indexes.GistIndex(
+                fields=['address'], name='ipam_ipaddress_address_gist', opclasses=('inet_ops',)
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='iprange',
+            index=django.contrib.postgres.indexes.GistIndex(
+                fields=['start_address'], name='ipam_iprange_start_address_gist', opclasses=('inet_ops',)
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='iprange',
+            index=django.contrib.postgres.indexes.GistIndex(
+                fields=['end_address'], name='ipam_iprange_end_address_gist', opclasses=('inet_ops',)
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='prefix',
+            index=django.contrib.postgres.indexes.GistIndex(
+                fields=['prefix'], name='ipam_prefix_prefix_gist', opclasses=('inet_ops',)
+            ),
+        ),
+    ]
@@ -0,0 +1,44 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ipam', '0082_gist_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='iprange',
+            name='_utilization',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=5),
+        ),
+        migrations.AddField(
+            model_name='iprange',
+            name='_utilized_size',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='prefix',
+            name='_usable_size',
+            field=models.DecimalField(decimal_places=0, default=0, editable=False, max_digits=39),
+        ),
+        migrations.AddField(
+            model_name='prefix',
+            name='_utilization',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=5),
+        ),
+        migrations.AddField(
+            model_name='prefix',
+            name='_utilized_size',
+            field=models.DecimalField(decimal_places=0, default=0, editable=False, max_digits=39),
+        ),
+        migrations.AddIndex(
+            model_name='iprange',
+            index=models.Index(fields=['_utilization'], name='ipam_iprang__utiliz_6ce78f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='prefix',
+            index=models.Index(fields=['_utilization'], name='ipam_prefix__utiliz_37a353_idx'),
+        ),
+    ]
@@ -1,3 +1,5 @@
+import itertools
+
 from django.core.exceptions import ValidationError
 from django.db import models
 from django.utils.translation import gettext_lazy as _
@@ -12,6 +14,27 @@ __all__ = (
 )
 
 
+def get_available_asn_ranges(start, end, used_asns):
+    """
+    Return an iterator of the ranges of ASNs between start and end (inclusive) which are not among used_asns, as
+    Python range objects in ascending order. Only the assigned ASNs are consumed, so even a 32-bit range can be
+    evaluated without enumerating its members.
+
+    :param start: The first ASN in the range
+    :param end: The last ASN in the range
+    :param used_asns: An iterable of assigned ASNs in ascending order
+    """
+    next_free = start
+    for asn in used_asns:
+        if asn > end:
+            break
+        if asn > next_free:
+            yield range(next_free, asn)
+        next_free = max(next_free, asn + 1)
+    if next_free <= end:
+        yield range(next_free, end + 1)
+
+
 class ASNRange(OrganizationalModel):
     name = models.CharField(
         verbose_name=_('name'),
@@ -77,15 +100,19 @@ class ASNRange(OrganizationalModel):
             asn__lte=self.end
         )
 
-    def get_available_asns(self):
+    def get_available_asn_ranges(self):
         """
-        Return all available ASNs within this range.
+        Return an iterator of the ranges of available ASNs within this range (see get_available_asn_ranges()).
         """
-        range = set(self.range)
-        existing_asns = set(self.get_child_asns().values_list('asn', flat=True))
-        available_asns = sorted(range - existing_asns)
+        used_asns = self.get_child_asns().order_by('asn').values_list('asn', flat=True)
+
+        return get_available_asn_ranges(self.start, self.end, used_asns.iterator())
 
-        return available_asns
+    def get_available_asns(self, limit=None):
+        """
+        Return all available ASNs within this range (or only the first N, if a limit is specified).
+        """
+        return list(itertools.islice(itertools.chain.from_iterable(self.get_available_asn_ranges()), limit))
 
 
 class ASN(PrimaryModel):
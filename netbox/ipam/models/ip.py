@@ -1,8 +1,9 @@
 import netaddr
 from django.contrib.contenttypes.fields import GenericForeignKey
+from django.contrib.postgres.indexes import GistIndex
 from django.core.exceptions import ValidationError
-from django.db import models
-from django.db.models import F
+from django.db import connection, models, transaction
+from django.db.models import Count, F
 from django.db.models.functions import Cast
 from django.utils.functional import cached_property
 from django.utils.translation import gettext_lazy as _
@@ -12,7 +13,7 @@ from dcim.models.mixins import CachedScopeMixin
 from ipam.choices import *
 from ipam.constants import *
 from ipam.fields import IPNetworkField, IPAddressField
-from ipam.lookups import Host
+from ipam.lookups import Broadcast, Host, Inet
 from ipam.managers import IPAddressManager
 from ipam.querysets import PrefixQuerySet
 from ipam.validators import DNSValidator
@@ -30,21 +31,86 @@ __all__ = (
 )
 
 
+def get_available_ip_ranges(occupied, first, last, version):
+    """
+    Return an iterator of the ranges of addresses between first and last (inclusive) which are not covered by any of
+    the occupied intervals, as netaddr IPRanges in ascending order. The gaps between intervals are found by the database
+    and retrieved lazily, so the occupied addresses themselves are never loaded.
+
+    :param occupied: A queryset of (start, stop) pairs of INET host addresses
+    :param first: The first address (as an integer)
+    :param last: The last address (as an integer)
+    :param version: The IP version (4 or 6)
+    """
+    occupied_sql, params = occupied.query.sql_with_params()
+
+    # For each interval which begins beyond the end of all preceding intervals, return its start along with that end.
+    # A final row returns the end of the last interval.
+    sql = f"""
+        WITH occupied (start, stop) AS ({occupied_sql}),
+        bounds AS (
+            SELECT start, MAX(stop) OVER (ORDER BY start, stop ROWS BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING) AS prev
+            FROM occupied
+        )
+        SELECT HOST(start), HOST(prev) FROM (
+            SELECT start, prev FROM bounds
+            WHERE prev IS NULL OR CASE WHEN start > prev THEN prev + 1 < start ELSE FALSE END
+            UNION ALL
+            SELECT NULL::inet, MAX(stop) FROM occupied
+        ) AS gaps
+        ORDER BY start NULLS LAST
+    """
+
+    # As with QuerySet.iterator(), use a server-side cursor unless these have been disabled (e.g. because connections
+    # are pooled in transaction mode)
+    if connection.settings_dict.get('DISABLE_SERVER_SIDE_CURSORS'):
+        cursor = connection.cursor()
+    else:
+        cursor = connection.chunked_cursor()
+    with cursor:
+        cursor.execute(sql, params)
+        next_free = first
+        while rows := cursor.fetchmany(100):
+            for start, prev in rows:
+                if prev is not None:
+                    next_free = max(next_free, int(netaddr.IPAddress(prev)) + 1)
+                stop = last if start is None else min(int(netaddr.IPAddress(start)) - 1, last)
+                if next_free > last:
+                    return
+                if stop >= next_free:
+                    yield netaddr.IPRange(
+                        netaddr.IPAddress(next_free, version=version),
+                        netaddr.IPAddress(stop, version=version)
+                    )
+
+
 class GetAvailablePrefixesMixin:
 
-    def get_available_prefixes(self):
-        """
-        Return all available prefixes within this Aggregate or Prefix as an IPSet.
-        """
+    def _get_child_prefixes_params(self):
         params = {
             'prefix__net_contained': str(self.prefix)
         }
         if hasattr(self, 'vrf'):
             params['vrf'] = self.vrf
+        return params
 
-        child_prefixes = Prefix.objects.filter(**params).values_list('prefix', flat=True)
+    def get_available_prefixes(self):
+        """
+        Return all available prefixes within this Aggregate or Prefix as an IPSet.
+        """
+        child_prefixes = Prefix.objects.filter(**self._get_child_prefixes_params()).values_list('prefix', flat=True)
         return netaddr.IPSet(self.prefix) - netaddr.IPSet(child_prefixes)
 
+    def get_available_ranges(self):
+        """
+        Return an iterator of the ranges of address space within this Aggregate or Prefix which are not covered by any
+        child Prefix (see get_available_ip_ranges()).
+        """
+        occupied = Prefix.objects.filter(**self._get_child_prefixes_params()).order_by().values_list(
+            Inet(Host('prefix')), Inet(Host(Broadcast('prefix')))
+        )
+        return get_available_ip_ranges(occupied, self.prefix.first, self.prefix.last, self.prefix.version)
+
     def get_first_available_prefix(self):
         """
         Return the first available child prefix within the prefix (or None).
@@ -266,6 +332,26 @@ class Prefix(ContactsMixin, GetAvailablePrefixesMixin, CachedScopeMixin, Primary
         editable=False
     )
 
+    # Cached utilization
+    _utilized_size = models.DecimalField(
+        max_digits=39,
+        decimal_places=0,
+        default=0,
+        editable=False
+    )
+    _usable_size = models.DecimalField(
+        max_digits=39,
+        decimal_places=0,
+        default=0,
+        editable=False
+    )
+    _utilization = models.DecimalField(
+        max_digits=5,
+        decimal_places=2,
+        default=0,
+        editable=False
+    )
+
     objects = PrefixQuerySet.as_manager()
 
     clone_fields = (
@@ -274,6 +360,10 @@ class Prefix(ContactsMixin, GetAvailablePrefixesMixin, CachedScopeMixin, Primary
 
     class Meta:
         ordering = (F('vrf').asc(nulls_first=True), 'prefix', 'pk')  # (vrf, prefix) may be non-unique
+        indexes = (
+            GistIndex(fields=('prefix',), opclasses=('inet_ops',), name='ipam_prefix_prefix_gist'),
+            models.Index(fields=('_utilization',)),
+        )
         verbose_name = _('prefix')
         verbose_name_plural = _('prefixes')
 
@@ -320,7 +410,14 @@ class Prefix(ContactsMixin, GetAvailablePrefixesMixin, CachedScopeMixin, Primary
         # Cache objects associated with the terminating object (for filtering)
         self.cache_related_objects()
 
-        super().save(*args, **kwargs)
+        # Changes to the prefix tree must not coincide with the determination of IP address locks
+        if self._state.adding or self.prefix != self._prefix or self.vrf_id != self._vrf_id:
+            from ipam.utils import lock_prefix_topology
+            with transaction.atomic(savepoint=False):
+                lock_prefix_topology({self.vrf_id} if self._state.adding else {self.vrf_id, self._vrf_id})
+                super().save(*args, **kwargs)
+        else:
+            super().save(*args, **kwargs)
 
     @property
     def family(self):
@@ -338,6 +435,10 @@ class Prefix(ContactsMixin, GetAvailablePrefixesMixin, CachedScopeMixin, Primary
     def children(self):
         return self._children
 
+    @property
+    def utilization(self):
+        return self._utilization
+
     def _set_prefix_length(self, value):
         """
         Expose the IPNetwork object's prefixlen attribute on the parent model so that it can be manipulated directly,
@@ -404,74 +505,95 @@ class Prefix(ContactsMixin, GetAvailablePrefixesMixin, CachedScopeMixin, Primary
         else:
             return IPAddress.objects.filter(address__net_host_contained=str(self.prefix), vrf=self.vrf)
 
-    def get_available_ips(self):
+    def get_available_ip_ranges(self):
         """
-        Return all available IPs within this prefix as an IPSet.
+        Return an iterator of the available IP ranges within this prefix (see get_available_ip_ranges()), omitting any
+        addresses reserved by the prefix.
         """
-        prefix = netaddr.IPSet(self.prefix)
-        child_ips = netaddr.IPSet([
-            ip.address.ip for ip in self.get_child_ips()
-        ])
-        child_ranges = netaddr.IPSet([
-            iprange.range for iprange in self.get_child_ranges().filter(mark_populated=True)
-        ])
-        available_ips = prefix - child_ips - child_ranges
+        first, last = self.prefix.first, self.prefix.last
 
         # IPv6 /127's, pool, or IPv4 /31-/32 sets are fully usable
-        if (self.family == 6 and self.prefix.prefixlen >= 127) or self.is_pool or (
-                self.family == 4 and self.prefix.prefixlen >= 31
+        if not (
+            (self.family == 6 and self.prefix.prefixlen >= 127) or self.is_pool or
+            (self.family == 4 and self.prefix.prefixlen >= 31)
         ):
-            return available_ips
-
-        if self.family == 4:
-            # For "normal" IPv4 prefixes, omit first and last addresses
-            available_ips -= netaddr.IPSet([
-                netaddr.IPAddress(self.prefix.first),
-                netaddr.IPAddress(self.prefix.last),
-            ])
-        else:
-            # For IPv6 prefixes, omit the Subnet-Router anycast address
-            # per RFC 4291
-            available_ips -= netaddr.IPSet([netaddr.IPAddress(self.prefix.first)])
+            # Omit the first (network or Subnet-Router anycast per RFC 4291) address, and for IPv4 the last (broadcast)
+            first += 1
+            if self.family == 4:
+                last -= 1
+
+        occupied = self.get_child_ips().order_by().values_list(
+            Inet(Host('address')), Inet(Host('address'))
+        ).union(
+            self.get_child_ranges(mark_populated=True).order_by().values_list(
+                Inet(Host('start_address')), Inet(Host('end_address'))
+            ),
+            all=True
+        )
+
+        return get_available_ip_ranges(occupied, first, last, self.family)
 
-        return available_ips
+    def get_available_ips(self):
+        """
+        Return all available IPs within this prefix as an IPSet.
+        """
+        return netaddr.IPSet(
+            cidr for iprange in self.get_available_ip_ranges() for cidr in iprange.cidrs()
+        )
 
     def get_first_available_ip(self):
         """
         Return the first available IP within the prefix (or None).
         """
-        available_ips = self.get_available_ips()
-        if not available_ips:
-            return None
-        return '{}/{}'.format(next(available_ips.__iter__()), self.prefix.prefixlen)
+        if iprange := next(self.get_available_ip_ranges(), None):
+            return '{}/{}'.format(iprange[0], self.prefix.prefixlen)
+        return None
 
-    def get_utilization(self):
+    def get_usable_size(self):
         """
-        Determine the utilization of the prefix and return it as a percentage. For Prefixes with a status of
-        "container", calculate utilization based on child prefixes. For all others, count child IP addresses.
+        Return the number of addresses against which utilization is measured. This excludes the network and broadcast
+        addresses of IPv4 prefixes (other than pools and /31s or /32s) which are not containers.
+        """
+        if (
+            self.status != PrefixStatusChoices.STATUS_CONTAINER and
+            self.prefix.version == 4 and self.prefix.prefixlen < 31 and not self.is_pool
+        ):
+            return self.prefix.size - 2
+        return self.prefix.size
+
+    def get_utilized_size(self):
+        """
+        Return the number of addresses within the prefix which are utilized. For Prefixes with a status of "container",
+        count the addresses covered by child prefixes. For all others, count child IP addresses and the addresses of
+        child IP ranges marked as utilized. Addresses are counted only once, and the sum is computed by the database.
         """
         if self.mark_utilized:
-            return 100
+            return self.get_usable_size()
 
         if self.status == PrefixStatusChoices.STATUS_CONTAINER:
-            queryset = Prefix.objects.filter(
-                prefix__net_contained=str(self.prefix),
-                vrf=self.vrf
-            )
-            child_prefixes = netaddr.IPSet([p.prefix for p in queryset])
-            utilization = float(child_prefixes.size) / self.prefix.size * 100
+            available = self.get_available_ranges()
         else:
-            # Compile an IPSet to avoid counting duplicate IPs
-            child_ips = netaddr.IPSet()
-            for iprange in self.get_child_ranges().filter(mark_utilized=True):
-                child_ips.add(iprange.range)
-            for ip in self.get_child_ips():
-                child_ips.add(ip.address.ip)
-
-            prefix_size = self.prefix.size
-            if self.prefix.version == 4 and self.prefix.prefixlen < 31 and not self.is_pool:
-                prefix_size -= 2
-            utilization = float(child_ips.size) / prefix_size * 100
+            occupied = self.get_child_ips().order_by().values_list(
+                Inet(Host('address')), Inet(Host('address'))
+            ).union(
+                self.get_child_ranges(mark_utilized=True).order_by().values_list(
+                    Inet(Host('start_address')), Inet(Host('end_address'))
+                ),
+                all=True
+            )
+            available = get_available_ip_ranges(occupied, self.prefix.first, self.prefix.last, self.family)
+
+        return self.prefix.size - sum(iprange.size for iprange in available)
+
+    def get_utilization(self):
+        """
+        Determine the utilization of the prefix and return it as a percentage (see get_utilized_size()). The
+        utilization property returns the cached value instead.
+        """
+        if self.mark_utilized:
+            return 100
+
+        utilization = float(self.get_utilized_size()) / self.get_usable_size() * 100
 
         return min(utilization, 100)
 
@@ -533,15 +655,41 @@ class IPRange(ContactsMixin, PrimaryModel):
         help_text=_("Report space as 100% utilized")
     )
 
+    # Cached utilization
+    _utilized_size = models.PositiveIntegerField(
+        default=0,
+        editable=False
+    )
+    _utilization = models.DecimalField(
+        max_digits=5,
+        decimal_places=2,
+        default=0,
+        editable=False
+    )
+
     clone_fields = (
         'vrf', 'tenant', 'status', 'role', 'description', 'mark_populated', 'mark_utilized',
     )
 
     class Meta:
         ordering = (F('vrf').asc(nulls_first=True), 'start_address', 'pk')  # (vrf, start_address) may be non-unique
+        indexes = (
+            GistIndex(fields=('start_address',), opclasses=('inet_ops',), name='ipam_iprange_start_address_gist'),
+            GistIndex(fields=('end_address',), opclasses=('inet_ops',), name='ipam_iprange_end_address_gist'),
+            models.Index(fields=('_utilization',)),
+        )
         verbose_name = _('IP range')
         verbose_name_plural = _('IP ranges')
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        # Cache the original addresses, VRF, and utilization flag so we can check if they have changed on post_save
+        self._original_start_address = self.__dict__.get('start_address')
+        self._original_end_address = self.__dict__.get('end_address')
+        self._original_vrf_id = self.__dict__.get('vrf_id')
+        self._original_mark_utilized = self.__dict__.get('mark_utilized')
+
     def __str__(self):
         return self.name
 
@@ -667,43 +815,59 @@ class IPRange(ContactsMixin, PrimaryModel):
             vrf=self.vrf
         )
 
-    def get_available_ips(self):
+    def get_available_ip_ranges(self):
         """
-        Return all available IPs within this range as an IPSet.
+        Return an iterator of the available IP ranges within this range (see get_available_ip_ranges()).
         """
         if self.mark_populated:
-            return netaddr.IPSet()
+            return iter(())
 
-        range = netaddr.IPRange(self.start_address.ip, self.end_address.ip)
-        child_ips = netaddr.IPSet([ip.address.ip for ip in self.get_child_ips()])
+        occupied = self.get_child_ips().order_by().values_list(Inet(Host('address')), Inet(Host('address')))
 
-        return netaddr.IPSet(range) - child_ips
+        return get_available_ip_ranges(
+            occupied, int(self.start_address.ip), int(self.end_address.ip), self.family
+        )
+
+    def get_available_ips(self):
+        """
+        Return all available IPs within this range as an IPSet.
+        """
+        return netaddr.IPSet(
+            cidr for iprange in self.get_available_ip_ranges() for cidr in iprange.cidrs()
+        )
 
     @cached_property
     def first_available_ip(self):
         """
         Return the first available IP within the range (or None).
         """
-        available_ips = self.get_available_ips()
-        if not available_ips:
-            return None
+        if iprange := next(self.get_available_ip_ranges(), None):
+            return '{}/{}'.format(iprange[0], self.start_address.prefixlen)
+        return None
 
-        return '{}/{}'.format(next(available_ips.__iter__()), self.start_address.prefixlen)
+    def get_utilized_size(self):
+        """
+        Return the number of distinct addresses within the range which are assigned to IP addresses (or the size of the
+        range, if it is marked as utilized).
+        """
+        if self.mark_utilized:
+            return self.size
 
-    @cached_property
-    def utilization(self):
+        return self.get_child_ips().aggregate(count=Count(Host('address'), distinct=True))['count']
+
+    def get_utilization(self):
         """
-        Determine the utilization of the range and return it as a percentage.
+        Determine the utilization of the range and return it as a percentage. The utilization property returns the
+        cached value instead.
         """
         if self.mark_utilized:
             return 100
 
-        # Compile an IPSet to avoid counting duplicate IPs
-        child_count = netaddr.IPSet([
-            ip.address.ip for ip in self.get_child_ips()
-        ]).size
+        return min(float(self.get_utilized_size()) / self.size * 100, 100)
 
-        return min(float(child_count) / self.size * 100, 100)
+    @property
+    def utilization(self):
+        return self._utilization
 
 
 class IPAddress(ContactsMixin, PrimaryModel):
@@ -793,6 +957,7 @@ class IPAddress(ContactsMixin, PrimaryModel):
         ordering = ('address', 'pk')  # address may be non-unique
         indexes = (
             models.Index(Cast(Host('address'), output_field=IPAddressField()), name='ipam_ipaddress_host'),
+            GistIndex(fields=('address',), opclasses=('inet_ops',), name='ipam_ipaddress_address_gist'),
             models.Index(fields=('assigned_object_type', 'assigned_object_id')),
         )
         verbose_name = _('IP address')
@@ -808,6 +973,10 @@ class IPAddress(ContactsMixin, PrimaryModel):
         self._original_assigned_object_id = self.__dict__.get('assigned_object_id')
         self._original_assigned_object_type_id = self.__dict__.get('assigned_object_type_id')
 
+        # Cache the original address and VRF so we can check if they have changed on post_save
+        self._original_address = self.__dict__.get('address')
+        self._original_vrf_id = self.__dict__.get('vrf_id')
+
     def get_duplicates(self):
         return IPAddress.objects.filter(
             vrf=self.vrf,
@@ -871,8 +1040,12 @@ class IPAddress(ContactsMixin, PrimaryModel):
                     )
                     raise ValidationError(msg)
 
-            # Enforce unique IP space (if applicable)
-            if (self.vrf is None and get_config().ENFORCE_GLOBAL_UNIQUE) or (self.vrf and self.vrf.enforce_unique):
+            # Enforce unique IP space (if applicable), unless it is being enforced for a batch of IPAddresses as a whole
+            # (see validate_ip_address_uniqueness())
+            from ipam.utils import ip_address_uniqueness_deferred
+            if not ip_address_uniqueness_deferred() and (
+                (self.vrf is None and get_config().ENFORCE_GLOBAL_UNIQUE) or (self.vrf and self.vrf.enforce_unique)
+            ):
                 duplicate_ips = self.get_duplicates()
                 if duplicate_ips and (
                         self.role not in IPADDRESS_ROLES_NONUNIQUE or
@@ -1,3 +1,5 @@
+import itertools
+
 from django.contrib.contenttypes.fields import GenericForeignKey, GenericRelation
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.postgres.fields import ArrayField, IntegerRangeField
@@ -29,6 +31,32 @@ def default_vid_ranges():
     ]
 
 
+def get_available_vid_ranges(vid_ranges, used_vids):
+    """
+    Return an iterator of the ranges of VLAN IDs within vid_ranges which are not among used_vids, as Python range
+    objects in ascending order. The gaps are computed by a single merge of both sequences and yielded lazily, so
+    individual VIDs are never materialized.
+
+    :param vid_ranges: An iterable of non-overlapping NumericRanges
+    :param used_vids: An iterable of used VLAN IDs in ascending order
+    """
+    bounds = sorted(
+        (r.lower if r.lower_inc else r.lower + 1, r.upper if r.upper_inc else r.upper - 1) for r in vid_ranges
+    )
+    used_vids = iter(used_vids)
+    vid = next(used_vids, None)
+
+    for lower, upper in bounds:
+        next_free = lower
+        while vid is not None and vid <= upper:
+            if vid > next_free:
+                yield range(next_free, vid)
+            next_free = max(next_free, vid + 1)
+            vid = next(used_vids, None)
+        if next_free <= upper:
+            yield range(next_free, upper + 1)
+
+
 class VLANGroup(OrganizationalModel):
     """
     A VLAN group is an arbitrary collection of VLANs within which VLAN IDs and names must be unique. Each group must
@@ -136,26 +164,26 @@ class VLANGroup(OrganizationalModel):
 
         super().save(*args, **kwargs)
 
-    def get_available_vids(self):
+    def get_available_vid_ranges(self):
         """
-        Return all available VLANs within this group.
+        Return an iterator of the ranges of available VLAN IDs within this group (see get_available_vid_ranges()).
         """
-        available_vlans = set()
-        for vlan_range in self.vid_ranges:
-            available_vlans = available_vlans.union({
-                vid for vid in range(vlan_range.lower, vlan_range.upper)
-            })
-        available_vlans -= set(VLAN.objects.filter(group=self).values_list('vid', flat=True))
+        used_vids = VLAN.objects.filter(group=self).order_by('vid').values_list('vid', flat=True)
 
-        return sorted(available_vlans)
+        return get_available_vid_ranges(self.vid_ranges, used_vids.iterator())
+
+    def get_available_vids(self, limit=None):
+        """
+        Return all available VLAN IDs within this group (or only the first N, if a limit is specified).
+        """
+        return list(itertools.islice(itertools.chain.from_iterable(self.get_available_vid_ranges()), limit))
 
     def get_next_available_vid(self):
         """
         Return the first available VLAN ID (1-4094) in the group.
         """
-        available_vids = self.get_available_vids()
-        if available_vids:
-            return available_vids[0]
+        if vid_range := next(self.get_available_vid_ranges(), None):
+            return vid_range.start
         return None
 
     def get_child_vlans(self):
@@ -3,7 +3,8 @@ from django.dispatch import receiver
 
 from dcim.models import Device
 from virtualization.models import VirtualMachine
-from .models import IPAddress, Prefix
+from .models import IPAddress, IPRange, Prefix
+from .utils import enqueue_prefix_hierarchy_update, enqueue_utilization_update, lock_prefix_topology
 
 
 def update_parents_children(prefix):
@@ -32,6 +33,12 @@ def handle_prefix_saved(instance, created, **kwargs):
     # Prefix has changed (or new instance has been created)
     if created or instance.vrf_id != instance._vrf_id or instance.prefix != instance._prefix:
 
+        # Defer the update if within a defer_prefix_hierarchy_updates() context
+        if enqueue_prefix_hierarchy_update(instance.vrf_id, instance.prefix):
+            if not created:
+                enqueue_prefix_hierarchy_update(instance._vrf_id, instance._prefix)
+            return
+
         update_parents_children(instance)
         update_children_depth(instance)
 
@@ -42,13 +49,104 @@ def handle_prefix_saved(instance, created, **kwargs):
             update_children_depth(old_prefix)
 
 
+@receiver(pre_delete, sender=Prefix)
+def lock_prefix_tree_on_delete(instance, **kwargs):
+    # Deletion is performed within a transaction, which holds the lock until it is committed
+    lock_prefix_topology([instance.vrf_id])
+
+
 @receiver(post_delete, sender=Prefix)
 def handle_prefix_deleted(instance, **kwargs):
 
+    if enqueue_prefix_hierarchy_update(instance.vrf_id, instance.prefix):
+        return
+
     update_parents_children(instance)
     update_children_depth(instance)
 
 
+#
+# Utilization
+#
+
+@receiver(post_save, sender=Prefix)
+def update_utilization_on_prefix_change(instance, created, raw=False, **kwargs):
+    """
+    Recalculate the utilization of a Prefix when it is saved (e.g. its status may have changed), along with that of
+    any containers in which it resides (or resided). This also corrects any stale cached figures written by the save
+    itself.
+    """
+    if raw:
+        return
+    networks = []
+    if created or instance.vrf_id != instance._vrf_id or instance.prefix != instance._prefix:
+        networks.append((instance.vrf_id, instance.prefix))
+        if not created:
+            networks.append((instance._vrf_id, instance._prefix))
+    enqueue_utilization_update(prefixes=[instance.pk], networks=networks)
+
+
+@receiver(post_delete, sender=Prefix)
+def update_utilization_on_prefix_delete(instance, **kwargs):
+    enqueue_utilization_update(networks=[(instance.vrf_id, instance.prefix)])
+
+
+@receiver(post_save, sender=IPRange)
+def update_utilization_on_iprange_change(instance, created, raw=False, **kwargs):
+    """
+    Recalculate the utilization of an IPRange when it is saved, along with that of any Prefixes in which it resides (or
+    resided) if it is (or was) marked as utilized.
+    """
+    if raw:
+        return
+    spans = []
+    if created or (
+        instance.start_address != instance._original_start_address or
+        instance.end_address != instance._original_end_address or
+        instance.vrf_id != instance._original_vrf_id or
+        instance.mark_utilized != instance._original_mark_utilized
+    ):
+        if instance.mark_utilized:
+            spans.append((instance.vrf_id, instance.start_address, instance.end_address))
+        if not created and instance._original_mark_utilized:
+            spans.append(
+                (instance._original_vrf_id, instance._original_start_address, instance._original_end_address)
+            )
+        instance._original_start_address = instance.start_address
+        instance._original_end_address = instance.end_address
+        instance._original_vrf_id = instance.vrf_id
+        instance._original_mark_utilized = instance.mark_utilized
+    enqueue_utilization_update(ip_ranges=[instance.pk], spans=spans)
+
+
+@receiver(post_delete, sender=IPRange)
+def update_utilization_on_iprange_delete(instance, **kwargs):
+    if instance.mark_utilized:
+        enqueue_utilization_update(spans=[(instance.vrf_id, instance.start_address, instance.end_address)])
+
+
+@receiver(post_save, sender=IPAddress)
+def update_utilization_on_ipaddress_change(instance, created, raw=False, **kwargs):
+    """
+    Recalculate the utilization of the Prefixes and IPRanges in which an IPAddress resides (or resided), if it has been
+    created or its address or VRF has changed.
+    """
+    if raw:
+        return
+    if created or instance.address != instance._original_address or instance.vrf_id != instance._original_vrf_id:
+        addresses = [(instance.vrf_id, instance.address)]
+        if not created:
+            addresses.append((instance._original_vrf_id, instance._original_address))
+        enqueue_utilization_update(addresses=addresses)
+        instance._original_address = instance.address
+        instance._original_vrf_id = instance.vrf_id
+
+
+@receiver(post_delete, sender=IPAddress)
+def update_utilization_on_ipaddress_delete(instance, **kwargs):
+    enqueue_utilization_update(addresses=[(instance.vrf_id, instance.address)])
+
+
 @receiver(pre_delete, sender=IPAddress)
 def clear_primary_ip(instance, **kwargs):
     """
@@ -220,8 +220,7 @@ class PrefixTable(TenancyColumnsMixin, NetBoxTable):
     )
     utilization = PrefixUtilizationColumn(
         verbose_name=_('Utilization'),
-        accessor='get_utilization',
-        orderable=False
+        accessor=Accessor('_utilization')
     )
     comments = columns.MarkdownColumn(
         verbose_name=_('Comments'),
@@ -279,8 +278,7 @@ class IPRangeTable(TenancyColumnsMixin, NetBoxTable):
     )
     utilization = columns.UtilizationColumn(
         verbose_name=_('Utilization'),
-        accessor='utilization',
-        orderable=False
+        accessor=Accessor('_utilization')
     )
     comments = columns.MarkdownColumn(
         verbose_name=_('Comments'),
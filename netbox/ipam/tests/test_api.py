@@ -1,14 +1,19 @@
 import json
 import logging
 
-from django.test import tag
+from django.db import connection, transaction
+from django.test import override_settings, tag
 from django.urls import reverse
 from netaddr import IPNetwork
 from rest_framework import status
 
+from core.models import ObjectChange
 from dcim.models import Device, DeviceRole, DeviceType, Interface, Manufacturer, Site
+from extras.models import Tag
 from ipam.choices import *
 from ipam.models import *
+from ipam.utils import get_ip_address_lock_ids, ip_address_lock
+from netbox.constants import ADVISORY_LOCK_KEYS
 from tenancy.models import Tenant
 from utilities.data import string_to_ranges
 from utilities.testing import APITestCase, APIViewTestCases, create_test_device, disable_logging
@@ -135,6 +140,41 @@ class ASNRangeTest(APIViewTestCases.APIViewTestCase):
         self.assertHttpStatus(response, status.HTTP_201_CREATED)
         self.assertEqual(len(response.data), 10)
 
+    def test_create_available_asns_by_count(self):
+        """
+        Test the allocation of a number of available ASNs at once.
+        """
+        rir = RIR.objects.first()
+        asnrange = ASNRange.objects.create(name='Range 1', slug='range-1', rir=rir, start=101, end=110)
+        ASN.objects.create(asn=102, rir=rir)
+        url = reverse('ipam-api:asnrange-available-asns', kwargs={'pk': asnrange.pk})
+        self.add_permissions('ipam.view_asnrange', 'ipam.view_asn', 'ipam.add_asn')
+
+        data = {'count': 3, 'description': 'Rack ASN'}
+        response = self.client.post(url, data, format='json', **self.header)
+        self.assertHttpStatus(response, status.HTTP_201_CREATED)
+        self.assertListEqual([asn['asn'] for asn in response.data], [101, 103, 104])
+        self.assertTrue(all(asn['rir']['id'] == rir.pk for asn in response.data))
+        self.assertTrue(all(asn['description'] == 'Rack ASN' for asn in response.data))
+        self.assertEqual(asnrange.get_child_asns().count(), 4)
+
+        # Requesting more ASNs than are available fails
+        response = self.client.post(url, {'count': 7}, format='json', **self.header)
+        self.assertHttpStatus(response, status.HTTP_409_CONFLICT)
+        self.assertEqual(asnrange.get_child_asns().count(), 4)
+
+        # Each ASN is subject to custom validation
+        with override_settings(CUSTOM_VALIDATORS={'ipam.asn': [{'asn': {'max': 105}}]}):
+            response = self.client.post(url, {'count': 2}, format='json', **self.header)
+        self.assertHttpStatus(response, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(asnrange.get_child_asns().count(), 4)
+
+        # Requesting more ASNs than MAX_PAGE_SIZE fails
+        with override_settings(MAX_PAGE_SIZE=2):
+            response = self.client.post(url, {'count': 3}, format='json', **self.header)
+        self.assertHttpStatus(response, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('count', response.data)
+
 
 class ASNTest(APIViewTestCases.APIViewTestCase):
     model = ASN
@@ -481,6 +521,74 @@ class PrefixTest(APIViewTestCases.APIViewTestCase):
         self.assertHttpStatus(response, status.HTTP_201_CREATED)
         self.assertEqual(len(response.data), 4)
 
+    def test_carve_prefixes(self):
+        """
+        Test carving batches of child prefixes from the available space within a parent prefix.
+        """
+        vrf = VRF.objects.create(name='VRF 1')
+        link_tag = Tag.objects.create(name='Tag 1', slug='tag-1')
+        prefix = Prefix.objects.create(prefix=IPNetwork('192.0.2.0/24'), vrf=vrf)
+        Prefix.objects.create(prefix=IPNetwork('192.0.2.8/29'), vrf=vrf)
+        url = reverse('ipam-api:prefix-carve-prefixes', kwargs={'pk': prefix.pk})
+        self.add_permissions('ipam.view_prefix', 'ipam.add_prefix')
+
+        # Request more space than is available
+        response = self.client.post(url, {'prefix_length': 26, 'count': 4}, format='json', **self.header)
+        self.assertHttpStatus(response, status.HTTP_409_CONFLICT)
+
+        # Request a prefix length outside the parent
+        response = self.client.post(url, {'prefix_length': 23}, format='json', **self.header)
+        self.assertHttpStatus(response, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('prefix_length', response.data[0])
+
+        # Request more prefixes than MAX_PAGE_SIZE, within a single batch or across batches
+        with override_settings(MAX_PAGE_SIZE=4):
+            response = self.client.post(url, {'prefix_length': 31, 'count': 5}, format='json', **self.header)
+            self.assertHttpStatus(response, status.HTTP_400_BAD_REQUEST)
+            self.assertIn('count', response.data[0])
+            data = [{'prefix_length': 31, 'count': 3}, {'prefix_length': 31, 'count': 3}]
+            response = self.client.post(url, data, format='json', **self.header)
+            self.assertHttpStatus(response, status.HTTP_400_BAD_REQUEST)
+            self.assertIn('count', response.data)
+
+        # Carve six /31s (each aligned to a /30) and two contiguous /27s
+        data = [
+            {
+                'prefix_length': 31,
+                'count': 6,
+                'align_length': 30,
+                'description': 'Link',
+                'tags': [{'name': 'Tag 1'}],
+            },
+            {
+                'prefix_length': 27,
+                'count': 2,
+                'contiguous': True,
+                'status': PrefixStatusChoices.STATUS_RESERVED,
+            },
+        ]
+        response = self.client.post(url, data, format='json', **self.header)
+        self.assertHttpStatus(response, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data), 8)
+        self.assertEqual(
+            [p['prefix'] for p in response.data],
+            [
+                '192.0.2.0/31', '192.0.2.4/31', '192.0.2.16/31', '192.0.2.20/31', '192.0.2.24/31', '192.0.2.28/31',
+                '192.0.2.32/27', '192.0.2.64/27',
+            ]
+        )
+        links = Prefix.objects.filter(vrf=vrf, prefix__net_mask_length=31)
+        self.assertEqual(links.count(), 6)
+        for link in links:
+            self.assertEqual(link.description, 'Link')
+            self.assertEqual(link.depth, 1)
+            self.assertEqual(list(link.tags.all()), [link_tag])
+        reserved = Prefix.objects.filter(vrf=vrf, status=PrefixStatusChoices.STATUS_RESERVED)
+        self.assertEqual(reserved.count(), 2)
+        prefix.refresh_from_db()
+        self.assertEqual(prefix.children, 9)
+        self.assertEqual(ObjectChange.objects.filter(changed_object_type__model='prefix').count(), 8)
+
     def test_list_available_ips(self):
         """
         Test retrieval of all available IP addresses within a parent prefix.
@@ -546,6 +654,47 @@ class PrefixTest(APIViewTestCases.APIViewTestCase):
         self.assertHttpStatus(response, status.HTTP_201_CREATED)
         self.assertEqual(len(response.data), 8)
 
+    def test_ip_address_lock_scope(self):
+        """
+        Test that IP allocation locks are shared only by addresses within the same prefix tree and VRF.
+        """
+        vrf = VRF.objects.create(name='VRF 1')
+        Prefix.objects.create(prefix=IPNetwork('10.0.0.0/8'))
+        Prefix.objects.create(prefix=IPNetwork('10.1.0.0/16'))
+
+        def get_lock_ids(vrf, address):
+            return get_ip_address_lock_ids([(vrf.pk if vrf else None, IPNetwork(address))])
+
+        self.assertEqual(get_lock_ids(None, '10.1.0.0/16'), get_lock_ids(None, '10.2.3.4/24'))
+        self.assertNotEqual(get_lock_ids(None, '10.1.0.0/16'), get_lock_ids(vrf, '10.1.0.0/16'))
+        self.assertNotEqual(get_lock_ids(None, '10.1.0.0/16'), get_lock_ids(None, '192.168.0.1/24'))
+        self.assertEqual(get_lock_ids(None, '192.168.0.1/24'), get_lock_ids(None, '192.168.0.1/32'))
+
+    def test_prefix_topology_lock(self):
+        """
+        Check that changes to the prefix tree of a VRF hold its topology lock exclusively, and that the determination
+        of IP address locks holds it shared.
+        """
+        vrf = VRF.objects.create(name='VRF 1')
+
+        def get_topology_locks():
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT objid, mode FROM pg_locks WHERE locktype = 'advisory' AND classid = %s "
+                    "AND pid = pg_backend_pid() ORDER BY objid, mode",
+                    [ADVISORY_LOCK_KEYS['prefix-topology']]
+                )
+                return cursor.fetchall()
+
+        with ip_address_lock([(vrf.pk, IPNetwork('10.0.0.1/32'))]):
+            self.assertEqual(get_topology_locks(), [(vrf.pk, 'ShareLock')])
+        self.assertEqual(get_topology_locks(), [])
+
+        # The lock is held until the end of the transaction
+        with transaction.atomic():
+            Prefix.objects.create(prefix=IPNetwork('10.0.0.0/8'), vrf=vrf)
+            self.assertEqual(get_topology_locks(), [(vrf.pk, 'ExclusiveLock')])
+
 
 class IPRangeTest(APIViewTestCases.APIViewTestCase):
     model = IPRange
@@ -677,6 +826,31 @@ class IPAddressTest(APIViewTestCases.APIViewTestCase):
         )
         IPAddress.objects.bulk_create(ip_addresses)
 
+    @override_settings(ENFORCE_GLOBAL_UNIQUE=True)
+    def test_bulk_create_duplicate_ipaddresses(self):
+        """
+        Test that unique IP space is enforced for a batch of IP addresses as a whole.
+        """
+        self.add_permissions('ipam.add_ipaddress')
+        data = [
+            {'address': '192.168.0.10/24'},
+            {'address': '192.168.0.1/32'},
+            {'address': '192.168.0.10/32'},
+            {'address': '192.168.0.11/24', 'role': IPAddressRoleChoices.ROLE_VIP},
+            {'address': '192.168.0.11/24', 'role': IPAddressRoleChoices.ROLE_VIP},
+        ]
+
+        response = self.client.post(self._get_list_url(), data, format='json', **self.header)
+        self.assertHttpStatus(response, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual([bool(errors) for errors in response.data], [False, True, True, False, False])
+        self.assertIn('192.168.0.1/24', response.data[1]['address'][0])
+        self.assertEqual(IPAddress.objects.count(), 3)
+
+        del data[1:3]
+        response = self.client.post(self._get_list_url(), data, format='json', **self.header)
+        self.assertHttpStatus(response, status.HTTP_201_CREATED)
+        self.assertEqual(IPAddress.objects.count(), 6)
+
     def test_assign_object(self):
         """
         Test the creation of available IP addresses within a parent IP range.
@@ -982,6 +1156,53 @@ class VLANGroupTest(APIViewTestCases.APIViewTestCase):
         self.assertEqual(response.data[2]['group']['id'], vlangroup.pk)
         self.assertEqual(response.data[2]['vid'], 6)
 
+    def test_create_available_vlans_by_count(self):
+        """
+        Test the allocation of a number of available VLANs at once.
+        """
+        self.add_permissions('ipam.view_vlangroup', 'ipam.view_vlan', 'ipam.add_vlan')
+        vlangroup = VLANGroup.objects.first()
+        VLAN.objects.bulk_create((
+            VLAN(vid=1, name='VLAN 1', group=vlangroup),
+            VLAN(vid=3, name='VLAN 3', group=vlangroup),
+        ))
+        url = reverse('ipam-api:vlangroup-available-vlans', kwargs={'pk': vlangroup.pk})
+
+        # A name placeholder is required when allocating multiple VLANs
+        data = {'count': 3, 'name': 'Tenant VLAN', 'status': 'reserved'}
+        response = self.client.post(url, data, format='json', **self.header)
+        self.assertHttpStatus(response, status.HTTP_400_BAD_REQUEST)
+
+        data['name'] = 'VLAN {vid}'
+        response = self.client.post(url, data, format='json', **self.header)
+        self.assertHttpStatus(response, status.HTTP_201_CREATED)
+        self.assertListEqual([vlan['vid'] for vlan in response.data], [2, 4, 5])
+        self.assertListEqual([vlan['name'] for vlan in response.data], ['VLAN 2', 'VLAN 4', 'VLAN 5'])
+        self.assertTrue(all(vlan['status']['value'] == 'reserved' for vlan in response.data))
+        self.assertEqual(VLAN.objects.filter(group=vlangroup).count(), 5)
+
+        # Names must remain unique within the group
+        VLAN.objects.filter(vid=5).update(name='VLAN 6')
+        response = self.client.post(url, {'count': 2, 'name': 'VLAN {vid}'}, format='json', **self.header)
+        self.assertHttpStatus(response, status.HTTP_400_BAD_REQUEST)
+
+        # Each VLAN is subject to custom validation
+        with override_settings(CUSTOM_VALIDATORS={'ipam.vlan': [{'vid': {'max': 6}}]}):
+            response = self.client.post(url, {'count': 2, 'name': 'Test {vid}'}, format='json', **self.header)
+        self.assertHttpStatus(response, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(VLAN.objects.filter(group=vlangroup).count(), 5)
+
+        # Requesting more VLANs than are available fails
+        with override_settings(MAX_PAGE_SIZE=5000):
+            response = self.client.post(url, {'count': 5000, 'name': 'VLAN {vid}'}, format='json', **self.header)
+        self.assertHttpStatus(response, status.HTTP_409_CONFLICT)
+
+        # Requesting more VLANs than MAX_PAGE_SIZE fails
+        with override_settings(MAX_PAGE_SIZE=2):
+            response = self.client.post(url, {'count': 3, 'name': 'VLAN {vid}'}, format='json', **self.header)
+        self.assertHttpStatus(response, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('count', response.data)
+
 
 class VLANTest(APIViewTestCases.APIViewTestCase):
     model = VLAN
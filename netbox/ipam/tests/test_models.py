@@ -1,5 +1,9 @@
+from unittest.mock import patch
+
 from django.contrib.contenttypes.models import ContentType
 from django.core.exceptions import ValidationError
+from django.db import connection
+from django.db.backends.postgresql.psycopg_any import NumericRange
 from django.test import TestCase, override_settings
 from netaddr import IPNetwork, IPSet
 from utilities.data import string_to_ranges
@@ -7,6 +11,9 @@ from utilities.data import string_to_ranges
 from dcim.models import Site, SiteGroup
 from ipam.choices import *
 from ipam.models import *
+from ipam.models.asns import get_available_asn_ranges
+from ipam.models.vlans import get_available_vid_ranges
+from ipam.utils import defer_prefix_hierarchy_updates
 
 
 class TestAggregate(TestCase):
@@ -38,6 +45,27 @@ class TestAggregate(TestCase):
         self.assertEqual(aggregate.get_utilization(), 100)
 
 
+class TestASNRange(TestCase):
+
+    def test_get_available_asn_ranges(self):
+        available_ranges = get_available_asn_ranges(10, 20, [1, 10, 12, 13, 19, 30])
+        self.assertListEqual(list(available_ranges), [range(11, 12), range(14, 19), range(20, 21)])
+
+    def test_get_available_asns(self):
+        rir = RIR.objects.create(name='RIR 1', slug='rir-1', is_private=True)
+        asnrange = ASNRange.objects.create(name='Range 1', slug='range-1', rir=rir, start=4200000000, end=4294967294)
+        ASN.objects.bulk_create((
+            ASN(asn=4200000000, rir=rir),
+            ASN(asn=4200000002, rir=rir),
+            ASN(asn=4294967294, rir=rir),
+        ))
+
+        available_ranges = list(asnrange.get_available_asn_ranges())
+        self.assertListEqual(available_ranges, [range(4200000001, 4200000002), range(4200000003, 4294967294)])
+        self.assertEqual(sum(len(r) for r in available_ranges), 94967292)
+        self.assertListEqual(asnrange.get_available_asns(limit=3), [4200000001, 4200000003, 4200000004])
+
+
 class TestIPRange(TestCase):
 
     def test_overlapping_range(self):
@@ -238,6 +266,46 @@ class TestPrefix(TestCase):
 
         self.assertEqual(available_ips, missing_ips)
 
+    def test_get_available_ip_ranges(self):
+
+        parent_prefix = Prefix.objects.create(prefix=IPNetwork('10.0.0.0/27'))
+        IPAddress.objects.bulk_create((
+            IPAddress(address=IPNetwork('10.0.0.0/27')),  # Network address
+            IPAddress(address=IPNetwork('10.0.0.2/27')),
+            IPAddress(address=IPNetwork('10.0.0.2/24')),  # Duplicate
+            IPAddress(address=IPNetwork('10.0.0.3/27')),
+            IPAddress(address=IPNetwork('10.0.0.12/27')),  # Within a populated range
+            IPAddress(address=IPNetwork('10.0.0.30/27')),
+        ))
+        IPRange.objects.bulk_create((
+            IPRange(start_address=IPNetwork('10.0.0.8/27'), end_address=IPNetwork('10.0.0.16/27'), size=9,
+                    mark_populated=True),
+            IPRange(start_address=IPNetwork('10.0.0.10/27'), end_address=IPNetwork('10.0.0.11/27'), size=2,
+                    mark_populated=True),
+            IPRange(start_address=IPNetwork('10.0.0.17/27'), end_address=IPNetwork('10.0.0.19/27'), size=3,
+                    mark_populated=True),
+        ))
+
+        self.assertEqual(
+            [str(iprange) for iprange in parent_prefix.get_available_ip_ranges()],
+            ['10.0.0.1-10.0.0.1', '10.0.0.4-10.0.0.7', '10.0.0.20-10.0.0.29']
+        )
+
+    def test_get_available_ip_ranges_without_server_side_cursors(self):
+        parent_prefix = Prefix.objects.create(prefix=IPNetwork('10.0.0.0/29'))
+        IPAddress.objects.create(address=IPNetwork('10.0.0.1/29'))
+
+        # Server-side cursors must not be used if they have been disabled for the database
+        with (
+            patch.dict(connection.settings_dict, {'DISABLE_SERVER_SIDE_CURSORS': True}),
+            patch.object(connection, 'chunked_cursor', side_effect=AssertionError('Server-side cursor opened')),
+        ):
+            self.assertEqual(
+                [str(iprange) for iprange in parent_prefix.get_available_ip_ranges()],
+                ['10.0.0.2-10.0.0.6']
+            )
+            self.assertEqual(parent_prefix.get_first_available_ip(), '10.0.0.2/29')
+
     def test_get_first_available_prefix(self):
 
         prefixes = Prefix.objects.bulk_create((
@@ -305,6 +373,66 @@ class TestPrefix(TestCase):
         )
         self.assertEqual(prefix.get_utilization(), 64 / 254 * 100)  # ~25% utilization
 
+    def test_cached_utilization(self):
+        """
+        Check that the cached utilization of prefixes and IP ranges is updated as child IPs, ranges, and prefixes
+        change.
+        """
+        vrf = VRF.objects.create(name='VRF 1')
+        with self.captureOnCommitCallbacks(execute=True):
+            container = Prefix.objects.create(
+                prefix=IPNetwork('10.0.0.0/16'),
+                status=PrefixStatusChoices.STATUS_CONTAINER
+            )
+            prefix = Prefix.objects.create(prefix=IPNetwork('10.0.0.0/24'))
+            iprange = IPRange.objects.create(
+                start_address=IPNetwork('10.0.0.101/24'),
+                end_address=IPNetwork('10.0.0.200/24')
+            )
+            IPAddress.objects.bulk_create([
+                IPAddress(address=IPNetwork(f'10.0.0.{i}/24')) for i in range(1, 11)
+            ])
+            ipaddress = IPAddress.objects.create(address=IPNetwork('10.0.0.101/24'))
+        container.refresh_from_db()
+        prefix.refresh_from_db()
+        iprange.refresh_from_db()
+        self.assertEqual(float(container.utilization), round(256 / 65536 * 100, 2))
+        self.assertEqual(prefix._usable_size, 254)
+        self.assertEqual(prefix._utilized_size, 11)  # Includes the IPs created in bulk
+        self.assertEqual(float(prefix.utilization), round(11 / 254 * 100, 2))
+        self.assertEqual(iprange._utilized_size, 1)
+        self.assertEqual(iprange.utilization, 1)
+
+        # Mark the range as utilized
+        with self.captureOnCommitCallbacks(execute=True):
+            iprange.mark_utilized = True
+            iprange.save()
+        prefix.refresh_from_db()
+        iprange.refresh_from_db()
+        self.assertEqual(prefix._utilized_size, 110)
+        self.assertEqual(iprange.utilization, 100)
+
+        # Move the IP to another VRF
+        with self.captureOnCommitCallbacks(execute=True):
+            ipaddress.vrf = vrf
+            ipaddress.save()
+        prefix.refresh_from_db()
+        self.assertEqual(prefix._utilized_size, 110)  # Still covered by the utilized range
+
+        # Delete the range and resize the child prefix
+        with self.captureOnCommitCallbacks(execute=True):
+            iprange.delete()
+            prefix.prefix = IPNetwork('10.0.0.0/23')
+            prefix.save()
+        container.refresh_from_db()
+        prefix.refresh_from_db()
+        self.assertEqual(float(container.utilization), round(512 / 65536 * 100, 2))
+        self.assertEqual(prefix._usable_size, 510)
+        self.assertEqual(prefix._utilized_size, 10)
+
+        # Filter by utilization
+        self.assertEqual(list(Prefix.objects.filter(_utilization__gte=1)), [prefix])
+
     #
     # Uniqueness enforcement tests
     #
@@ -530,6 +658,40 @@ class TestPrefixHierarchy(TestCase):
         self.assertEqual(prefixes[3]._depth, 2)
         self.assertEqual(prefixes[3]._children, 0)
 
+    def test_deferred_updates(self):
+        vrf = VRF.objects.create(name='VRF A')
+        Prefix.objects.create(prefix='192.168.0.0/16')
+
+        with defer_prefix_hierarchy_updates():
+            # Create 10.0.0.0/12 and 10.0.1.0/24, delete 10.0.0.0/16, and move 2001:db8::/40 to a VRF
+            Prefix(prefix='10.0.0.0/12').save()
+            Prefix(prefix='10.0.1.0/24').save()
+            Prefix.objects.get(prefix='10.0.0.0/16').delete()
+            p = Prefix.objects.get(prefix='2001:db8::/40')
+            p.vrf = vrf
+            p.save()
+
+            # The hierarchy is not updated until exiting the context
+            prefix = Prefix.objects.get(prefix='10.0.0.0/8')
+            self.assertEqual(prefix._children, 2)
+
+        prefixes = Prefix.objects.filter(vrf__isnull=True)
+        self.assertEqual(
+            [(str(p.prefix), p._depth, p._children) for p in prefixes],
+            [
+                ('10.0.0.0/8', 0, 3),
+                ('10.0.0.0/12', 1, 2),
+                ('10.0.0.0/24', 2, 0),
+                ('10.0.1.0/24', 2, 0),
+                ('192.168.0.0/16', 0, 0),
+                ('2001:db8::/32', 0, 1),
+                ('2001:db8::/48', 1, 0),
+            ]
+        )
+        prefix = Prefix.objects.get(vrf=vrf)
+        self.assertEqual(prefix._depth, 0)
+        self.assertEqual(prefix._children, 0)
+
 
 class TestIPAddress(TestCase):
 
@@ -629,6 +791,12 @@ class TestVLANGroup(TestCase):
 
         available_vids = vlangroup.get_available_vids()
         self.assertListEqual(available_vids, list(range(104, 200)))
+        self.assertListEqual(vlangroup.get_available_vids(limit=3), [104, 105, 106])
+
+    def test_get_available_vid_ranges(self):
+        vid_ranges = [NumericRange(10, 20, bounds='[)'), NumericRange(29, 40, bounds='(]')]
+        available_ranges = get_available_vid_ranges(vid_ranges, [1, 10, 12, 13, 19, 30, 40, 50])
+        self.assertListEqual(list(available_ranges), [range(11, 12), range(14, 19), range(31, 40)])
 
     def test_get_next_available_vid(self):
         vlangroup = VLANGroup.objects.first()
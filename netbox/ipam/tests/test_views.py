@@ -10,6 +10,7 @@ from dcim.constants import InterfaceTypeChoices
 from dcim.models import Device, DeviceRole, DeviceType, Manufacturer, Site, Interface
 from ipam.choices import *
 from ipam.models import *
+from ipam.utils import AnnotatedIPSpace, AnnotatedPrefixSpace, AvailableIPSpace
 from netbox.choices import CSVDelimiterChoices, ImportFormatChoices
 from tenancy.models import Tenant
 from users.models import ObjectPermission
@@ -473,6 +474,22 @@ class PrefixTestCase(ViewTestCases.PrimaryObjectViewTestCase):
         url = reverse('ipam:prefix_prefixes', kwargs={'pk': prefixes[0].pk})
         self.assertHttpStatus(self.client.get(url), 200)
 
+        # Available space is interleaved with child prefixes, and only the requested page is rendered
+        space = AnnotatedPrefixSpace(prefixes[0].prefix, prefixes[0].get_child_prefixes())
+        space.batch_size = 1
+        self.assertListEqual(
+            [str(prefix.prefix) for prefix in space],
+            [
+                '192.168.0.0/24', '192.168.1.0/24', '192.168.2.0/24', '192.168.3.0/24', '192.168.4.0/22',
+                '192.168.8.0/21', '192.168.16.0/20', '192.168.32.0/19', '192.168.64.0/18', '192.168.128.0/17',
+            ]
+        )
+        self.assertListEqual([prefix.pk for prefix in space[1:4]], [prefix.pk for prefix in prefixes[1:]])
+        response = self.client.get(f'{url}?per_page=3')
+        self.assertHttpStatus(response, 200)
+        self.assertContains(response, '192.168.2.0/24')
+        self.assertNotContains(response, '192.168.64.0/18')
+
     @override_settings(EXEMPT_VIEW_PERMISSIONS=['*'])
     def test_prefix_ipranges(self):
         prefix = Prefix.objects.create(prefix=IPNetwork('192.168.0.0/16'))
@@ -501,6 +518,41 @@ class PrefixTestCase(ViewTestCases.PrimaryObjectViewTestCase):
         url = reverse('ipam:prefix_ipaddresses', kwargs={'pk': prefix.pk})
         self.assertHttpStatus(self.client.get(url), 200)
 
+    def test_annotated_ip_space(self):
+        prefix = Prefix.objects.create(prefix=IPNetwork('192.168.0.0/24'))
+        IPRange.objects.create(
+            start_address=IPNetwork('192.168.0.10/24'),
+            end_address=IPNetwork('192.168.0.20/24'),
+            mark_populated=True
+        )
+        IPAddress.objects.bulk_create([
+            IPAddress(address=IPNetwork(f'192.168.0.{i}/24')) for i in (1, 2, 10, 15, 100, 254)
+        ])
+
+        space = AnnotatedIPSpace(prefix)
+        space.batch_size = 2
+        records = [
+            str(record.first_ip) if isinstance(record, AvailableIPSpace) else record
+            for record in space
+        ]
+        self.assertEqual(len(space), 10)
+        self.assertListEqual(records, [
+            IPAddress.objects.get(address='192.168.0.1/24'),
+            IPAddress.objects.get(address='192.168.0.2/24'),
+            '192.168.0.3/24',
+            IPRange.objects.get(),
+            IPAddress.objects.get(address='192.168.0.10/24'),
+            IPAddress.objects.get(address='192.168.0.15/24'),
+            '192.168.0.21/24',
+            IPAddress.objects.get(address='192.168.0.100/24'),
+            '192.168.0.101/24',
+            IPAddress.objects.get(address='192.168.0.254/24'),
+        ])
+
+        # Slices resume from the nearest checkpoint
+        for i in range(len(space)):
+            self.assertListEqual(space[i:i + 3], list(space)[i:i + 3])
+
     @override_settings(EXEMPT_VIEW_PERMISSIONS=['*'])
     def test_prefix_import(self):
         """
@@ -722,6 +774,33 @@ class IPAddressTestCase(ViewTestCases.PrimaryObjectViewTestCase):
             'description': 'New description',
         }
 
+    @override_settings(EXEMPT_VIEW_PERMISSIONS=['*'])
+    def test_import_duplicate_ipaddresses(self):
+        VRF.objects.filter(name='VRF 1').update(enforce_unique=True)
+        self.add_permissions('ipam.add_ipaddress')
+
+        # All conflicts, both with existing IP addresses and within the import, are reported at once
+        csv_data = (
+            "vrf,address,status,role",
+            "VRF 1,192.0.2.1/24,active,",
+            "VRF 1,192.0.2.10/24,active,",
+            "VRF 1,192.0.2.10/32,active,",
+            "VRF 1,192.0.2.2/24,active,vip",
+            "VRF 2,192.0.2.3/24,active,",
+        )
+        form_data = {
+            'data': '\n'.join(csv_data),
+            'format': ImportFormatChoices.CSV,
+            'csv_delimiter': CSVDelimiterChoices.AUTO,
+        }
+        response = self.client.post(reverse('ipam:ipaddress_bulk_import'), data=form_data)
+        self.assertHttpStatus(response, 200)
+        for record in (1, 3, 4):
+            self.assertContains(response, f'Record {record} address: Duplicate IP address found in VRF VRF 1')
+        self.assertNotContains(response, 'Record 2 address')
+        self.assertNotContains(response, 'Record 5 address')
+        self.assertEqual(IPAddress.objects.count(), 3)
+
 
 class FHRPGroupTestCase(ViewTestCases.PrimaryObjectViewTestCase):
     model = FHRPGroup
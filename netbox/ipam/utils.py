@@ -1,20 +1,74 @@
+import bisect
+import heapq
+import itertools
+import threading
+import zlib
+from collections import defaultdict, namedtuple
+from contextlib import ExitStack, contextmanager
 from dataclasses import dataclass
-import netaddr
+from decimal import Decimal
+from functools import reduce
+from operator import or_
 
+import netaddr
+from django.db import connection, transaction
+from django.db.models import CharField, F, Q
+from django.db.models.functions import Cast
 from django.utils.translation import gettext_lazy as _
+from django_pglocks import advisory_lock
+
+from core.models import ObjectType
+from core.signals import record_created_objects
+from extras.models import TaggedItem
+from netbox.config import get_config
+from netbox.constants import ADVISORY_LOCK_KEYS
 
 from .constants import *
-from .models import Prefix, VLAN
+from .choices import PrefixStatusChoices
+from .fields import IPAddressField
+from .lookups import Broadcast, Host, Inet
+from .models import IPAddress, IPRange, Prefix, VLAN
+from .models.vlans import get_available_vid_ranges
 
 __all__ = (
+    'AnnotatedIPSpace',
+    'AnnotatedPrefixSpace',
+    'AnnotatedSpace',
     'AvailableIPSpace',
     'add_available_vlans',
     'add_requested_prefixes',
-    'annotate_ip_space',
+    'bulk_create_objects',
+    'bulk_create_prefixes',
+    'carve_prefixes',
+    'defer_ip_address_uniqueness_checks',
+    'defer_prefix_hierarchy_updates',
+    'enqueue_prefix_hierarchy_update',
+    'enqueue_utilization_update',
+    'flush_utilization_updates',
+    'get_ip_address_lock_ids',
     'get_next_available_prefix',
+    'get_prefix_topology_lock_id',
+    'get_root_networks',
+    'get_utilization_dependents',
+    'ip_address_lock',
+    'ip_address_uniqueness_deferred',
+    'lock_prefix_topology',
     'rebuild_prefixes',
+    'update_iprange_utilization',
+    'update_prefix_hierarchy',
+    'update_prefix_utilization',
+    'validate_ip_address_uniqueness',
 )
 
+# Prefixes awaiting a rebuild of their hierarchy (see defer_prefix_hierarchy_updates())
+_prefix_hierarchy_queue = threading.local()
+
+# Set while the enforcement of unique IP space is deferred (see defer_ip_address_uniqueness_checks())
+_ip_address_uniqueness = threading.local()
+
+# Prefixes & IPRanges awaiting recalculation of their cached utilization (see enqueue_utilization_update())
+_utilization_queue = threading.local()
+
 
 @dataclass
 class AvailableIPSpace:
@@ -63,134 +117,248 @@ def add_requested_prefixes(parent, prefix_list, show_available=True, show_assign
     return child_prefixes
 
 
-def annotate_ip_space(prefix):
-    # Compile child objects
-    records = []
-    records.extend([
-        (iprange.start_address.ip, iprange) for iprange in prefix.get_child_ranges(mark_populated=True)
-    ])
-    records.extend([
-        (ip.address.ip, ip) for ip in prefix.get_child_ips()
-    ])
-    records = sorted(records, key=lambda x: x[0])
-
-    # Determine the first & last valid IP addresses in the prefix
-    if prefix.family == 4 and prefix.mask_length < 31 and not prefix.is_pool:
-        # Ignore the network and broadcast addresses for non-pool IPv4 prefixes larger than /31
-        first_ip_in_prefix = netaddr.IPAddress(prefix.prefix.first + 1)
-        last_ip_in_prefix = netaddr.IPAddress(prefix.prefix.last - 1)
-    else:
-        first_ip_in_prefix = netaddr.IPAddress(prefix.prefix.first)
-        last_ip_in_prefix = netaddr.IPAddress(prefix.prefix.last)
-
-    if not records:
-        return [
-            AvailableIPSpace(
-                size=int(last_ip_in_prefix - first_ip_in_prefix + 1),
-                first_ip=f'{first_ip_in_prefix}/{prefix.mask_length}'
-            )
-        ]
+ChildRecord = namedtuple('ChildRecord', ('index', 'pk'))
+AvailableRecord = namedtuple('AvailableRecord', ('first', 'last'))
 
-    output = []
-    prev_ip = None
 
-    # Account for any available IPs before the first real IP
-    if records[0][0] > first_ip_in_prefix:
-        output.append(AvailableIPSpace(
-            size=int(records[0][0] - first_ip_in_prefix),
-            first_ip=f'{first_ip_in_prefix}/{prefix.mask_length}'
-        ))
+class AnnotatedSpace:
+    """
+    A lazy sequence of the child objects within a range of addresses, interleaved with records representing the
+    available space between them, for display in a paginated table. Rather than compiling the complete list, children
+    are streamed from the database as (start, stop, pk) values, ordered by a (start, pk) key, and merged with the gaps
+    between them. Model instances are retrieved only for the rows within a requested slice.
+
+    The first pass (to determine the length of the sequence) records the key of every Nth child as a checkpoint. The
+    retrieval of a slice resumes from the nearest preceding checkpoint, so that only the children within that span are
+    read.
+    """
+    batch_size = 1000
+
+    def __init__(self, first, last, show_assigned=True):
+        self.first = first
+        self.last = last
+        self.show_assigned = show_assigned
+        self._count = None
+        self._checkpoints = []
+
+    def get_querysets(self):
+        """
+        Return a list of QuerySets of child objects, each annotated with _start, the INET or CIDR value by which the
+        children are ordered, and _first and _last, the first and last host addresses they occupy (as text).
+        """
+        raise NotImplementedError()
+
+    def get_available_spans(self, first, last):
+        """
+        Divide the available space between two addresses (as integers, inclusive) into the (first, last) spans to be
+        displayed as individual rows.
+        """
+        return [(first, last)]
+
+    def get_available_record(self, first, last):
+        """
+        Return a record representing a span of available space.
+        """
+        raise NotImplementedError()
+
+    def _iter_children(self, index, queryset, after=None):
+        # Stream (first, index, pk, last, start) for each child in order, resuming after the given (start, index, pk)
+        # key. Addresses are retrieved as text, which is far cheaper to convert than IPNetwork values.
+        if after is not None:
+            start, after_index, pk = after
+            if index == after_index:
+                queryset = queryset.filter(Q(_start__gt=start) | Q(_start=start, pk__gt=pk))
+            elif index > after_index:
+                queryset = queryset.filter(_start__gte=start)
+            else:
+                queryset = queryset.filter(_start__gt=start)
+        children = queryset.order_by('_start', 'pk').values_list(
+            '_first', '_last', 'pk', Cast('_start', output_field=CharField())
+        )
+
+        for first, last, pk, start in children.iterator(chunk_size=self.batch_size):
+            first = int(netaddr.IPAddress(first))
+            last = first if last == first else int(netaddr.IPAddress(last))
+            yield first, index, pk, last, start
+
+    def _iter_records(self, state=None):
+        """
+        Yield a (record, state) pair for each row. Records are ChildRecord or AvailableRecord placeholders; children
+        also carry the state from which iteration can be resumed following them. (The record is None for children which
+        are not displayed.)
+        """
+        next_free, after = state or (self.first, None)
+        children = [self._iter_children(i, queryset, after) for i, queryset in enumerate(self.get_querysets())]
+
+        for first, index, pk, last, start in heapq.merge(*children):
+            if next_free < first and next_free <= self.last:
+                for span in self.get_available_spans(next_free, min(first - 1, self.last)):
+                    yield AvailableRecord(*span), None
+            next_free = max(next_free, last + 1)
+            yield ChildRecord(index, pk) if self.show_assigned else None, (next_free, (start, index, pk))
+
+        if next_free <= self.last:
+            for span in self.get_available_spans(next_free, self.last):
+                yield AvailableRecord(*span), None
+
+    def _scan(self):
+        # Count the rows, recording a checkpoint after each batch of children
+        count = 0
+        child_count = 0
+        self._checkpoints = [(0, None)]
+        for record, state in self._iter_records():
+            if record is not None:
+                count += 1
+            if state is not None:
+                child_count += 1
+                if not child_count % self.batch_size:
+                    self._checkpoints.append((count, state))
+        self._count = count
+
+    def _resolve(self, records):
+        # Replace placeholders with model instances & available space records
+        pks = defaultdict(list)
+        for record in records:
+            if type(record) is ChildRecord:
+                pks[record.index].append(record.pk)
+        querysets = self.get_querysets()
+        instances = {
+            ChildRecord(index, instance.pk): instance
+            for index, pk_list in pks.items() for instance in querysets[index].filter(pk__in=pk_list)
+        }
+
+        resolved = []
+        for record in records:
+            if type(record) is AvailableRecord:
+                resolved.append(self.get_available_record(record.first, record.last))
+            elif record in instances:
+                resolved.append(instances[record])
+        return resolved
+
+    def __len__(self):
+        if self._count is None:
+            self._scan()
+        return self._count
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            index = key + len(self) if key < 0 else key
+            if not 0 <= index < len(self):
+                raise IndexError('Index out of range')
+            return self[index:index + 1][0]
+
+        start, stop, step = key.indices(len(self))
+        if start >= stop:
+            return []
+
+        # Resume from the last checkpoint preceding the slice
+        position, state = self._checkpoints[bisect.bisect_right(self._checkpoints, start, key=lambda c: c[0]) - 1]
+        records = (record for record, state in self._iter_records(state) if record is not None)
+
+        return self._resolve(list(itertools.islice(records, start - position, stop - position, step)))
+
+    def __iter__(self):
+        records = (record for record, state in self._iter_records() if record is not None)
+        while batch := list(itertools.islice(records, self.batch_size)):
+            yield from self._resolve(batch)
+
+
+class AnnotatedIPSpace(AnnotatedSpace):
+    """
+    The child IP ranges (those marked as populated) and IP addresses of a Prefix, interleaved with AvailableIPSpace
+    records.
+    """
+    def __init__(self, prefix):
+        self.prefix = prefix
 
-    # Add IP ranges & addresses, annotating available space in between records
-    for record in records:
-        if prev_ip:
-            # Annotate available space
-            if (diff := int(record[0]) - int(prev_ip)) > 1:
-                first_skipped = f'{prev_ip + 1}/{prefix.mask_length}'
-                output.append(AvailableIPSpace(
-                    size=diff - 1,
-                    first_ip=first_skipped
-                ))
-
-        output.append(record[1])
-
-        # Update the previous IP address
-        if hasattr(record[1], 'end_address'):
-            prev_ip = record[1].end_address.ip
+        # Ignore the network and broadcast addresses for non-pool IPv4 prefixes larger than /31
+        if prefix.family == 4 and prefix.mask_length < 31 and not prefix.is_pool:
+            super().__init__(prefix.prefix.first + 1, prefix.prefix.last - 1)
         else:
-            prev_ip = record[0]
+            super().__init__(prefix.prefix.first, prefix.prefix.last)
 
-    # Include any remaining available IPs
-    if prev_ip < last_ip_in_prefix:
-        output.append(AvailableIPSpace(
-            size=int(last_ip_in_prefix - prev_ip),
-            first_ip=f'{prev_ip + 1}/{prefix.mask_length}'
-        ))
+    def get_querysets(self):
+        return [
+            self.prefix.get_child_ranges(mark_populated=True).annotate(
+                _start=Inet(Host('start_address')),
+                _first=Host('start_address', output_field=CharField()),
+                _last=Host('end_address', output_field=CharField())
+            ),
+            self.prefix.get_child_ips().annotate(
+                _start=Inet(Host('address')),
+                _first=Host('address', output_field=CharField()),
+                _last=F('_first')
+            ),
+        ]
 
-    return output
+    def get_available_record(self, first, last):
+        first_ip = netaddr.IPAddress(first, version=self.prefix.family)
+        return AvailableIPSpace(size=last - first + 1, first_ip=f'{first_ip}/{self.prefix.mask_length}')
 
 
-def available_vlans_from_range(vlans, vlan_group, vid_range):
+class AnnotatedPrefixSpace(AnnotatedSpace):
     """
-    Create fake records for all gaps between used VLANs
+    A set of child Prefixes within a parent network, interleaved with placeholder Prefixes representing the available
+    space between them.
     """
-    min_vid = int(vid_range.lower) if vid_range else VLAN_VID_MIN
-    max_vid = int(vid_range.upper) if vid_range else VLAN_VID_MAX
-
-    if not vlans:
-        return [{
-            'vid': min_vid,
-            'vlan_group': vlan_group,
-            'available': max_vid - min_vid
-        }]
-
-    prev_vid = min_vid - 1
-    new_vlans = []
-    for vlan in vlans:
-
-        # Ignore VIDs outside the range
-        if not min_vid <= vlan.vid < max_vid:
-            continue
+    def __init__(self, parent, queryset, show_assigned=True):
+        self.parent = parent
+        self.queryset = queryset
+        super().__init__(parent.first, parent.last, show_assigned)
 
-        # Annotate any available VIDs between the previous (or minimum) VID
-        # and the current VID
-        if vlan.vid - prev_vid > 1:
-            new_vlans.append({
-                'vid': prev_vid + 1,
-                'vlan_group': vlan_group,
-                'available': vlan.vid - prev_vid - 1,
-            })
-
-        prev_vid = vlan.vid
+    def get_querysets(self):
+        return [
+            self.queryset.annotate(
+                _start=F('prefix'),
+                _first=Host('prefix', output_field=CharField()),
+                _last=Host(Broadcast('prefix'), output_field=CharField())
+            )
+        ]
 
-    # Annotate any remaining available VLANs
-    if prev_vid < max_vid:
-        new_vlans.append({
-            'vid': prev_vid + 1,
-            'vlan_group': vlan_group,
-            'available': max_vid - prev_vid - 1,
-        })
+    def get_available_spans(self, first, last):
+        version = self.parent.version
+        return [
+            (cidr.first, cidr.last) for cidr in netaddr.iprange_to_cidrs(
+                netaddr.IPAddress(first, version=version), netaddr.IPAddress(last, version=version)
+            )
+        ]
 
-    return new_vlans
+    def get_available_record(self, first, last):
+        prefix = netaddr.IPNetwork(netaddr.IPAddress(first, version=self.parent.version))
+        prefix.prefixlen = prefix.prefixlen - (last - first + 1).bit_length() + 1
+        return Prefix(prefix=prefix, status=None)
 
 
 def add_available_vlans(vlans, vlan_group):
     """
     Create fake records for all gaps between used VLANs
     """
-    new_vlans = []
-    for vid_range in vlan_group.vid_ranges:
-        new_vlans.extend(available_vlans_from_range(vlans, vlan_group, vid_range))
+    vlans = list(vlans)
+    new_vlans = [
+        {
+            'vid': vid_range.start,
+            'vlan_group': vlan_group,
+            'available': len(vid_range),
+        }
+        for vid_range in get_available_vid_ranges(vlan_group.vid_ranges, sorted(vlan.vid for vlan in vlans))
+    ]
 
-    vlans = list(vlans) + new_vlans
+    vlans = vlans + new_vlans
     vlans.sort(key=lambda v: v.vid if type(v) is VLAN else v['vid'])
 
     return vlans
 
 
-def rebuild_prefixes(vrf):
+def rebuild_prefixes(vrf, within=None, batch_size=100):
     """
-    Rebuild the prefix hierarchy for all prefixes in the specified VRF (or global table).
+    Rebuild the prefix hierarchy for all prefixes in the specified VRF (or global table). Prefixes are streamed from
+    the database in order, and only those whose depth or child count has changed are updated. Returns the number of
+    Prefixes updated.
+
+    :param vrf: The VRF (or its primary key), or None for the global table
+    :param within: An optional list of networks to which the rebuild is limited. Each must be the root of a subtree:
+        no Prefix outside the network may contain a Prefix inside it.
+    :param batch_size: The number of Prefixes to retrieve and to update at a time
     """
     def contains(parent, child):
         return child in parent and child != parent
@@ -204,13 +372,30 @@ def rebuild_prefixes(vrf):
             'prefix': prefix['prefix'],
             'children': 0,
         })
+        current[prefix['pk']] = (prefix['_depth'], prefix['_children'])
+
+    def pop_from_stack():
+        node = stack.pop()
+        for pk in node['pk']:
+            if current[pk] != (len(stack), node['children']):
+                update_queue.append(
+                    Prefix(pk=pk, _depth=len(stack), _children=node['children'])
+                )
+            del current[pk]
 
     stack = []
     update_queue = []
-    prefixes = Prefix.objects.filter(vrf=vrf).values('pk', 'prefix')
+    update_count = 0
+    current = {}
+    prefixes = Prefix.objects.filter(vrf=vrf)
+    if within:
+        prefixes = prefixes.filter(
+            reduce(or_, (Q(prefix__net_contained_or_equal=str(network)) for network in within))
+        )
+    prefixes = prefixes.values('pk', 'prefix', '_depth', '_children')
 
     # Iterate through all Prefixes in the VRF, growing and shrinking the stack as we go
-    for i, p in enumerate(prefixes):
+    for p in prefixes.iterator(chunk_size=batch_size):
 
         # Grow the stack if this is a child of the most recent prefix
         if not stack or contains(stack[-1]['prefix'], p['prefix']):
@@ -219,34 +404,507 @@ def rebuild_prefixes(vrf):
         # Handle duplicate prefixes
         elif stack[-1]['prefix'] == p['prefix']:
             stack[-1]['pk'].append(p['pk'])
+            current[p['pk']] = (p['_depth'], p['_children'])
 
         # If this is a sibling or parent of the most recent prefix, pop nodes from the
         # stack until we reach a parent prefix (or the root)
         else:
             while stack and not contains(stack[-1]['prefix'], p['prefix']):
-                node = stack.pop()
-                for pk in node['pk']:
-                    update_queue.append(
-                        Prefix(pk=pk, _depth=len(stack), _children=node['children'])
-                    )
+                pop_from_stack()
             push_to_stack(p)
 
-        # Flush the update queue once it reaches 100 Prefixes
-        if len(update_queue) >= 100:
+        # Flush the update queue once it reaches the batch size
+        if len(update_queue) >= batch_size:
             Prefix.objects.bulk_update(update_queue, ['_depth', '_children'])
+            update_count += len(update_queue)
             update_queue = []
 
     # Clear out any prefixes remaining in the stack
     while stack:
-        node = stack.pop()
-        for pk in node['pk']:
-            update_queue.append(
-                Prefix(pk=pk, _depth=len(stack), _children=node['children'])
-            )
+        pop_from_stack()
 
     # Final flush of any remaining Prefixes
     Prefix.objects.bulk_update(update_queue, ['_depth', '_children'])
 
+    return update_count + len(update_queue)
+
+
+def get_root_networks(vrf_id, networks):
+    """
+    Return a dictionary mapping each of the given networks to the root of the prefix tree in which it resides within
+    the specified VRF: the outermost Prefix containing it, or the network itself if no Prefix contains it.
+    """
+    networks = list(networks)
+    if not networks:
+        return {}
+    containers = Prefix.objects.filter(vrf_id=vrf_id).filter(
+        reduce(or_, (Q(prefix__net_contains=str(network)) for network in networks))
+    ).values_list('prefix', flat=True).distinct()
+    containers = sorted(containers, key=lambda p: p.prefixlen)
+    return {
+        network: next((p for p in containers if p.version == network.version and network in p), network)
+        for network in networks
+    }
+
+
+def update_prefix_hierarchy(networks, batch_size=100):
+    """
+    Rebuild the hierarchy of the Prefixes affected by changes to the specified networks: the entire subtree rooted at
+    the outermost Prefix containing each network (or at the network itself, if no Prefix contains it).
+
+    Returns the number of Prefixes updated.
+
+    :param networks: A dictionary mapping VRF IDs (or None for the global table) to collections of networks
+    :param batch_size: The number of Prefixes to retrieve and to update at a time
+    """
+    update_count = 0
+    for vrf_id, vrf_networks in networks.items():
+        vrf_networks = netaddr.cidr_merge(vrf_networks)
+        if not vrf_networks:
+            continue
+
+        roots = get_root_networks(vrf_id, vrf_networks).values()
+        update_count += rebuild_prefixes(vrf_id, within=netaddr.cidr_merge(roots), batch_size=batch_size)
+
+    return update_count
+
+
+def get_prefix_topology_lock_id(vrf_id):
+    """
+    Return the ID of the advisory lock which serializes changes to the set of Prefixes within a VRF (or the global
+    table) with the determination of the IP address locks for that VRF (see ip_address_lock()).
+    """
+    return ADVISORY_LOCK_KEYS['prefix-topology'], (vrf_id or 0) % 2**31
+
+
+def lock_prefix_topology(vrf_ids):
+    """
+    Acquire the prefix topology locks for the given VRFs exclusively, until the end of the current transaction. This
+    must be called within a transaction before Prefixes are created or deleted, or their networks or VRFs changed, so
+    that no IP address lock is determined from a prefix tree which is being modified.
+    """
+    with connection.cursor() as cursor:
+        for lock_id in sorted({get_prefix_topology_lock_id(vrf_id) for vrf_id in vrf_ids}):
+            cursor.execute('SELECT pg_advisory_xact_lock(%s, %s)', lock_id)
+
+
+def get_ip_address_lock_ids(addresses):
+    """
+    Return the sorted IDs of the advisory locks which serialize the allocation and modification of the given IP
+    addresses, each specified as a (VRF ID, address) pair. Each address maps to a lock for the root of the prefix tree
+    in which it resides within its VRF (see get_root_networks()). An address and any Prefix containing it thus always
+    share a lock, while IPs in unrelated prefixes or VRFs do not. The prefix topology lock for each VRF must be held
+    while these are determined and held (see ip_address_lock()).
+    """
+    networks = defaultdict(set)
+    for vrf_id, address in addresses:
+        networks[vrf_id].add(netaddr.IPNetwork(netaddr.IPNetwork(address).ip))
+
+    lock_ids = set()
+    for vrf_id, vrf_networks in networks.items():
+        for root in set(get_root_networks(vrf_id, vrf_networks).values()):
+            # Derive a signed 32-bit key from the VRF and root network
+            key = zlib.crc32(f'{vrf_id}:{root}'.encode())
+            lock_ids.add((ADVISORY_LOCK_KEYS['available-ips'], key - 2**32 if key >= 2**31 else key))
+
+    return sorted(lock_ids)
+
+
+@contextmanager
+def ip_address_lock(addresses):
+    """
+    Hold the advisory locks for the given IP addresses (see get_ip_address_lock_ids()). Locks are acquired in a
+    consistent order to avoid deadlocks.
+
+    The prefix topology lock of each VRF is held (shared) throughout, so that Prefixes cannot be created, deleted, or
+    moved within it meanwhile (see lock_prefix_topology()). Otherwise, a concurrent request which created a new root
+    Prefix could cause two requests for the same address to determine, and acquire, different locks.
+    """
+    addresses = list(addresses)
+    with ExitStack() as stack:
+        for lock_id in sorted({get_prefix_topology_lock_id(vrf_id) for vrf_id, _ in addresses}):
+            stack.enter_context(advisory_lock(lock_id, shared=True))
+        for lock_id in get_ip_address_lock_ids(addresses):
+            stack.enter_context(advisory_lock(lock_id))
+        yield
+
+
+@contextmanager
+def defer_prefix_hierarchy_updates():
+    """
+    Defer maintenance of the prefix hierarchy (each Prefix's depth and child count) while many Prefixes are being
+    created, modified, or deleted. Rather than updating the parents and children of each Prefix as it is saved, the
+    affected networks are recorded and their subtrees rebuilt once, on exit from the context. The operations within
+    the context are executed atomically, along with the rebuild.
+
+    Contexts may be nested; the hierarchy is rebuilt on exit from the outermost context.
+    """
+    if getattr(_prefix_hierarchy_queue, 'networks', None) is not None:
+        yield
+        return
+
+    _prefix_hierarchy_queue.networks = defaultdict(set)
+    try:
+        with transaction.atomic():
+            yield
+            networks = _prefix_hierarchy_queue.networks
+            _prefix_hierarchy_queue.networks = None
+            update_prefix_hierarchy(networks)
+    finally:
+        _prefix_hierarchy_queue.networks = None
+
+
+def enqueue_prefix_hierarchy_update(vrf_id, prefix):
+    """
+    Record a change to the specified network within the current defer_prefix_hierarchy_updates() context. Returns
+    False (and records nothing) if updates to the prefix hierarchy are not currently being deferred.
+    """
+    networks = getattr(_prefix_hierarchy_queue, 'networks', None)
+    if networks is None:
+        return False
+    networks[vrf_id].add(netaddr.IPNetwork(prefix).cidr)
+    return True
+
+
+@contextmanager
+def defer_ip_address_uniqueness_checks():
+    """
+    Suspend the enforcement of unique IP space by IPAddress.clean() while a batch of IPAddresses is validated and
+    saved. The caller is responsible for validating the batch as a whole with validate_ip_address_uniqueness().
+    """
+    deferred = ip_address_uniqueness_deferred()
+    _ip_address_uniqueness.deferred = True
+    try:
+        yield
+    finally:
+        _ip_address_uniqueness.deferred = deferred
+
+
+def ip_address_uniqueness_deferred():
+    """
+    Return True if the enforcement of unique IP space is currently deferred (see defer_ip_address_uniqueness_checks()).
+    """
+    return getattr(_ip_address_uniqueness, 'deferred', False)
+
+
+def validate_ip_address_uniqueness(ip_addresses):
+    """
+    Enforce unique IP space (where applicable) for a batch of new or modified IPAddresses. Each address is compared with
+    existing IPAddresses in its VRF using a single query for the entire batch, and with the other members of the batch
+    in memory.
+
+    Returns a list of dictionaries mapping field names to error messages, one for each IPAddress (empty if valid).
+    """
+    enforce_global_unique = get_config().ENFORCE_GLOBAL_UNIQUE
+    enforced = [
+        bool(ip.address) and (ip.vrf.enforce_unique if ip.vrf else enforce_global_unique) for ip in ip_addresses
+    ]
+
+    # Retrieve all existing IPAddresses which share a VRF and host address with any member of the batch (other than
+    # those being modified)
+    hosts = defaultdict(set)
+    for ip, enforce in zip(ip_addresses, enforced):
+        if enforce:
+            hosts[ip.vrf_id].add(str(ip.address.ip))
+    existing = defaultdict(list)
+    if hosts:
+        duplicate_ips = IPAddress.objects.annotate(
+            host=Cast(Host('address'), output_field=IPAddressField())
+        ).filter(
+            reduce(or_, (Q(vrf=vrf_id, host__in=vrf_hosts) for vrf_id, vrf_hosts in hosts.items()))
+        ).exclude(
+            pk__in=[ip.pk for ip in ip_addresses if ip.pk]
+        ).select_related('vrf')
+        for duplicate_ip in duplicate_ips:
+            existing[(duplicate_ip.vrf_id, duplicate_ip.address.ip)].append(duplicate_ip)
+
+    errors = []
+    seen = defaultdict(list)
+    for ip, enforce in zip(ip_addresses, enforced):
+        if not enforce:
+            errors.append({})
+            continue
+        key = (ip.vrf_id, ip.address.ip)
+        duplicate_ips = existing[key] + seen[key]
+        if duplicate_ips and (
+                ip.role not in IPADDRESS_ROLES_NONUNIQUE or
+                any(dip.role not in IPADDRESS_ROLES_NONUNIQUE for dip in duplicate_ips)
+        ):
+            table = _("VRF {vrf}").format(vrf=ip.vrf) if ip.vrf else _("global table")
+            errors.append({
+                'address': [
+                    _("Duplicate IP address found in {table}: {ipaddress}").format(
+                        table=table,
+                        ipaddress=duplicate_ips[0]
+                    )
+                ]
+            })
+        else:
+            errors.append({})
+        seen[key].append(ip)
+
+    return errors
+
+
+def _get_utilization(utilized_size, usable_size, mark_utilized):
+    if mark_utilized:
+        return Decimal(100)
+    return min(round(Decimal(utilized_size) * 100 / usable_size, 2), Decimal(100))
+
+
+def update_prefix_utilization(prefix_ids, batch_size=100):
+    """
+    Recalculate the cached utilization of the specified Prefixes, updating only those whose figures have changed.
+    Returns the number of Prefixes updated.
+    """
+    update_queue = []
+    update_count = 0
+    fields = ('_utilized_size', '_usable_size', '_utilization')
+
+    for prefix in Prefix.objects.filter(pk__in=prefix_ids).iterator(chunk_size=batch_size):
+        current = tuple(getattr(prefix, field) for field in fields)
+        prefix._usable_size = prefix.get_usable_size()
+        prefix._utilized_size = prefix.get_utilized_size()
+        prefix._utilization = _get_utilization(prefix._utilized_size, prefix._usable_size, prefix.mark_utilized)
+        if current != tuple(getattr(prefix, field) for field in fields):
+            update_queue.append(prefix)
+        if len(update_queue) >= batch_size:
+            Prefix.objects.bulk_update(update_queue, fields)
+            update_count += len(update_queue)
+            update_queue = []
+
+    Prefix.objects.bulk_update(update_queue, fields)
+
+    return update_count + len(update_queue)
+
+
+def update_iprange_utilization(iprange_ids, batch_size=100):
+    """
+    Recalculate the cached utilization of the specified IPRanges, updating only those whose figures have changed.
+    Returns the number of IPRanges updated.
+    """
+    update_queue = []
+    update_count = 0
+    fields = ('_utilized_size', '_utilization')
+
+    for iprange in IPRange.objects.filter(pk__in=iprange_ids).iterator(chunk_size=batch_size):
+        current = tuple(getattr(iprange, field) for field in fields)
+        iprange._utilized_size = iprange.get_utilized_size()
+        iprange._utilization = _get_utilization(iprange._utilized_size, iprange.size, iprange.mark_utilized)
+        if current != tuple(getattr(iprange, field) for field in fields):
+            update_queue.append(iprange)
+        if len(update_queue) >= batch_size:
+            IPRange.objects.bulk_update(update_queue, fields)
+            update_count += len(update_queue)
+            update_queue = []
+
+    IPRange.objects.bulk_update(update_queue, fields)
+
+    return update_count + len(update_queue)
+
+
+def get_utilization_dependents(addresses=(), spans=(), networks=(), batch_size=100):
+    """
+    Return the IDs of the Prefixes and IPRanges whose utilization depends on the specified objects, as a tuple of two
+    sets.
+
+    :param addresses: (VRF ID, address) pairs of IPAddresses, which count toward the non-container Prefixes and the
+        IPRanges which contain them
+    :param spans: (VRF ID, start address, end address) tuples of IPRanges marked as utilized, which count toward the
+        non-container Prefixes which contain them
+    :param networks: (VRF ID, network) pairs of Prefixes, which count toward the container Prefixes which contain them
+    """
+    prefix_filters = []
+    iprange_filters = []
+    container = PrefixStatusChoices.STATUS_CONTAINER
+
+    for vrf_id, address in addresses:
+        address = str(netaddr.IPNetwork(address).ip)
+        prefix_filters.append(
+            Q(vrf_id=vrf_id, prefix__net_contains_or_equals=address) & ~Q(status=container)
+        )
+        iprange_filters.append(Q(
+            vrf_id=vrf_id,
+            start_address__host__inet__lte=address,
+            end_address__host__inet__gte=address
+        ))
+    for vrf_id, start_address, end_address in spans:
+        prefix_filters.append(
+            Q(
+                vrf_id=vrf_id,
+                prefix__net_contains_or_equals=str(netaddr.IPNetwork(start_address).ip)
+            ) & Q(
+                prefix__net_contains_or_equals=str(netaddr.IPNetwork(end_address).ip)
+            ) & ~Q(status=container)
+        )
+    for vrf_id, network in networks:
+        prefix_filters.append(
+            Q(vrf_id=vrf_id, prefix__net_contains=str(netaddr.IPNetwork(network).cidr), status=container)
+        )
+
+    # Match objects in batches to limit the size of each query
+    prefix_ids = set()
+    iprange_ids = set()
+    for i in range(0, len(prefix_filters), batch_size):
+        prefix_ids.update(
+            Prefix.objects.filter(reduce(or_, prefix_filters[i:i + batch_size])).values_list('pk', flat=True)
+        )
+    for i in range(0, len(iprange_filters), batch_size):
+        iprange_ids.update(
+            IPRange.objects.filter(reduce(or_, iprange_filters[i:i + batch_size])).values_list('pk', flat=True)
+        )
+
+    return prefix_ids, iprange_ids
+
+
+def enqueue_utilization_update(prefixes=(), ip_ranges=(), addresses=(), spans=(), networks=()):
+    """
+    Schedule the cached utilization of Prefixes and IPRanges to be recalculated once the current transaction has been
+    committed. Besides the Prefixes and IPRanges specified directly by ID, those affected by changes to IPAddresses,
+    IPRanges, and Prefixes (see get_utilization_dependents()) are recalculated. These are resolved only once the
+    transaction has been committed, and each object is recalculated only once.
+    """
+    queue = _get_utilization_queue()
+    queue['prefixes'].update(pk for pk in prefixes if pk)
+    queue['ip_ranges'].update(pk for pk in ip_ranges if pk)
+    queue['addresses'].update((vrf_id, str(address)) for vrf_id, address in addresses)
+    queue['spans'].update((vrf_id, str(start), str(end)) for vrf_id, start, end in spans)
+    queue['networks'].update((vrf_id, str(network)) for vrf_id, network in networks)
+    transaction.on_commit(flush_utilization_updates)
+
+
+def _get_utilization_queue():
+    if not hasattr(_utilization_queue, 'objects'):
+        _utilization_queue.objects = {
+            'prefixes': set(),
+            'ip_ranges': set(),
+            'addresses': set(),
+            'spans': set(),
+            'networks': set(),
+        }
+    return _utilization_queue.objects
+
+
+def flush_utilization_updates():
+    """
+    Recalculate the utilization of all Prefixes and IPRanges queued by enqueue_utilization_update().
+    """
+    queue = _get_utilization_queue()
+    del _utilization_queue.objects
+    if not any(queue.values()):
+        return
+
+    prefix_ids, iprange_ids = get_utilization_dependents(queue['addresses'], queue['spans'], queue['networks'])
+    update_prefix_utilization(prefix_ids | queue['prefixes'])
+    update_iprange_utilization(iprange_ids | queue['ip_ranges'])
+
+
+def carve_prefixes(available, version, requests):
+    """
+    Allocate batches of equally sized prefixes from the available address space. The space is materialized once as a
+    list of free intervals, and each batch is carved from it in a single pass, leaving the remainder (including any
+    space skipped for alignment) for subsequent batches. Batches are allocated largest prefixes first to limit
+    fragmentation.
+
+    Returns a list of the prefixes (as IPNetworks) allocated for each batch, or None if there is insufficient space to
+    satisfy all batches.
+
+    :param available: An iterable of the available address space, as netaddr IPRanges in ascending order
+    :param version: The IP version (4 or 6)
+    :param requests: A list of dictionaries, each specifying a batch:
+        prefix_length: The length of each prefix
+        count: The number of prefixes (default: 1)
+        align_length: Each prefix must begin on a boundary of this length (default: the prefix length)
+        contiguous: All prefixes must be carved from consecutive boundaries within a single free interval
+    """
+    max_length = 32 if version == 4 else 128
+    free = [(iprange.first, iprange.last) for iprange in available]
+    allocations = [None] * len(requests)
+
+    for i in sorted(range(len(requests)), key=lambda i: requests[i]['prefix_length']):
+        prefix_length = requests[i]['prefix_length']
+        count = requests[i].get('count', 1)
+        size = 2 ** (max_length - prefix_length)
+        stride = 2 ** (max_length - requests[i].get('align_length', prefix_length))
+        allocated = []
+        remaining = []
+
+        for first, last in free:
+            start = -(-first // stride) * stride
+            slots = (last - start - size + 1) // stride + 1 if start + size - 1 <= last else 0
+            if len(allocated) == count or not slots or (requests[i].get('contiguous') and slots < count):
+                remaining.append((first, last))
+                continue
+
+            # Carve prefixes from this interval, retaining any space before, between, or after them
+            for start in range(start, start + min(slots, count - len(allocated)) * stride, stride):
+                if start > first:
+                    remaining.append((first, start - 1))
+                allocated.append(netaddr.IPNetwork((start, prefix_length), version=version))
+                first = start + size
+            if first <= last:
+                remaining.append((first, last))
+
+        if len(allocated) < count:
+            return None
+        allocations[i] = allocated
+        free = remaining
+
+    return allocations
+
+
+def bulk_create_objects(model, instances, tags=None):
+    """
+    Create many new objects of a model with a single INSERT. As with bulk_create(), no post_save signals are sent;
+    change records, events, and search cache entries are written in bulk instead.
+
+    :param model: The model of the objects being created
+    :param instances: A list of unsaved instances of the model
+    :param tags: An optional list of the Tags to be assigned to each instance
+    """
+    if not instances:
+        return instances
+
+    model.objects.bulk_create(instances)
+    if tags:
+        object_type = ObjectType.objects.get_for_model(model)
+        TaggedItem.objects.bulk_create([
+            TaggedItem(tag=tag, content_type=object_type, object_id=instance.pk)
+            for instance, instance_tags in zip(instances, tags) for tag in instance_tags
+        ])
+    record_created_objects({model: instances})
+
+    return instances
+
+
+def bulk_create_prefixes(prefixes, tags=None):
+    """
+    Create many new Prefixes at once (see bulk_create_objects()). The prefix hierarchy is rebuilt once for all affected
+    subtrees, and the utilization of the affected prefixes is updated.
+
+    :param prefixes: A list of unsaved Prefixes
+    :param tags: An optional list of the Tags to be assigned to each Prefix
+    """
+    if not prefixes:
+        return prefixes
+
+    for prefix in prefixes:
+        prefix.prefix = netaddr.IPNetwork(prefix.prefix).cidr
+        prefix.cache_related_objects()
+    lock_prefix_topology({prefix.vrf_id for prefix in prefixes})
+    bulk_create_objects(Prefix, prefixes, tags)
+
+    networks = defaultdict(set)
+    for prefix in prefixes:
+        networks[prefix.vrf_id].add(prefix.prefix)
+    update_prefix_hierarchy(networks)
+    enqueue_utilization_update(
+        prefixes=[prefix.pk for prefix in prefixes],
+        networks=[(prefix.vrf_id, prefix.prefix) for prefix in prefixes]
+    )
+
+    return prefixes
+
 
 def get_next_available_prefix(ipset, prefix_size):
     """
@@ -1,9 +1,13 @@
+from collections import defaultdict
+
 from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import ValidationError
 from django.db.models import Prefetch
 from django.db.models.expressions import RawSQL
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse
 from django.utils.translation import gettext_lazy as _
+from django_tables2.data import TableListData
 
 from circuits.models import Provider
 from dcim.filtersets import InterfaceFilterSet
@@ -21,7 +25,10 @@ from . import filtersets, forms, tables
 from .choices import PrefixStatusChoices
 from .constants import *
 from .models import *
-from .utils import add_requested_prefixes, add_available_vlans, annotate_ip_space
+from .utils import (
+    AnnotatedIPSpace, AnnotatedPrefixSpace, add_available_vlans, add_requested_prefixes,
+    defer_ip_address_uniqueness_checks, defer_prefix_hierarchy_updates, validate_ip_address_uniqueness,
+)
 
 
 #
@@ -388,7 +395,13 @@ class AggregatePrefixesView(generic.ObjectChildrenView):
         show_available = bool(request.GET.get('show_available', 'true') == 'true')
         show_assigned = bool(request.GET.get('show_assigned', 'true') == 'true')
 
-        return add_requested_prefixes(parent.prefix, queryset, show_available, show_assigned)
+        if get_table_ordering(request, self.table):
+            return add_requested_prefixes(parent.prefix, queryset, show_available, show_assigned)
+        if not show_available:
+            return queryset if show_assigned else []
+        if not queryset.exists():
+            return []
+        return TableListData(AnnotatedPrefixSpace(parent.prefix, queryset, show_assigned))
 
     def get_extra_context(self, request, instance):
         return {
@@ -582,7 +595,13 @@ class PrefixPrefixesView(generic.ObjectChildrenView):
         show_available = bool(request.GET.get('show_available', 'true') == 'true')
         show_assigned = bool(request.GET.get('show_assigned', 'true') == 'true')
 
-        return add_requested_prefixes(parent.prefix, queryset, show_available, show_assigned)
+        if get_table_ordering(request, self.table):
+            return add_requested_prefixes(parent.prefix, queryset, show_available, show_assigned)
+        if not show_available:
+            return queryset if show_assigned else []
+        if not queryset.exists():
+            return []
+        return TableListData(AnnotatedPrefixSpace(parent.prefix, queryset, show_assigned))
 
     def get_extra_context(self, request, instance):
         return {
@@ -640,7 +659,7 @@ class PrefixIPAddressesView(generic.ObjectChildrenView):
 
     def prep_table_data(self, request, queryset, parent):
         if not request.GET.get('q') and not get_table_ordering(request, self.table):
-            return annotate_ip_space(parent)
+            return TableListData(AnnotatedIPSpace(parent))
         return queryset
 
     def get_extra_context(self, request, instance):
@@ -667,6 +686,11 @@ class PrefixBulkImportView(generic.BulkImportView):
     queryset = Prefix.objects.all()
     model_form = forms.PrefixImportForm
 
+    def create_and_update_objects(self, form, request):
+        # Rebuild the prefix hierarchy once all prefixes have been saved
+        with defer_prefix_hierarchy_updates():
+            return super().create_and_update_objects(form, request)
+
 
 @register_model_view(Prefix, 'bulk_edit', path='edit', detail=False)
 class PrefixBulkEditView(generic.BulkEditView):
@@ -675,6 +699,11 @@ class PrefixBulkEditView(generic.BulkEditView):
     table = tables.PrefixTable
     form = forms.PrefixBulkEditForm
 
+    def _update_objects(self, form, request):
+        # Rebuild the prefix hierarchy once all prefixes have been saved
+        with defer_prefix_hierarchy_updates():
+            return super()._update_objects(form, request)
+
 
 @register_model_view(Prefix, 'bulk_delete', path='delete', detail=False)
 class PrefixBulkDeleteView(generic.BulkDeleteView):
@@ -682,6 +711,11 @@ class PrefixBulkDeleteView(generic.BulkDeleteView):
     filterset = filtersets.PrefixFilterSet
     table = tables.PrefixTable
 
+    def post(self, request, **kwargs):
+        # Rebuild the prefix hierarchy once all prefixes have been deleted
+        with defer_prefix_hierarchy_updates():
+            return super().post(request, **kwargs)
+
 
 #
 # IP Ranges
@@ -924,6 +958,61 @@ class IPAddressBulkImportView(generic.BulkImportView):
     queryset = IPAddress.objects.all()
     model_form = forms.IPAddressImportForm
 
+    def get_ip_addresses(self, records):
+        """
+        Return a list of (record number, IPAddress) pairs representing the address, VRF, and role of each record, for
+        the validation of their uniqueness. Records which cannot be interpreted are omitted, as they will fail
+        validation of their own.
+        """
+        address_field = self.model_form.base_fields['address']
+        vrfs = defaultdict(list)
+        for vrf in VRF.objects.filter(name__in={record['vrf'] for record in records if record.get('vrf')}):
+            vrfs[vrf.name].append(vrf)
+        instances = IPAddress.objects.select_related('vrf').in_bulk([
+            int(record['id']) for record in records if record.get('id')
+        ])
+
+        ip_addresses = []
+        for i, record in enumerate(records, start=1):
+            instance = instances.get(int(record['id'])) if record.get('id') else None
+            if record.get('id') and instance is None:
+                continue
+            try:
+                address = address_field.clean(record['address']) if 'address' in record else instance.address
+            except (AttributeError, ValidationError):
+                continue
+            if 'vrf' not in record and instance:
+                vrf = instance.vrf
+            elif not record.get('vrf'):
+                vrf = None
+            elif len(vrfs[record['vrf']]) == 1:
+                vrf = vrfs[record['vrf']][0]
+            else:
+                continue
+            if 'role' not in record and instance:
+                role = instance.role
+            else:
+                role = record.get('role') or ''
+            ip_addresses.append((i, IPAddress(pk=getattr(instance, 'pk', None), address=address, vrf=vrf, role=role)))
+
+        return ip_addresses
+
+    def create_and_update_objects(self, form, request):
+        records = form.cleaned_data['data']
+
+        # Enforce unique IP space for all records at once, before they are validated individually
+        ip_addresses = self.get_ip_addresses(records)
+        errors = validate_ip_address_uniqueness([ip for i, ip in ip_addresses])
+        if any(errors):
+            for (i, ip), ip_errors in zip(ip_addresses, errors):
+                for field, field_errors in ip_errors.items():
+                    for err in field_errors:
+                        form.add_error(None, f'Record {i} {field}: {err}')
+            raise ValidationError("")
+
+        with defer_ip_address_uniqueness_checks():
+            return super().create_and_update_objects(form, request)
+
 
 @register_model_view(IPAddress, 'bulk_edit', path='edit', detail=False)
 class IPAddressBulkEditView(generic.BulkEditView):
@@ -14,6 +14,9 @@ ADVISORY_LOCK_KEYS = {
     'available-vlans': 100300,
     'available-asns': 100400,
 
+    # IPAM locks
+    'prefix-topology': 101100,
+
     # MPTT locks
     'region': 105100,
     'sitegroup': 105200,
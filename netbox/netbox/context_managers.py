@@ -1,6 +1,10 @@
 from contextlib import contextmanager
 
-from netbox.context import current_request, events_queue
+from django.conf import settings
+
+from core.signals import ObjectChangeQueue
+from netbox.context import changes_queue, current_request, events_queue, search_queue
+from netbox.search.backends import flush_search_queue
 from netbox.utils import register_request_processor
 from extras.events import flush_events
 
@@ -26,3 +30,47 @@ def event_tracking(request):
     # Clear context vars
     current_request.set(None)
     events_queue.set({})
+
+
+@register_request_processor
+@contextmanager
+def change_logging(request):
+    """
+    Queue ObjectChange records in memory while processing a request, then write them to the database in bulk before
+    returning the response. If CHANGELOG_BUFFER_SIZE is zero, each record is instead saved immediately.
+
+    :param request: WSGIRequest object with a unique `id` set
+    """
+    if not settings.CHANGELOG_BUFFER_SIZE:
+        yield
+        return
+
+    changes_queue.set(ObjectChangeQueue(settings.CHANGELOG_BUFFER_SIZE))
+    try:
+        yield
+    finally:
+        changes_queue.get().flush()
+        changes_queue.set(None)
+
+
+@register_request_processor
+@contextmanager
+def search_queueing(request):
+    """
+    If SEARCH_CACHE_ASYNC is enabled, queue the objects created, modified, or deleted while processing a request, then
+    enqueue a single background job to refresh their cached search values once the request has been processed.
+
+    :param request: WSGIRequest object with a unique `id` set
+    """
+    if not settings.SEARCH_CACHE_ASYNC:
+        yield
+        return
+
+    # The queued objects are refreshed even if the request fails, as any changes which were rolled back are simply
+    # re-cached in their current state
+    search_queue.set({})
+    try:
+        yield
+    finally:
+        flush_search_queue(search_queue.get())
+        search_queue.set(None)
@@ -3,17 +3,22 @@ from collections import defaultdict
 from django.conf import settings
 from django.contrib.contenttypes.models import ContentType
 from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
 from django.db.models import F, Window, Q, prefetch_related_objects
 from django.db.models.fields.related import ForeignKey
 from django.db.models.functions import window
 from django.db.models.signals import post_delete, post_save
 from django.utils.module_loading import import_string
 from django.utils.translation import gettext_lazy as _
+from django_rq import get_queue
 import netaddr
 from netaddr.core import AddrFormatError
 
 from core.models import ObjectType
 from extras.models import CachedValue, CustomField
+from netbox.config import get_config
+from netbox.constants import RQ_QUEUE_DEFAULT
+from netbox.context import search_queue
 from netbox.registry import registry
 from utilities.object_types import object_type_identifier
 from utilities.querysets import RestrictedPrefetch
@@ -62,13 +67,38 @@ class SearchBackend:
         """
         Receiver for the post_save signal, responsible for caching object creation/changes.
         """
-        self.cache(instance, remove_existing=not created)
+        if not self.queue(instance):
+            self.cache(instance, remove_existing=not created)
 
     def removal_handler(self, sender, instance, **kwargs):
         """
         Receiver for the post_delete signal, responsible for caching object deletion.
         """
-        self.remove(instance)
+        if not self.queue(instance):
+            self.remove(instance)
+
+    def queue(self, instances):
+        """
+        Queue the cached representations of instances to be refreshed by a background job, if the search queue is
+        active (see SEARCH_CACHE_ASYNC). Returns False if the instances must instead be cached immediately.
+        """
+        queue = search_queue.get()
+        if queue is None:
+            return False
+
+        # Convert a single instance to an iterable
+        if not hasattr(instances, '__iter__'):
+            instances = [instances]
+
+        for instance in instances:
+            try:
+                get_indexer(instance)
+            except KeyError:
+                continue
+            object_type = ObjectType.objects.get_for_model(instance)
+            queue.setdefault(object_type.pk, set()).add(instance.pk)
+
+        return True
 
     def cache(self, instances, indexer=None, remove_existing=True):
         """
@@ -82,6 +112,13 @@ class SearchBackend:
         """
         raise NotImplementedError
 
+    def refresh(self, object_type, object_ids):
+        """
+        Update the cached representations of the specified objects to reflect their current state. Any cached
+        representations of objects which no longer exist are deleted.
+        """
+        raise NotImplementedError
+
     def clear(self, object_types=None):
         """
         Delete *all* cached data (optionally filtered by object type).
@@ -108,20 +145,7 @@ class CachedValueSearchBackend(SearchBackend):
     def search(self, value, user=None, object_types=None, lookup=DEFAULT_LOOKUP_TYPE):
 
         # Build the filter used to find relevant CachedValue records
-        query_filter = Q(**{f'value__{lookup}': value})
-        if object_types:
-            # Limit results by object type
-            query_filter &= Q(object_type__in=object_types)
-        if lookup in (LookupTypes.STARTSWITH, LookupTypes.ENDSWITH):
-            # "Starts/ends with" matches are valid only on string values
-            query_filter &= Q(type=FieldTypes.STRING)
-        elif lookup == LookupTypes.PARTIAL:
-            try:
-                # If the value looks like an IP address, add an extra match for CIDR values
-                address = str(netaddr.IPNetwork(value.strip()).cidr)
-                query_filter |= Q(type=FieldTypes.CIDR) & Q(value__net_contains_or_equals=address)
-            except (AddrFormatError, ValueError):
-                pass
+        query_filter = self.get_query_filter(value, object_types, lookup)
 
         # Construct the base queryset to retrieve matching results
         queryset = CachedValue.objects.filter(query_filter).annotate(
@@ -139,21 +163,51 @@ class CachedValueSearchBackend(SearchBackend):
         object_type_ids = set(queryset.values_list('object_type', flat=True))
         object_types = ObjectType.objects.filter(pk__in=object_type_ids)
 
-        # Construct a Prefetch to pre-fetch only those related objects for which the
-        # user has permission to view.
-        if user:
-            prefetch = (RestrictedPrefetch('object', user, 'view'), 'object_type')
-        else:
-            prefetch = ('object', 'object_type')
-
         # Wrap the base query to return only the lowest-weight result for each object
         # Hat-tip to https://blog.oyam.dev/django-filter-by-window-function/ for the solution
         sql, params = queryset.query.sql_with_params()
-        results = CachedValue.objects.prefetch_related(*prefetch).raw(
+        results = CachedValue.objects.prefetch_related(*self.get_prefetch(user)).raw(
             f"SELECT * FROM ({sql}) t WHERE row_number = 1",
             params
         )
 
+        return self.get_results(results, object_types)
+
+    def get_query_filter(self, value, object_types=None, lookup=DEFAULT_LOOKUP_TYPE):
+        """
+        Return the filter used to find CachedValue records relevant to the given value.
+        """
+        query_filter = Q(**{f'value__{lookup}': value})
+        if object_types:
+            # Limit results by object type
+            query_filter &= Q(object_type__in=object_types)
+        if lookup in (LookupTypes.STARTSWITH, LookupTypes.ENDSWITH):
+            # "Starts/ends with" matches are valid only on string values
+            query_filter &= Q(type=FieldTypes.STRING)
+        elif lookup == LookupTypes.PARTIAL:
+            try:
+                # If the value looks like an IP address, add an extra match for CIDR values
+                address = str(netaddr.IPNetwork(value.strip()).cidr)
+                query_filter |= Q(type=FieldTypes.CIDR) & Q(value__net_contains_or_equals=address)
+            except (AddrFormatError, ValueError):
+                pass
+
+        return query_filter
+
+    def get_prefetch(self, user=None):
+        """
+        Return the lookups with which to prefetch the object (and its type) referenced by each result. If a user is
+        specified, only objects which the user has permission to view are prefetched.
+        """
+        if user:
+            return RestrictedPrefetch('object', user, 'view'), 'object_type'
+        return 'object', 'object_type'
+
+    def get_results(self, results, object_types):
+        """
+        Prefetch the related objects needed to render each result's display attributes, and return a list of only
+        those results referencing an object which could be retrieved.
+        """
         # Iterate through each ObjectType represented in the search results and prefetch any
         # related objects necessary to render the prescribed display attributes (display_attrs).
         for object_type in object_types:
@@ -251,6 +305,19 @@ class CachedValueSearchBackend(SearchBackend):
         # Call _raw_delete() on the queryset to avoid first loading instances into memory
         return qs._raw_delete(using=qs.db)
 
+    def refresh(self, object_type, object_ids):
+        # Avoid attempting to query for non-cacheable (or since removed) models
+        try:
+            indexer = registry['search'][object_type_identifier(object_type)]
+        except KeyError:
+            return 0
+
+        with transaction.atomic():
+            qs = CachedValue.objects.filter(object_type=object_type, object_id__in=object_ids)
+            qs._raw_delete(using=qs.db)
+            objects = indexer.model.objects.filter(pk__in=object_ids)
+            return self.cache(objects.iterator(), indexer=indexer, remove_existing=False)
+
     def clear(self, object_types=None):
         qs = CachedValue.objects.all()
         if object_types:
@@ -270,6 +337,35 @@ class CachedValueSearchBackend(SearchBackend):
         return CachedValue.objects.count()
 
 
+class TrigramSearchBackend(CachedValueSearchBackend):
+    """
+    Searches the same cached values as CachedValueSearchBackend, but in a form able to use the pg_trgm GIN index over
+    cached values (created by migration where the pg_trgm extension is available) and the GiST index over CIDR values.
+    The lowest-weight match for each object is selected within the database using DISTINCT ON, and the results are
+    ranked by weight and then by length (shorter values being the closer matches), so that only the top MAX_RESULTS
+    objects are retrieved.
+    """
+    def search(self, value, user=None, object_types=None, lookup=DEFAULT_LOOKUP_TYPE):
+
+        # Find the lowest-weight match for each object
+        matches = CachedValue.objects.filter(
+            self.get_query_filter(value, object_types, lookup)
+        ).order_by(
+            'object_type', 'object_id', 'weight'
+        ).distinct(
+            'object_type', 'object_id'
+        )
+
+        # Rank the matches and retrieve only the top results
+        sql, params = matches.query.sql_with_params()
+        results = list(CachedValue.objects.prefetch_related(*self.get_prefetch(user)).raw(
+            f"SELECT * FROM ({sql}) t ORDER BY weight, LENGTH(value), object_type_id, value, object_id LIMIT %s",
+            (*params, MAX_RESULTS)
+        ))
+
+        return self.get_results(results, {r.object_type for r in results})
+
+
 def get_backend():
     """
     Initializes and returns the configured search backend.
@@ -283,6 +379,30 @@ def get_backend():
     return backend_cls()
 
 
+def flush_search_queue(queue):
+    """
+    Enqueue a background job to refresh the cached representations of the queued objects.
+
+    :param queue: A dictionary mapping ObjectType IDs to sets of object IDs
+    """
+    if queue:
+        queue_name = get_config().QUEUE_MAPPINGS.get('search', RQ_QUEUE_DEFAULT)
+        get_queue(queue_name).enqueue(
+            "netbox.search.backends.refresh_search_cache",
+            objects={object_type_id: sorted(object_ids) for object_type_id, object_ids in queue.items()}
+        )
+
+
+def refresh_search_cache(objects):
+    """
+    Background job which refreshes the cached representations of objects in one batch per object type.
+
+    :param objects: A dictionary mapping ObjectType IDs to lists of object IDs
+    """
+    for object_type_id, object_ids in objects.items():
+        search_backend.refresh(ObjectType.objects.get_for_id(object_type_id), object_ids)
+
+
 search_backend = get_backend()
 
 # Connect handlers to the appropriate model signals
@@ -1,10 +1,15 @@
+import django_rq
 from django.contrib.contenttypes.models import ContentType
-from django.test import TestCase
+from django.test import TestCase, override_settings
+from netaddr import IPNetwork
 
 from dcim.models import Site
 from dcim.search import SiteIndex
 from extras.models import CachedValue
-from netbox.search.backends import search_backend
+from ipam.models import Prefix
+from netbox.context_managers import search_queueing
+from netbox.search import LookupTypes
+from netbox.search.backends import TrigramSearchBackend, refresh_search_cache, search_backend
 
 
 class SearchBackendTestCase(TestCase):
@@ -151,3 +156,57 @@ class SearchBackendTestCase(TestCase):
         self.assertEqual(len(results), 1)
         results = search_backend.search('xxxxx')
         self.assertEqual(len(results), 0)
+
+    def test_trigram_search(self):
+        """
+        Test that TrigramSearchBackend returns the lowest-weight match for each object, ranked by weight.
+        """
+        backend = TrigramSearchBackend()
+        backend.cache(Site.objects.all())
+        prefix = Prefix.objects.create(prefix=IPNetwork('192.0.2.0/24'), description='Site 1 prefix')
+        backend.cache(prefix)
+
+        results = backend.search('site')
+        self.assertListEqual(
+            [(r.object, r.field) for r in results],
+            [*[(site, 'name') for site in Site.objects.order_by('name')], (prefix, 'description')]
+        )
+        results = backend.search('first')
+        self.assertEqual(len(results), 1)
+        results = backend.search('xxxxx')
+        self.assertEqual(len(results), 0)
+        results = backend.search('site 2', lookup=LookupTypes.EXACT)
+        self.assertEqual(len(results), 1)
+        results = backend.search('192.0.2.1')
+        self.assertListEqual([(r.object, r.field) for r in results], [(prefix, 'prefix')])
+
+    @override_settings(SEARCH_CACHE_ASYNC=True)
+    def test_search_queueing(self):
+        """
+        Test that objects changed while processing a request are cached by a single background job.
+        """
+        queue = django_rq.get_queue('default')
+        queue.empty()
+        content_type = ContentType.objects.get_for_model(Site)
+        search_backend.cache(Site.objects.all())
+        site1, site2, site3 = Site.objects.order_by('name')
+        site2_pk = site2.pk
+
+        with search_queueing(None):
+            site1.description = 'Updated site'
+            site1.save()
+            site2.delete()
+            site4 = Site.objects.create(name='Site 4', slug='site-4')
+
+            # Nothing has been cached yet
+            self.assertFalse(CachedValue.objects.filter(value='Updated site').exists())
+            self.assertTrue(CachedValue.objects.filter(object_type=content_type, object_id=site2_pk).exists())
+            self.assertFalse(CachedValue.objects.filter(object_type=content_type, object_id=site4.pk).exists())
+
+        self.assertEqual(queue.count, 1)
+        refresh_search_cache(**queue.jobs[0].kwargs)
+
+        self.assertTrue(CachedValue.objects.filter(object_id=site1.pk, value='Updated site').exists())
+        self.assertFalse(CachedValue.objects.filter(object_type=content_type, object_id=site2_pk).exists())
+        self.assertTrue(CachedValue.objects.filter(object_type=content_type, object_id=site3.pk).exists())
+        self.assertTrue(CachedValue.objects.filter(object_type=content_type, object_id=site4.pk).exists())
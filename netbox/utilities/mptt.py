@@ -1,3 +1,5 @@
+from collections import defaultdict
+
 from mptt.managers import TreeManager as TreeManager_
 from mptt.querysets import TreeQuerySet as TreeQuerySet_
 
@@ -21,4 +23,72 @@ class TreeManager(Manager.from_queryset(TreeQuerySet), TreeManager_):
     """
     Extend django-mptt's TreeManager to incorporate RestrictedQuerySet().
     """
-    pass
+    def bulk_create_tree(self, objs):
+        """
+        Create a set of new nodes in bulk, computing their tree attributes in Python rather than inserting (and
+        rebalancing the tree for) each node individually. Each node's parent must be assigned as an instance, and may
+        be either another of the new nodes or an existing node. Nodes without a parent each become the root of a new
+        tree. New nodes are appended as the last children of their parents, in the order given.
+
+        One INSERT is performed per tree level, plus two queries for each existing parent (to make space for its new
+        descendants). Note that as with bulk_create(), no signals are sent.
+        """
+        opts = self.model._mptt_meta
+        objs = list(objs)
+        if not objs:
+            return objs
+
+        # Map each node to its new children
+        new_nodes = {id(obj) for obj in objs}
+        children = defaultdict(list)
+        roots = []
+        existing_parents = {}
+        for obj in objs:
+            parent = getattr(obj, opts.parent_attr)
+            if parent is None:
+                roots.append(obj)
+            else:
+                children[id(parent)].append(obj)
+                if id(parent) not in new_nodes:
+                    existing_parents[id(parent)] = parent
+
+        def set_tree_fields(node, tree_id, left, level):
+            # Assign tree attributes to a node and its descendants, returning the node's right value
+            right = left + 1
+            for child in children[id(node)]:
+                right = set_tree_fields(child, tree_id, right, level + 1) + 1
+            setattr(node, opts.tree_id_attr, tree_id)
+            setattr(node, opts.left_attr, left)
+            setattr(node, opts.right_attr, right)
+            setattr(node, opts.level_attr, level)
+            return right
+
+        # Each new root starts a new tree
+        if roots:
+            tree_id = self._get_next_tree_id()
+            for root in roots:
+                set_tree_fields(root, tree_id, 1, 0)
+                tree_id += 1
+
+        # Append new descendants to existing parents, making space for them to the left of each parent's right edge
+        for parent in existing_parents.values():
+            parent.refresh_from_db(fields=(opts.tree_id_attr, opts.left_attr, opts.right_attr, opts.level_attr))
+            tree_id = parent._mpttfield('tree_id')
+            parent_right = parent._mpttfield('right')
+            left = parent_right
+            for child in children[id(parent)]:
+                left = set_tree_fields(child, tree_id, left, parent._mpttfield('level') + 1) + 1
+            self._create_space(left - parent_right, parent_right - 1, tree_id)
+            setattr(parent, opts.right_attr, left)
+
+        # Create nodes one level at a time, so that each node's parent has been assigned a primary key
+        levels = defaultdict(list)
+        for obj in objs:
+            levels[obj._mpttfield('level')].append(obj)
+        for level in sorted(levels):
+            self.bulk_create(levels[level])
+
+        for obj in objs:
+            opts.update_mptt_cached_fields(obj)
+
+        return objs
@@ -104,6 +104,16 @@ COMMAND="python3 netbox/manage.py trace_paths --no-input"
 echo "Checking for missing cable paths ($COMMAND)..."
 eval $COMMAND || exit 1
 
+# Recalculate cached rack utilization
+COMMAND="python3 netbox/manage.py rebuild_rack_utilization"
+echo "Updating rack utilization ($COMMAND)..."
+eval $COMMAND || exit 1
+
+# Recalculate cached prefix & IP range utilization
+COMMAND="python3 netbox/manage.py rebuild_prefix_utilization"
+echo "Updating prefix and IP range utilization ($COMMAND)..."
+eval $COMMAND || exit 1
+
 # Build the local documentation
 COMMAND="mkdocs build"
 echo "Building documentation ($COMMAND)..."